@@ -0,0 +1,86 @@
+"""
+Бенчмарк пакетной оценки портфелей (bulk-valuation).
+
+Генерирует синтетический portfolios.json на N пользователей во временном
+каталоге и замеряет время и пиковую память BulkValuation.run().
+
+    python benchmarks/bench_bulk_valuation.py --users 1000000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.core.currencies import (  # noqa: E402
+    FiatCurrency,
+    get_all_currencies,
+)
+from valutatrade_hub.core.valuation import BulkValuation  # noqa: E402
+from valutatrade_hub.infra.database import db  # noqa: E402
+
+
+def generate(data_path: str, users: int, seed: int = 42):
+    rng = random.Random(seed)
+    codes = sorted(get_all_currencies())
+    now = datetime.now().isoformat()
+
+    pairs = {}
+    for code, currency in get_all_currencies().items():
+        if code == 'USD':
+            continue
+        rate = rng.uniform(0.5, 2.0) if isinstance(currency, FiatCurrency) else rng.uniform(0.1, 50_000) # noqa: E501
+        pairs[f"{code}_USD"] = {"rate": rate, "updated_at": now, "source": "bench"}
+    with open(os.path.join(data_path, 'rates.json'), 'w', encoding='utf-8') as f:
+        json.dump({"pairs": pairs, "last_refresh": now}, f)
+
+    with open(os.path.join(data_path, 'portfolios.json'), 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for user_id in range(1, users + 1):
+            wallets = {
+                code: {"currency_code": code, "balance": round(rng.uniform(0, 1000), 4)}
+                for code in rng.sample(codes, rng.randint(1, 5))
+            }
+            if user_id > 1:
+                f.write(',\n')
+            json.dump({"user_id": user_id, "wallets": wallets}, f)
+        f.write('\n]')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    parser.add_argument('--bases', default='USD,EUR,BTC')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_path:
+        start = time.perf_counter()
+        generate(data_path, args.users)
+        size_mb = os.path.getsize(os.path.join(data_path, 'portfolios.json')) / 2**20
+        print(f"Сгенерировано {args.users} портфелей ({size_mb:.1f} МБ) "
+              f"за {time.perf_counter() - start:.1f} с")
+
+        db.data_path = data_path
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        valuation = BulkValuation(args.bases.split(','), batch_size=args.batch_size)
+        result = valuation.run(os.path.join(data_path, 'totals.csv'))
+        elapsed = time.perf_counter() - start
+
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Оценено {result['users']} портфелей за {elapsed:.2f} с "
+              f"({result['users'] / elapsed:,.0f} портфелей/с)")
+        print(f"Прирост пиковой памяти (RSS): {(rss_after - rss_before) / 1024:.1f} МБ")
+        print(f"Итого: {result['totals']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Задержка команд через демон (main.py serve) против отдельного запуска CLI.
+
+Запускает демон на временном сокете, логинит пользователя и гоняет
+команды по одному постоянному соединению; для сравнения те же команды
+выполняются отдельными процессами main.py --local. Работает с текущим
+каталогом data/, поэтому нужен зарегистрированный пользователь.
+
+    python benchmarks/bench_daemon.py --username alice --password secret
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ('show-portfolio', {}),
+    ('get-rate', {'from': 'EUR', 'to': 'USD'}),
+    ('buy', {'currency': 'EUR', 'amount': '1'}),
+    ('sell', {'currency': 'EUR', 'amount': '1'}),
+]
+
+
+def wait_for_socket(path: str, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if os.path.exists(path):
+            return
+        time.sleep(0.05)
+    raise RuntimeError("Демон не запустился")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--cli-runs', type=int, default=5)
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'bench.sock')
+    env = dict(os.environ, VALUTATRADE_SOCKET=socket_path)
+    daemon = subprocess.Popen(
+        [sys.executable, 'main.py', 'serve', '--socket', socket_path],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_for_socket(socket_path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            stream = sock.makefile('rwb')
+
+            def call(command, command_args, token=None):
+                request = {"command": command, "args": command_args, "token": token}
+                stream.write(json.dumps(request).encode('utf-8') + b'\n')
+                stream.flush()
+                return json.loads(stream.readline())
+
+            login = call('login', {'username': args.username,
+                                   'password': args.password})
+            if not login['ok']:
+                sys.exit(f"Не удалось войти: {login['output'].strip()}")
+            with open(os.path.join(ROOT, 'data', 'session.json')) as f:
+                token = json.load(f)['token']
+
+            print(f"Демон, {args.requests} запросов на команду "
+                  f"(круговая задержка клиента / время на сервере), мс:")
+            for command, command_args in COMMANDS:
+                round_trip, server = [], []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    response = call(command, command_args, token)
+                    round_trip.append((time.perf_counter() - start) * 1000)
+                    server.append(response['elapsed_ms'])
+                print(f"  {command:<16} p50 {statistics.median(round_trip):7.3f} "
+                      f"p99 {percentile(round_trip, 0.99):7.3f}   "
+                      f"сервер p50 {statistics.median(server):7.3f}")
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    print(f"\nОтдельный процесс main.py --local (лучший из {args.cli_runs}), мс:")
+    for command, command_args in COMMANDS:
+        argv = [sys.executable, 'main.py', command, '--local']
+        for key, value in command_args.items():
+            argv += [f'--{key}', value]
+        timings = []
+        for _ in range(args.cli_runs):
+            start = time.perf_counter()
+            subprocess.run(argv, cwd=ROOT, capture_output=True)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {command:<16} {min(timings):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Бенчмарк блочной истории курсов против exchange_rates.json.
+
+Генерирует минутную синтетическую историю (--days × --pairs записей)
+во временном каталоге сразу в двух форматах: JSON с indent=2, как его
+пишет RatesStorage, и сжатые блоки HistoryBlockStore (zlib и lzma).
+Печатает размеры и степень сжатия, время полного чтения всех рядов
+и чтения одной пары за один день из середины истории.
+
+Полный json.load держит в памяти все записи (порядка 600 байт на запись),
+поэтому для JSON больше --json-read-max-mb чтение не замеряется.
+
+    python benchmarks/bench_history_blocks.py --days 365 --pairs 8
+    python benchmarks/bench_history_blocks.py --days 1460 --pairs 8 --codecs zlib
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.parser_service.history_blocks import (  # noqa: E402
+    HistoryBlockStore,
+    to_micros,
+)
+from valutatrade_hub.parser_service.storage import RatesStorage  # noqa: E402
+
+CODES = ["BTC", "ETH", "EUR", "GBP", "SOL", "JPY", "ADA", "CHF",
+         "DOGE", "DOT", "XRP", "BNB", "CAD", "AUD", "CNY", "RUB"]
+START = datetime(2025, 1, 1)
+
+
+def generate_days(days: int, pairs: int, seed: int = 42):
+    """Записи истории по одному дню: как их сохраняет RatesUpdater"""
+    rng = random.Random(seed)
+    codes = CODES[:pairs]
+    prices = {code: rng.uniform(1, 1000) for code in codes}
+    for day in range(days):
+        records = []
+        moment = START + timedelta(days=day)
+        for _ in range(24 * 60):
+            timestamp = moment.isoformat()
+            for code in codes:
+                prices[code] *= 1 + rng.gauss(0, 0.001)
+                records.append({
+                    "id": f"{code}_USD_{timestamp}",
+                    "from_currency": code,
+                    "to_currency": "USD",
+                    "rate": round(prices[code], 6),
+                    "timestamp": timestamp,
+                    "source": "coingecko" if code in ("BTC", "ETH") else "exchangerate",
+                })
+            moment += timedelta(minutes=1)
+        yield records
+
+
+def megabytes(size: int) -> str:
+    return f"{size / 2**20:,.0f} МБ"
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--pairs', type=int, default=8)
+    parser.add_argument('--codecs', default='zlib,lzma')
+    parser.add_argument('--block-records', type=int, default=16384)
+    parser.add_argument('--json-read-max-mb', type=int, default=1024)
+    args = parser.parse_args()
+
+    codecs = [codec.strip() for codec in args.codecs.split(',') if codec.strip()]
+    workdir = tempfile.mkdtemp(prefix='valutatrade-history-')
+    try:
+        json_path = os.path.join(workdir, 'exchange_rates.json')
+        stores = {
+            codec: HistoryBlockStore(
+                os.path.join(workdir, f'exchange_rates.{codec}.blocks'),
+                codec, args.block_records
+            )
+            for codec in codecs
+        }
+        write_time = dict.fromkeys(codecs, 0.0)
+        records = 0
+
+        start = time.perf_counter()
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for day in generate_days(args.days, args.pairs):
+                for record in day:
+                    f.write(('\n' if not records else ',\n') + '  ' + json.dumps(
+                        record, indent=2, ensure_ascii=False
+                    ).replace('\n', '\n  '))
+                    records += 1
+                for codec, store in stores.items():
+                    _, elapsed = timed(lambda: store.append(day))
+                    write_time[codec] += elapsed
+            f.write('\n]')
+        json_size = os.path.getsize(json_path)
+        print(f"История: {args.days} дн. × {args.pairs} пар = {records:,} записей, "
+              f"сгенерирована за {time.perf_counter() - start:.0f} с")
+
+        middle = START + timedelta(days=args.days // 2)
+        window = (to_micros(middle.isoformat()),
+                  to_micros((middle + timedelta(days=1)).isoformat()))
+        pair = f"{CODES[0]}_USD"
+
+        print(f"\n{'формат':<10}{'размер':>12}{'сжатие':>9}{'запись, с':>11}"
+              f"{'всё, с':>9}{'записей/с':>13}{'1 пара × 1 день, мс':>22}")
+
+        if json_size <= args.json_read_max_mb * 2**20:
+            storage = RatesStorage(os.path.join(workdir, 'rates.json'), json_path)
+            storage.history_format = 'json'
+            _, full = timed(storage.load_history_series)
+            _, ranged = timed(lambda: storage.load_history_series(
+                middle, middle + timedelta(days=1), [pair]
+            ))
+            print(f"{'json':<10}{megabytes(json_size):>12}{'1.0x':>9}{'—':>11}"
+                  f"{full:>9.2f}{records / full:>13,.0f}{ranged * 1000:>22.1f}")
+        else:
+            print(f"{'json':<10}{megabytes(json_size):>12}{'1.0x':>9}{'—':>11}"
+                  f"{'не замерялось (--json-read-max-mb)':>44}")
+
+        for codec, store in stores.items():
+            size = store.file_bytes()
+            series, full = timed(store.read_series)
+            loaded = sum(len(times) for times, _ in series.values())
+            assert loaded == records, (loaded, records)
+            del series
+            result, ranged = timed(lambda: store.read_series(*window, [pair]))
+            assert len(result[pair][0]) == 24 * 60 + 1
+            print(f"{codec:<10}{megabytes(size):>12}{json_size / size:>8.1f}x"
+                  f"{write_time[codec]:>11.1f}{full:>9.2f}{records / full:>13,.0f}"
+                  f"{ranged * 1000:>22.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Бенчмарк загрузки портфелей в модели.
+
+Сравнивает построение 100k портфелей через проверяющий конструктор Wallet
+и через Wallet.from_trusted, а также с прежней раскладкой объектов
+(обычные классы с __dict__ и полной проверкой при создании).
+
+    python benchmarks/bench_model_loading.py --portfolios 100000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.core.currencies import get_all_currencies, get_currency  # noqa: E402,E501
+from valutatrade_hub.core.models import Portfolio, Wallet  # noqa: E402
+
+
+class DictWallet:
+    """Кошелёк в прежнем виде: __dict__ и проверки в конструкторе"""
+
+    def __init__(self, currency_code, balance=0.0, lots=None, realized_pnl=0.0):
+        self._currency_object = get_currency(currency_code)
+        self.currency_code = currency_code
+        if not isinstance(balance, (int, float)) or balance < 0:
+            raise ValueError(balance)
+        self._balance = float(balance)
+        self._lots = [dict(lot) for lot in lots] if lots else []
+        self._cost_basis = sum(lot['amount'] * lot['price'] for lot in self._lots)
+        self._realized_pnl = float(realized_pnl)
+
+
+class DictPortfolio:
+    def __init__(self, user_id, wallets, version=0):
+        self._user_id = user_id
+        self._wallets = wallets
+        self.version = version
+
+
+def generate(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    codes = sorted(get_all_currencies())
+    data = []
+    for user_id in range(1, count + 1):
+        wallets = {}
+        for code in rng.sample(codes, rng.randint(1, 6)):
+            price = rng.uniform(0.5, 100)
+            amount = rng.uniform(1, 100)
+            wallets[code] = {
+                "currency_code": code,
+                "balance": amount,
+                "lots": [{"amount": amount, "price": price}],
+                "cost_basis": amount * price,
+                "realized_pnl": 0.0,
+            }
+        data.append({"user_id": user_id, "version": 1, "wallets": wallets})
+    return data
+
+
+def load_legacy(data):
+    return [
+        DictPortfolio(p['user_id'], {
+            code: DictWallet(code, info['balance'], info.get('lots'),
+                             info.get('realized_pnl', 0.0))
+            for code, info in p['wallets'].items()
+        }, p['version'])
+        for p in data
+    ]
+
+
+def load_validated(data):
+    return [
+        Portfolio(p['user_id'], {
+            code: Wallet(code, info['balance'], lots=info.get('lots'),
+                         realized_pnl=info.get('realized_pnl', 0.0))
+            for code, info in p['wallets'].items()
+        }, p['version'])
+        for p in data
+    ]
+
+
+def load_trusted(data):
+    return [
+        Portfolio(p['user_id'], {
+            code: Wallet.from_trusted(code, info)
+            for code, info in p['wallets'].items()
+        }, p['version'])
+        for p in data
+    ]
+
+
+def measure(name, loader, data):
+    gc.collect()
+    start = time.perf_counter()
+    loader(data)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = loader(data)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    print(f"{name:<28} {elapsed:8.3f} с  {current / 2**20:8.1f} МБ")
+    return elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--portfolios', type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = generate(args.portfolios)
+    wallets = sum(len(p['wallets']) for p in data)
+    print(f"Портфелей: {len(data)}, кошельков: {wallets}\n")
+    print(f"{'Способ загрузки':<28} {'время':>10}  {'память':>11}")
+
+    legacy = measure("__dict__ + проверки", load_legacy, data)
+    measure("__slots__ + проверки", load_validated, data)
+    trusted = measure("__slots__ + from_trusted", load_trusted, data)
+
+    print(f"\nУскорение: {legacy[0] / trusted[0]:.1f}x, "
+          f"экономия памяти: {(1 - trusted[1] / legacy[1]):.0%}")
+
+
+if __name__ == '__main__':
+    main()
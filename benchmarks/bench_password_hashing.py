@@ -0,0 +1,80 @@
+"""
+Подбор стоимости хеширования паролей под целевую задержку проверки.
+
+Для PBKDF2 и scrypt находит максимальную стоимость, при которой p99
+времени проверки пароля на этой машине не превышает --target-ms,
+и печатает значения для data/config.json.
+
+    python benchmarks/bench_password_hashing.py --target-ms 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.core.utils import PasswordHasher  # noqa: E402
+
+
+def measure(algorithm: str, cost: int, runs: int):
+    salt = PasswordHasher.generate_salt()
+    hashed = PasswordHasher.hash_password("correct horse", salt, algorithm, cost)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        PasswordHasher.verify_password("correct horse", salt, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return statistics.median(timings), p99
+
+
+def calibrate(algorithm: str, target_ms: float, runs: int):
+    """PBKDF2: линейный подбор итераций; scrypt: степени двойки для n"""
+    if algorithm == 'scrypt':
+        cost, best = 2 ** 10, None
+        while cost <= 2 ** 20:
+            p50, p99 = measure(algorithm, cost, runs)
+            print(f"  scrypt n={cost:<8} p50={p50:7.1f} мс  p99={p99:7.1f} мс")
+            if p99 > target_ms:
+                break
+            best = (cost, p50, p99)
+            cost *= 2
+        return best
+
+    p50, _ = measure(algorithm, 10_000, runs)
+    cost = max(10_000, int(10_000 * target_ms / p50) // 10_000 * 10_000)
+    while cost >= 10_000:
+        p50, p99 = measure(algorithm, cost, runs)
+        print(f"  pbkdf2 iterations={cost:<8} p50={p50:7.1f} мс  p99={p99:7.1f} мс")
+        if p99 <= target_ms:
+            return cost, p50, p99
+        cost = int(cost * 0.9) // 10_000 * 10_000
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--target-ms', type=float, default=100.0)
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    legacy_p50, legacy_p99 = measure('sha256', 1, args.runs)
+    print(f"Прежний формат (SHA-256, 1 проход): p50={legacy_p50:.3f} мс\n")
+
+    for algorithm in ('pbkdf2_sha256', 'scrypt'):
+        print(f"{algorithm}, цель p99 ≤ {args.target_ms:.0f} мс:")
+        best = calibrate(algorithm, args.target_ms, args.runs)
+        if best is None:
+            print("  цель недостижима даже при минимальной стоимости\n")
+            continue
+        cost, p50, p99 = best
+        print(f"  → \"password_hash_algorithm\": \"{algorithm}\", "
+              f"\"password_hash_cost_{algorithm}\": {cost}  "
+              f"(p50={p50:.1f} мс, p99={p99:.1f} мс)\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Бенчмарк истории стоимости портфеля (portfolio-history).
+
+Генерирует синтетическую минутную историю курсов во временном каталоге
+и отдельно замеряет загрузку exchange_rates.json и векторный расчёт ряда.
+
+    python benchmarks/bench_portfolio_history.py --days 365 --pairs 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.core.history import PortfolioHistory  # noqa: E402
+from valutatrade_hub.parser_service.storage import RatesStorage  # noqa: E402
+
+CODES = ["BTC", "ETH", "EUR", "GBP", "SOL", "JPY", "ADA", "CHF"]
+
+
+def generate(path: str, days: int, pairs: int, seed: int = 42):
+    rng = random.Random(seed)
+    codes = CODES[:pairs]
+    prices = {code: rng.uniform(1, 1000) for code in codes}
+    moment = datetime(2025, 1, 1)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        first = True
+        for _ in range(days * 24 * 60):
+            timestamp = moment.isoformat()
+            for code in codes:
+                prices[code] *= 1 + rng.gauss(0, 0.001)
+                entry = {
+                    "id": f"{code}_USD_{timestamp}",
+                    "from_currency": code,
+                    "to_currency": "USD",
+                    "rate": round(prices[code], 6),
+                    "timestamp": timestamp,
+                    "source": "bench",
+                }
+                f.write(('' if first else ',') + json.dumps(entry))
+                first = False
+            moment += timedelta(minutes=1)
+        f.write(']')
+    return codes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--pairs', type=int, default=4)
+    parser.add_argument('--resolution', default='1min')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_path:
+        history_path = os.path.join(data_path, 'exchange_rates.json')
+        start = time.perf_counter()
+        codes = generate(history_path, args.days, args.pairs)
+        size_mb = os.path.getsize(history_path) / 2**20
+        print(f"Сгенерирована история: {args.days} дн. × {len(codes)} пар, "
+              f"{size_mb:.0f} МБ за {time.perf_counter() - start:.1f} с")
+
+        history = PortfolioHistory(
+            RatesStorage(os.path.join(data_path, 'rates.json'), history_path)
+        )
+        start = time.perf_counter()
+        history.series
+        print(f"Загрузка и выравнивание истории: {time.perf_counter() - start:.2f} с")
+
+        balances = {code: 1.0 for code in codes}
+        balances['USD'] = 1000.0
+        start = time.perf_counter()
+        times, values = history.value_series(balances, 'USD', args.resolution)
+        print(f"Расчёт ряда ({len(times)} точек, {args.resolution}): "
+              f"{time.perf_counter() - start:.3f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Накладные расходы логирования на одну сделку: синхронный
+RotatingFileHandler против очереди с фоновым потоком (log_mode=queue),
+а также при уровне WARNING, когда декоратор не должен стоить ничего.
+
+Измеряется вызов пустой функции под @log_buy, т.е. ровно то, что
+декоратор добавляет к buy/sell. Лог пишется во временный каталог.
+
+    python benchmarks/bench_queue_logging.py --trades 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub import logging_config  # noqa: E402
+from valutatrade_hub.decorators import log_buy  # noqa: E402
+from valutatrade_hub.infra.settings import settings  # noqa: E402
+
+
+@log_buy()
+def fake_trade(user_id: int, currency_code: str, amount: float):
+    return {"currency": currency_code, "amount": amount, "rate": 100.0,
+            "old_balance": 0.0, "new_balance": amount}
+
+
+def run(mode: str, trades: int, log_format: str, overflow: str):
+    with tempfile.TemporaryDirectory() as log_path:
+        settings.set('log_path', log_path)
+        settings.set('log_mode', 'sync' if mode == 'off' else mode)
+        settings.set('log_level', 'WARNING' if mode == 'off' else 'INFO')
+        settings.set('log_format', log_format)
+        settings.set('log_queue_overflow', overflow)
+        settings.set('log_rotation_bytes', 50 * 1024 * 1024)
+        logging_config.setup_logging()
+
+        timings = []
+        start = time.perf_counter()
+        for i in range(trades):
+            t0 = time.perf_counter_ns()
+            fake_trade(1, 'BTC', 0.001 * (i % 100 + 1))
+            timings.append(time.perf_counter_ns() - t0)
+        hot_path = time.perf_counter() - start
+
+        logging_config.shutdown_logging()
+        total = time.perf_counter() - start
+
+        log_file = os.path.join(log_path, 'actions.log')
+        with open(log_file, encoding='utf-8') as f:
+            written = sum(1 for _ in f)
+
+    timings.sort()
+    return {
+        "p50_us": timings[len(timings) // 2] / 1000,
+        "p99_us": timings[int(len(timings) * 0.99)] / 1000,
+        "max_us": timings[-1] / 1000,
+        "hot_path_s": hot_path,
+        "total_s": total,
+        "written": written,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trades', type=int, default=20_000)
+    parser.add_argument('--format', default='json', choices=['json', 'text'])
+    parser.add_argument('--overflow', default='block',
+                        choices=['block', 'drop_new', 'drop_oldest'])
+    args = parser.parse_args()
+
+    print(f"{args.trades} сделок, формат {args.format}\n")
+    print(f"{'режим':<8}{'p50, мкс':>10}{'p99, мкс':>10}{'max, мкс':>10}"
+          f"{'вызовы, с':>11}{'с flush, с':>12}{'записей':>9}")
+    for mode in ('sync', 'queue', 'off'):
+        r = run(mode, args.trades, args.format, args.overflow)
+        print(f"{mode:<8}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}"
+              f"{r['max_us']:>10.1f}{r['hot_path_s']:>11.3f}"
+              f"{r['total_s']:>12.3f}{r['written']:>9}")
+
+
+if __name__ == '__main__':
+    main()
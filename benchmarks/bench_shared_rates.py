@@ -0,0 +1,119 @@
+"""
+Бенчмарк чтения курсов: разбор rates.json против снимка из общей памяти.
+
+Генерирует --pairs синтетических курсов во временном каталоге,
+публикует их через RatesStorage и сравнивает json.load файла со снимком
+SharedRateTable (копия записей под seqlock), а также поиск одной пары.
+Отдельно замеряет первое чтение в свежем процессе — так, как его видит
+однократный запуск CLI.
+
+    python benchmarks/bench_shared_rates.py --pairs 2000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from valutatrade_hub.infra.shared_rates import SharedRateTable  # noqa: E402
+from valutatrade_hub.parser_service.storage import RatesStorage  # noqa: E402
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from valutatrade_hub.infra.shared_rates import SharedRateTable
+path, mode = {path!r}, {mode!r}
+start = time.perf_counter()
+if mode == 'json':
+    with open(path, encoding='utf-8') as f:
+        rate = json.load(f)['pairs']['C0_USD']['rate']
+else:
+    rate = SharedRateTable(path).snapshot()['C0_USD']['rate']
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def measure(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def fresh_process(path: str, mode: str, repeat: int) -> float:
+    code = CHILD.format(root=ROOT, path=path, mode=mode)
+    return statistics.median(
+        float(subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True
+        ).stdout)
+        for _ in range(repeat)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    now = datetime.now().isoformat()
+    rates = {
+        f"C{i}_USD": {
+            "rate": rng.uniform(0.001, 50000), "updated_at": now,
+            "source": rng.choice(["CoinGecko", "ExchangeRate-API"]),
+        }
+        for i in range(args.pairs)
+    }
+
+    workdir = tempfile.mkdtemp(prefix='valutatrade-shm-')
+    path = os.path.join(workdir, 'rates.json')
+    table = SharedRateTable(path, capacity=args.pairs)
+    try:
+        RatesStorage(path, os.path.join(workdir, 'history.json')).save_current_rates(
+            rates, {}
+        )
+        size = os.path.getsize(path)
+
+        def parse():
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+
+        if table.snapshot() is None:
+            raise RuntimeError("Таблица не опубликована")
+        pairs = list(rates)
+        snapshot = table.snapshot()
+        parsed = parse()['pairs']
+
+        print(f"{args.pairs} пар, rates.json {size / 1024:.0f} КБ, "
+              f"медиана из {args.repeat}")
+        print(f"{'':<28}{'JSON, мс':>12}{'общая память, мс':>20}")
+        print(f"{'весь снимок':<28}{measure(parse, args.repeat):>12.3f}"
+              f"{measure(table.snapshot, args.repeat):>20.3f}")
+        print(f"{'1000 поисков пары':<28}"
+              f"{measure(lambda: [parsed[p] for p in pairs[:1000]], args.repeat):>12.3f}"  # noqa: E501
+              f"{measure(lambda: [snapshot[p] for p in pairs[:1000]], args.repeat):>20.3f}")  # noqa: E501
+        repeat = max(3, args.repeat // 5)
+        print(f"{'свежий процесс':<28}{fresh_process(path, 'json', repeat):>12.3f}"
+              f"{fresh_process(path, 'shm', repeat):>20.3f}")
+    finally:
+        table.close()
+        shm_path = os.path.join('/dev/shm', table.name)
+        if os.path.exists(shm_path):
+            os.unlink(shm_path)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Регрессионная проверка холодного старта CLI по `python -X importtime`.
+
+Проверяет, что:
+- импорт valutatrade_hub.cli.interface не тянет тяжёлые модули,
+  нужные только отдельным командам (requests, numpy, ...);
+- его суммарное время импорта (минимум из --runs запусков) не превышает
+  --budget-ms;
+- `main.py help` в пустом каталоге ничего не печатает сверх справки
+  и не создаёт каталогов data/ и logs/.
+
+Код возврата 1 при нарушении; подходит для CI.
+
+    python benchmarks/check_import_time.py --budget-ms 80
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORBIDDEN = (
+    'requests',
+    'urllib3',
+    'numpy',
+    'concurrent.futures',
+    'http.server',
+    'valutatrade_hub.parser_service.updater',
+    'valutatrade_hub.parser_service.api_clients',
+)
+
+
+def import_profile(module: str) -> dict:
+    """{модуль: суммарное время импорта в мкс} для свежего интерпретатора"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env, cwd=ROOT, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--module', default='valutatrade_hub.cli.interface')
+    parser.add_argument('--budget-ms', type=float, default=80.0)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    timings = []
+    for _ in range(args.runs):
+        profile = import_profile(args.module)
+        timings.append(profile[args.module] / 1000)
+
+    heavy = [name for name in FORBIDDEN if name in profile]
+    if heavy:
+        failures.append(f"{args.module} импортирует лишнее: {', '.join(heavy)}")
+
+    best = min(timings)
+    print(f"{args.module}: {best:.1f} мс (лучший из {args.runs}), "
+          f"бюджет {args.budget_ms:.0f} мс")
+    if best > args.budget_ms:
+        failures.append(f"время импорта {best:.1f} мс превышает бюджет")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'main.py'), 'help'],
+            capture_output=True, text=True, env=env, cwd=workdir
+        )
+        if result.returncode != 0:
+            failures.append(f"main.py help завершился с кодом {result.returncode}")
+        if not result.stdout.lstrip().startswith('Доступные команды'):
+            failures.append("main.py help печатает что-то кроме справки")
+        created = sorted(os.listdir(workdir))
+        if created:
+            failures.append(f"main.py help создал файлы: {', '.join(created)}")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
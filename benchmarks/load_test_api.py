@@ -0,0 +1,243 @@
+"""
+Нагрузочный тест HTTP API (main.py api).
+
+Без --url поднимает сервер в подпроцессе на копии data/ во временном
+каталоге (метки времени курсов обновляются, чтобы /rate не отвечал
+«данные устарели»), поэтому рабочие данные не затрагиваются.
+Регистрирует --users пользователей, логинит их и в течение --duration
+секунд гоняет смесь запросов из --concurrency соединений keep-alive.
+Печатает запросы в секунду и перцентили задержек по маршрутам.
+
+    python benchmarks/load_test_api.py --concurrency 32 --duration 10
+    python benchmarks/load_test_api.py --url http://127.0.0.1:8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_FILES = ('config.json', 'currencies.json', 'rates.json')
+
+
+class ApiClient:
+    """Минимальный HTTP/1.1-клиент с постоянным соединением"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None, token=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        if token:
+            head += f"Authorization: Bearer {token}\r\n"
+        head += f"Content-Length: {len(payload)}\r\n\r\n"
+        self.writer.write(head.encode('ascii') + payload)
+
+        status_line = await self.reader.readline()
+        status = int(status_line.split()[1])
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+            elif name.lower() == 'connection':
+                close = value.strip().lower() == 'close'
+        data = json.loads(await self.reader.readexactly(length))
+        if close:
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def format_row(name, latencies, failed):
+    quantiles = ''.join(
+        f"{percentile(latencies, q):>10.2f}" for q in (0.5, 0.9, 0.99, 1.0)
+    )
+    return f"{name:<10}{len(latencies):>10}{failed:>8}{quantiles}"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare_workdir() -> str:
+    workdir = tempfile.mkdtemp(prefix='valutatrade-load-')
+    data_dir = os.path.join(workdir, 'data')
+    os.makedirs(data_dir)
+    for name in DATA_FILES:
+        source = os.path.join(ROOT, 'data', name)
+        if os.path.exists(source):
+            shutil.copy(source, data_dir)
+
+    rates_path = os.path.join(data_dir, 'rates.json')
+    with open(rates_path, encoding='utf-8') as f:
+        rates = json.load(f)
+    now = datetime.now().isoformat()
+    for rate in (rates.get('pairs', rates)).values():
+        if isinstance(rate, dict):
+            rate['updated_at'] = now
+    with open(rates_path, 'w', encoding='utf-8') as f:
+        json.dump(rates, f)
+    return workdir
+
+
+async def wait_for_port(host: str, port: int, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(0.1)
+            continue
+        writer.close()
+        return
+    raise RuntimeError("API не запустился")
+
+
+async def setup_users(host, port, count):
+    client = ApiClient(host, port)
+    tokens = []
+    prefix = f"load{os.getpid()}"
+    for i in range(count):
+        credentials = {"username": f"{prefix}_{i}", "password": "load-test"}
+        status, data = await client.request('POST', '/register', credentials)
+        if status != 201:
+            raise RuntimeError(f"Регистрация не удалась: {data}")
+        status, data = await client.request('POST', '/login', credentials)
+        if status != 200:
+            raise RuntimeError(f"Вход не удался: {data}")
+        tokens.append(data['token'])
+    client.close()
+    return tokens
+
+
+def make_mix(spec: str):
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight)
+    return list(weights), list(weights.values())
+
+
+async def worker(host, port, tokens, routes, weights, deadline, results):
+    client = ApiClient(host, port)
+    rng = random.Random()
+    currencies = ('EUR', 'GBP', 'JPY', 'CHF')
+    try:
+        while time.perf_counter() < deadline:
+            route = rng.choices(routes, weights)[0]
+            token = rng.choice(tokens)
+            if route == 'portfolio':
+                call = ('GET', '/portfolio', None)
+            elif route == 'rate':
+                call = ('GET', f"/rate?from={rng.choice(currencies)}&to=USD", None)
+            else:
+                amount = '1' if route == 'buy' else '0.5'
+                call = ('POST', f"/{route}",
+                        {"currency": 'EUR', "amount": amount})
+            start = time.perf_counter()
+            status, _ = await client.request(*call, token=token)
+            results.setdefault(route, []).append(
+                ((time.perf_counter() - start) * 1000, status)
+            )
+    finally:
+        client.close()
+
+
+async def run(args, host, port):
+    await wait_for_port(host, port)
+    tokens = await setup_users(host, port, args.users)
+    routes, weights = make_mix(args.mix)
+
+    results = {}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        worker(host, port, tokens, routes, weights, deadline, results)
+        for _ in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(samples) for samples in results.values())
+    print(f"{total} запросов за {elapsed:.1f} с: {total / elapsed:.0f} запросов/с "
+          f"({args.concurrency} соединений, {args.users} пользователей)")
+    print(f"{'маршрут':<10}{'запросов':>10}{'не 2xx':>8}"
+          f"{'p50, мс':>10}{'p90, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    everything = []
+    for route in routes:
+        samples = results.get(route, [])
+        if not samples:
+            continue
+        latencies = [latency for latency, _ in samples]
+        everything.extend(latencies)
+        failed = sum(1 for _, status in samples if status >= 300)
+        print(format_row(route, latencies, failed))
+    if everything:
+        print(format_row('все', everything, ''))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help="адрес уже запущенного API")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=8,
+                        help="размер пула потоков сервера")
+    parser.add_argument('--mix', default='portfolio=50,rate=30,buy=10,sell=10')
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        asyncio.run(run(args, url.hostname, url.port or 80))
+        return
+
+    workdir = prepare_workdir()
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'main.py'), 'api', '--local',
+         '--port', str(port), '--workers', str(args.workers)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(run(args, '127.0.0.1', port))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import json
+import os
+import socket
 import sys
 
 
@@ -20,7 +23,218 @@ def _parse_args(args):
     return parsed
 
 
+def _run_command(command_map, command, args):
+    from valutatrade_hub.logging_config import ensure_logging
+    
+    ensure_logging()
+    trace_path = args.pop('trace', None)
+    if trace_path is None:
+        return command_map[command](args)
+    
+    from valutatrade_hub.infra.tracing import tracer
+    from valutatrade_hub.logging_config import flush_logging
+    
+    if trace_path is True:
+        trace_path = 'trace.json'
+    tracer.start()
+    try:
+        with tracer.span(f'cli.{command}', 'cli'):
+            return command_map[command](args)
+    finally:
+        flush_logging()
+        tracer.stop()
+        tracer.dump(trace_path)
+        print(f"Трасса сохранена в {trace_path} (chrome://tracing или ui.perfetto.dev)") # noqa: E501
+
+
+def _run_script(command_map, options):
+    """
+    Пакетный режим: команды из файла (или stdin) выполняются в одном
+    процессе с общим состоянием — текущим пользователем и разобранными
+    файлами данных. Запись на диск откладывается до контрольных точек:
+    каждые --checkpoint-every команд (0 — только в конце) и по завершении.
+    Пока запущен демон, сценарий не выполняется: контрольная точка
+    затёрла бы его изменения (а изменения других процессов, сделанные
+    во время сценария, обнаруживает checkpoint — BatchConflictError).
+    """
+    import contextlib
+    import io
+    import shlex
+    import time
+    
+    from valutatrade_hub.cli.daemon import daemon_running
+    from valutatrade_hub.infra.database import BatchConflictError, db
+    from valutatrade_hub.infra.metrics import metrics
+    from valutatrade_hub.infra.settings import settings
+    from valutatrade_hub.logging_config import ensure_logging
+    
+    source = options.get('script')
+    checkpoint_every = options.get('checkpoint-every')
+    try:
+        checkpoint_every = int(
+            checkpoint_every if isinstance(checkpoint_every, str)
+            else settings.get('script_checkpoint_every', 1000)
+        )
+    except ValueError:
+        print("Ошибка: --checkpoint-every должен быть числом")
+        return 1
+    stop_on_error = 'stop-on-error' in options
+    if daemon_running():
+        print("Ошибка: запущен демон (main.py serve). Остановите его или выполняйте команды через демон") # noqa: E501
+        return 1
+    quiet = 'quiet' in options
+    
+    if source is True or source == '-':
+        stream = sys.stdin
+    else:
+        try:
+            stream = open(source, 'r', encoding='utf-8')
+        except OSError as e:
+            print(f"Ошибка: не удалось открыть сценарий: {e}")
+            return 1
+    
+    ensure_logging()
+    metrics.persist_at_exit()
+    db.begin_batch()
+    executed = failed = checkpoints = 0
+    conflict = None
+    started = time.perf_counter()
+    try:
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                tokens = shlex.split(line)
+            except ValueError as e:
+                tokens = None
+                error = f"не удалось разобрать строку: {e}"
+            else:
+                if tokens[0] in ('exit', 'quit'):
+                    break
+                if tokens[0] not in command_map or tokens[0] in ('serve', 'api'):
+                    error = f"команда '{tokens[0]}' недоступна в сценарии"
+                    tokens = None
+            
+            ok = False
+            output = io.StringIO()
+            if tokens is not None:
+                with contextlib.redirect_stdout(output if quiet else sys.stdout):
+                    try:
+                        ok = _run_command(
+                            command_map, tokens[0], _parse_args(tokens[1:])
+                        ) is not False
+                    except Exception as e:
+                        print(f"Ошибка: {e}")
+                error = output.getvalue().strip() or "команда завершилась с ошибкой"
+            
+            executed += 1
+            if not ok:
+                failed += 1
+                if tokens is None or quiet:
+                    print(f"Строка {line_no}: {error}")
+                if stop_on_error:
+                    break
+            
+            if checkpoint_every and executed % checkpoint_every == 0:
+                checkpoints += db.checkpoint() > 0
+    except KeyboardInterrupt:
+        print("\nСценарий прерван, сохраняем выполненное...")
+    except BatchConflictError as e:
+        conflict = e
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        try:
+            checkpoints += db.end_batch() > 0
+        except BatchConflictError as e:
+            conflict = e
+    
+    elapsed = time.perf_counter() - started
+    print(f"Выполнено команд: {executed}, с ошибкой: {failed} за {elapsed:.2f} с "
+          f"({executed / elapsed if elapsed > 0 else 0:.0f} команд/с), "
+          f"сохранений на диск: {checkpoints}")
+    if conflict is not None:
+        print(f"Ошибка: {conflict}")
+        return 1
+    return 1 if failed else 0
+
+
+def _read_local_config():
+    try:
+        with open(os.path.join('data', 'config.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _forward_to_daemon(command, args):
+    """
+    Тонкий клиент: передаёт команду демону (main.py serve), не импортируя
+    valutatrade_hub. Возвращает код выхода или None, если демон не запущен
+    или команду нужно выполнить локально.
+    """
+    config = _read_local_config()
+    data_path = config.get('data_path', 'data')
+    socket_path = os.environ.get('VALUTATRADE_SOCKET') or config.get(
+        'daemon_socket', os.path.join(data_path, 'valutatrade.sock')
+    )
+    if not os.path.exists(socket_path):
+        return None
+    
+    token = os.environ.get('VALUTATRADE_SESSION')
+    if not token:
+        session_file = config.get(
+            'session_file', os.path.join(data_path, 'session.json')
+        )
+        try:
+            with open(session_file, 'r', encoding='utf-8') as f:
+                token = json.load(f).get('token')
+        except (OSError, ValueError, AttributeError):
+            token = None
+    
+    request = {"command": command, "args": args, "token": token}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(config.get('daemon_timeout_seconds', 120))
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+            # Запрос не отправлен: демон не запущен, выполняем локально
+            return None
+        # После отправки запроса локальный повтор недопустим: демон мог уже
+        # выполнить команду (например, сохранить сделку) и упасть до ответа
+        try:
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as stream:
+                response = json.loads(stream.readline())
+        except socket.timeout:
+            print("Ошибка: демон не ответил вовремя, результат команды неизвестен")
+            return 1
+        except (ConnectionError, ValueError):
+            print("Ошибка: соединение с демоном прервано, результат команды неизвестен")  # noqa: E501
+            return 1
+    
+    if not isinstance(response, dict):
+        print("Ошибка: некорректный ответ демона")
+        return 1
+    if response.get('unsupported'):
+        return None
+    print(response.get('output', ''), end='')
+    return 0 if response.get('ok') else 1
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'help':
+        print_help()
+        return 0
+    
+    if len(sys.argv) > 1 and sys.argv[1] not in ('serve', 'api', '--script'):
+        args = _parse_args(sys.argv[2:])
+        if 'local' not in args and 'trace' not in args:
+            exit_code = _forward_to_daemon(sys.argv[1], args)
+            if exit_code is not None:
+                return exit_code
+    
     try:
         from valutatrade_hub.cli.interface import CLIInterface
     except ImportError as e:
@@ -36,22 +250,44 @@ def main():
         command_map = {
             'register': cli.register,
             'login': cli.login,
+            'logout': cli.logout,
+            'import-users': cli.import_users,
             'show-portfolio': cli.show_portfolio,
             'get-rate': cli.get_rate,
             'update-rates': cli.update_rates,
             'show-rates': cli.show_rates,
+            'rate-events': cli.rate_events,
             'buy': cli.buy,
             'sell': cli.sell,
+            'bulk-valuation': cli.bulk_valuation,
+            'cache-stats': cli.cache_stats,
+            'portfolio-history': cli.portfolio_history,
+            'risk': cli.risk,
+            'metrics': cli.metrics,
+            'audit': cli.audit,
+            'serve': cli.serve,
+            'api': cli.api,
             'help': lambda args: print_help()
         }
         
+        if command == '--script':
+            return _run_script(command_map, _parse_args(sys.argv[1:]))
+        
+        if command == 'cache-stats':
+            # Кэш оценок живёт в процессе: у одиночной команды он всегда пуст
+            print("Ошибка: cache-stats показывает кэш работающего процесса: запустите демон (main.py serve), интерактивный режим или --script") # noqa: E501
+            return 1
+        
         if command in command_map:
-            command_map[command](args)
+            _run_command(command_map, command, args)
         else:
             print(f"Неизвестная команда: {command}")
             print_help()
         return 0
     
+    from valutatrade_hub.infra.metrics import metrics
+    
+    metrics.persist_at_exit()
     print("Введите команду или 'exit' для выхода")
     print_help()
     print("-" * 50)
@@ -87,17 +323,28 @@ def main():
             command_map = {
                 'register': cli.register,
                 'login': cli.login,
+                'logout': cli.logout,
+                'import-users': cli.import_users,
                 'show-portfolio': cli.show_portfolio,
                 'get-rate': cli.get_rate,
                 'update-rates': cli.update_rates,
                 'show-rates': cli.show_rates,
+                'rate-events': cli.rate_events,
                 'buy': cli.buy,
                 'sell': cli.sell,
+                'bulk-valuation': cli.bulk_valuation,
+                'cache-stats': cli.cache_stats,
+                'portfolio-history': cli.portfolio_history,
+                'risk': cli.risk,
+                'metrics': cli.metrics,
+                'audit': cli.audit,
+                'serve': cli.serve,
+                'api': cli.api,
                 'help': lambda args: print_help()
             }
             
             if command in command_map:
-                command_map[command](args_dict)
+                _run_command(command_map, command, args_dict)
             else:
                 print(f"Неизвестная команда: {command}")
                 print_help()
@@ -115,17 +362,31 @@ def print_help():
     print("\nДоступные команды:")
     print("Аутентификация:")
     print("register --username <имя> --password <пароль>")
-    print("login --username <имя> --password <пароль>")
+    print("login --username <имя> --password <пароль> [--print-token]")
+    print("logout - завершить сессию")
+    print("import-users --file <users.csv|users.jsonl> [--workers <число>]")
     print("Портфель:")
-    print("show-portfolio [--base <валюта>]")
+    print("show-portfolio [--base <валюта>] [--watch]")
+    print("cache-stats - статистика кэша оценок портфелей (демон, интерактивный режим, --script)") # noqa: E501
+    print("portfolio-history [--base <валюта>] [--resolution 1min|1h|1d] [--from <ISO>] [--to <ISO>] [--output <файл.csv>]") # noqa: E501
+    print("risk [--base <валюта>] [--resolution 1d] [--window <число>]")
     print("Курсы валют:")
     print("update-rates [--source coingecko|exchangerate]")
-    print("show-rates [--currency <код>] [--top <число>]")
+    print("show-rates [--currency <код>] [--class fiat|crypto] [--base <код>] [--source <источник>] [--sort rate|pair|updated] [--asc] [--top|--limit <число>] [--cursor <курсор>] [--all] [--watch]") # noqa: E501
     print("get-rate --from <валюта> --to <валюта>")
+    print("rate-events [--once] [--timeout <сек>] - ждать обновлений курсов и показывать изменившиеся пары") # noqa: E501
     print("Торговля:")
     print("buy --currency <код> --amount <сумма>")
     print("sell --currency <код> --amount <сумма>")
+    print("Отчётность:")
+    print("bulk-valuation [--base USD,EUR] [--top <число>] [--output <файл.csv>]")
     print("Система:")
+    print("audit [--action BUY|SELL|...] [--user-id <id>] [--username <имя>] [--from <ISO>] [--to <ISO>] [--limit <число>] [--reindex]") # noqa: E501
+    print("metrics [--export <файл.prom>] [--serve <порт> [--host <адрес>]] [--reset]") # noqa: E501
+    print("--trace [<файл.json>] - к любой команде: записать трассу выполнения")
+    print("serve [--socket <путь>] - запустить демон; остальные команды пойдут через него (--local — выполнить локально)") # noqa: E501
+    print("api [--host <адрес>] [--port <порт>] [--workers <число>] - HTTP/JSON API: /register, /login, /portfolio, /rate, /rates, /buy, /sell") # noqa: E501
+    print("--script <файл|-> [--checkpoint-every <число>] [--quiet] [--stop-on-error] - выполнить команды из файла или stdin в одном процессе") # noqa: E501
     print("help - показать справку")
     print("exit - выйти из программы")
 
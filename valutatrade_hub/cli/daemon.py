@@ -0,0 +1,143 @@
+# valutatrade_hub/cli/daemon.py
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+from typing import Dict, Optional
+
+from ..infra.database import db as DatabaseManager
+from ..infra.metrics import metrics
+from ..infra.sessions import sessions
+from ..infra.settings import settings
+from ..logging_config import ensure_logging
+from .interface import CLIInterface
+
+# Команды, доступные через демон (остальные — только локально)
+DAEMON_COMMANDS = (
+    'register', 'login', 'logout', 'show-portfolio', 'get-rate',
+    'update-rates', 'show-rates', 'buy', 'sell', 'bulk-valuation',
+    'cache-stats', 'portfolio-history', 'risk', 'metrics', 'audit',
+)
+
+
+def default_socket_path() -> str:
+    return settings.get(
+        'daemon_socket',
+        os.path.join(settings.get('data_path', 'data'), 'valutatrade.sock')
+    )
+
+
+def daemon_running(socket_path: Optional[str] = None) -> bool:
+    """Принимает ли демон соединения (сокет от упавшего демона не считается)"""
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Построчный протокол: одна JSON-строка запроса — одна JSON-строка ответа"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                response = self.server.daemon.execute(
+                    request['command'], request.get('args') or {},
+                    request.get('token')
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"ok": False, "output": f"Ошибка протокола: {e}\n"}
+            self.wfile.write(
+                json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n'
+            )
+            self.wfile.flush()
+
+
+class TradingDaemon:
+    """
+    Долгоживущий процесс с тёплыми кэшами.
+
+    Реестр валют, настройки и логирование инициализируются один раз,
+    а users.json, portfolios.json и rates.json остаются разобранными
+    в памяти (DatabaseManager.enable_cache), поэтому команда не платит
+    ни за запуск интерпретатора, ни за разбор JSON. Команды выполняются
+    теми же методами CLIInterface, что и локально, последовательно
+    в одном потоке; их вывод возвращается клиенту.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.cli = CLIInterface()
+        self.requests = 0
+
+    def execute(self, command: str, args: Dict, token: Optional[str]) -> Dict:
+        if (command not in DAEMON_COMMANDS or 'watch' in args
+                or (command == 'metrics' and 'serve' in args)):
+            # Клиент выполнит такую команду локально (в том числе
+            # долгоживущие --watch и --serve, чтобы не занимать демон)
+            return {"ok": False, "unsupported": True, "output": ""}
+
+        self.cli.current_user = sessions.verify_token(token) if token else None
+        handler = getattr(self.cli, command.replace('-', '_'))
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            try:
+                ok = handler(args)
+            except Exception as e:
+                print(f"Ошибка: {e}")
+                ok = False
+        self.requests += 1
+        return {
+            "ok": ok is not False,
+            "output": output.getvalue(),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def warm_up(self):
+        from ..core.currencies import get_all_currencies
+
+        get_all_currencies()
+        DatabaseManager.read_users()
+        DatabaseManager.read_portfolios()
+        DatabaseManager.read_rates()
+
+    def serve_forever(self):
+        ensure_logging()
+        metrics.persist_at_exit()
+        DatabaseManager.enable_cache()
+        self.warm_up()
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or '.', exist_ok=True)
+
+        old_umask = os.umask(0o177)
+        try:
+            server = socketserver.UnixStreamServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        server.daemon = self
+        # SIGTERM завершает демон штатно: сокет удаляется, метрики сохраняются
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.socket_path)
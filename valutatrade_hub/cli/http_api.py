@@ -0,0 +1,357 @@
+# valutatrade_hub/cli/http_api.py
+import asyncio
+import contextlib
+import functools
+import json
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from ..core.currencies import get_currency
+from ..core.exceptions import (
+    ApiRequestError,
+    CurrencyNotFoundError,
+    ValutaTradeException,
+)
+from ..core.usecases import AuthUseCases, ExchangeUseCases, PortfolioUseCases
+from ..infra.metrics import API_REQUEST_LATENCY, metrics
+from ..infra.sessions import sessions
+from ..infra.settings import settings
+from ..logging_config import ensure_logging
+
+logger = logging.getLogger('valutatrade.api')
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        self.status = status
+        super().__init__(message)
+
+
+class _Request:
+    __slots__ = ('method', 'path', 'query', 'headers', 'body')
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str],
+                 body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip('/') or '/'
+        self.query = dict(parse_qsl(url.query))
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Dict[str, Any]:
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Тело запроса — не JSON")
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Тело запроса должно быть объектом")
+        return data
+
+
+class TradingApiServer:
+    """
+    HTTP/JSON API поверх use case (asyncio, без внешних зависимостей).
+
+    Разбор HTTP и маршрутизация выполняются в цикле событий, а use case
+    с их блокирующим файловым вводом-выводом и хешированием паролей —
+    в пуле потоков. Сделки одного пользователя выполняются строго
+    по очереди (asyncio.Lock на user_id), сделки разных пользователей
+    и все чтения — параллельно; общий portfolios.json защищён
+    DatabaseManager.locked() (потоки и процессы) на время
+    чтения-изменения-записи.
+
+    Аутентификация: POST /login возвращает токен сессии, который
+    передаётся в заголовке «Authorization: Bearer <токен>».
+    """
+
+    MAX_HEADER_BYTES = 16 * 1024
+    MAX_BODY_BYTES = 64 * 1024
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 workers: Optional[int] = None):
+        self.host = host or settings.get('api_host', '127.0.0.1')
+        self.port = port if port is not None else settings.get('api_port', 8080)
+        self.workers = workers or settings.get('api_workers', 8)
+        self.requests = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # user_id → [asyncio.Lock, число держащих и ждущих]
+        self._user_locks: Dict[int, list] = {}
+        self._routes: Dict[Tuple[str, str], Callable] = {
+            ('POST', '/register'): self._register,
+            ('POST', '/login'): self._login,
+            ('GET', '/portfolio'): self._portfolio,
+            ('GET', '/rate'): self._rate,
+            ('GET', '/rates'): self._rates,
+            ('POST', '/buy'): self._buy,
+            ('POST', '/sell'): self._sell,
+            ('GET', '/health'): self._health,
+        }
+
+    async def _run(self, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args)
+        )
+
+    @contextlib.asynccontextmanager
+    async def _user_lock(self, user_id: int):
+        """
+        Очередь сделок пользователя. Запись о блокировке удаляется, когда
+        её никто не держит и не ждёт: словарь не растёт с числом
+        пользователей, когда-либо торговавших через API.
+        """
+        entry = self._user_locks.get(user_id)
+        if entry is None:
+            entry = self._user_locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_locks[user_id]
+
+    @staticmethod
+    def _authenticate(request: _Request) -> Dict:
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        user = sessions.verify_token(token) if scheme.lower() == 'bearer' else None
+        if user is None:
+            raise HttpError(
+                HTTPStatus.UNAUTHORIZED, "Требуется действующий токен: POST /login"
+            )
+        return user
+
+    @staticmethod
+    def _trade_params(data: Dict) -> Tuple[str, float]:
+        currency = str(data.get('currency') or '').upper().strip()
+        if not currency:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Требуется поле currency")
+        try:
+            amount = float(data.get('amount'))
+        except (TypeError, ValueError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "amount должен быть числом")
+        return currency, amount
+
+    @staticmethod
+    def _credentials(data: Dict) -> Tuple[str, str]:
+        username, password = data.get('username'), data.get('password')
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise HttpError(
+                HTTPStatus.BAD_REQUEST, "Требуются поля username и password"
+            )
+        return username, password
+
+    async def _register(self, request: _Request):
+        username, password = self._credentials(request.json())
+        result = await self._run(AuthUseCases.register, username, password)
+        return HTTPStatus.CREATED, result
+
+    async def _login(self, request: _Request):
+        username, password = self._credentials(request.json())
+        user_info = await self._run(AuthUseCases.login, username, password)
+        if not user_info:
+            raise HttpError(
+                HTTPStatus.UNAUTHORIZED, "Неверное имя пользователя или пароль"
+            )
+        return HTTPStatus.OK, {
+            "user_id": user_info['user_id'],
+            "username": user_info['username'],
+            "token": sessions.issue_token(user_info['user_id'], user_info['username']),
+            "expires_in": sessions.ttl_seconds,
+        }
+
+    async def _portfolio(self, request: _Request):
+        user = self._authenticate(request)
+        base = (request.query.get('base')
+                or settings.get('default_base_currency', 'USD')).upper()
+        get_currency(base)
+        result = await self._run(
+            PortfolioUseCases.show_portfolio, user['user_id'], base
+        )
+        return HTTPStatus.OK, result
+
+    async def _rate(self, request: _Request):
+        from_currency = request.query.get('from', '').upper()
+        to_currency = request.query.get('to', '').upper()
+        if not from_currency or not to_currency:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Требуются параметры from и to")
+        result = await self._run(
+            PortfolioUseCases.get_exchange_rate, from_currency, to_currency
+        )
+        return HTTPStatus.OK, result
+
+    async def _rates(self, request: _Request):
+        from ..core.rates_query import rates_query
+
+        query = request.query
+        try:
+            limit = int(query.get('limit', settings.get('rates_page_size', 50)))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "limit должен быть числом")
+        page = await self._run(functools.partial(
+            rates_query.query,
+            asset_class=query.get('class'),
+            base=query.get('base'),
+            source=query.get('source'),
+            currency=query.get('currency'),
+            sort=query.get('sort', 'rate'),
+            descending=query.get('order', 'desc') != 'asc',
+            limit=limit,
+            cursor=query.get('cursor')
+        ))
+        return HTTPStatus.OK, page
+
+    async def _trade(self, request: _Request, use_case: Callable):
+        user = self._authenticate(request)
+        currency, amount = self._trade_params(request.json())
+        async with self._user_lock(user['user_id']):
+            result = await self._run(use_case, user['user_id'], currency, amount)
+        if not result.get('success'):
+            raise HttpError(
+                HTTPStatus.UNPROCESSABLE_ENTITY,
+                result.get('error', 'Неизвестная ошибка')
+            )
+        return HTTPStatus.OK, result
+
+    async def _buy(self, request: _Request):
+        return await self._trade(request, ExchangeUseCases.buy_currency)
+
+    async def _sell(self, request: _Request):
+        return await self._trade(request, ExchangeUseCases.sell_currency)
+
+    async def _health(self, request: _Request):
+        return HTTPStatus.OK, {"status": "ok", "requests": self.requests}
+
+    async def _dispatch(self, request: _Request) -> Tuple[HTTPStatus, Dict]:
+        handler = self._routes.get((request.method, request.path))
+        try:
+            if handler is None:
+                if any(path == request.path for _, path in self._routes):
+                    raise HttpError(
+                        HTTPStatus.METHOD_NOT_ALLOWED, "Метод не поддерживается"
+                    )
+                raise HttpError(HTTPStatus.NOT_FOUND, f"Нет ресурса {request.path}")
+            return await handler(request)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except ApiRequestError as e:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}
+        except (CurrencyNotFoundError, ValutaTradeException, ValueError) as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception:
+            logger.exception("Ошибка обработки %s %s", request.method, request.path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка"}
+
+    @staticmethod
+    def _render(status: HTTPStatus, payload: Dict, keep_alive: bool) -> bytes:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode('ascii') + body
+
+    async def _read_request(
+        self, reader: asyncio.StreamReader
+    ) -> Optional[Tuple[_Request, bool]]:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Слишком длинные заголовки"
+            )
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректная строка запроса")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Некорректный Content-Length")
+        if length > self.MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Слишком большое тело")
+        body = await reader.readexactly(length) if length else b''
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = (connection == 'keep-alive' if version == 'HTTP/1.0'
+                      else connection != 'close')
+        return _Request(method, target, headers, body), keep_alive
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    parsed = await self._read_request(reader)
+                except HttpError as e:
+                    writer.write(self._render(e.status, {"error": str(e)}, False))
+                    await writer.drain()
+                    break
+                if parsed is None:
+                    break
+
+                request, keep_alive = parsed
+                start = time.perf_counter()
+                status, payload = await self._dispatch(request)
+                self.requests += 1
+                API_REQUEST_LATENCY.observe(
+                    time.perf_counter() - start,
+                    route=f"{request.method} {request.path}"
+                    if (request.method, request.path) in self._routes else 'other',
+                    status=str(status.value)
+                )
+                writer.write(self._render(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _serve(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='api'
+        )
+        server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port,
+            limit=self.MAX_HEADER_BYTES
+        )
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # SIGTERM завершает сервер штатно: текущие запросы дорабатывают
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+        try:
+            async with server:
+                await server.start_serving()
+                await stop.wait()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def serve_forever(self):
+        ensure_logging()
+        metrics.persist_at_exit()
+        asyncio.run(self._serve())
@@ -1,11 +1,7 @@
 # valutatrade_hub/cli/interface.py
-import json
-import os
+from datetime import datetime
 from typing import Optional
 
-from valutatrade_hub.parser_service.config import ParserConfig
-from valutatrade_hub.parser_service.updater import RatesUpdater
-
 from ..core.currencies import (
     CryptoCurrency,
     FiatCurrency,
@@ -17,11 +13,12 @@ from ..core.exceptions import (
     ValutaTradeException,
 )
 from ..core.usecases import AuthUseCases, ExchangeUseCases, PortfolioUseCases
+from ..infra.sessions import sessions
 
 
 class CLIInterface:
     def __init__(self):
-        self.current_user: Optional[dict] = None
+        self.current_user: Optional[dict] = sessions.restore()
     
     def _parse_args(self, args):
         parsed = {}
@@ -74,7 +71,11 @@ class CLIInterface:
             user_info = AuthUseCases.login(username, password)
             if user_info:
                 self.current_user = user_info
+                token = sessions.save(user_info['user_id'], user_info['username'])
                 print(f"Вы вошли как '{username}'")
+                if args_dict.get('print-token'):
+                    # Для оболочки: eval "$(main.py login ... --print-token | tail -1)"
+                    print(f"export {sessions.ENV_VAR}={token}")
                 return True
             else:
                 print("Неверное имя пользователя или пароль")
@@ -83,47 +84,165 @@ class CLIInterface:
             print(f"Ошибка: {e}")
             return False
     
+    def import_users(self, args_dict):
+        path = args_dict.get('file')
+        if not path:
+            print("Ошибка: требуется --file <users.csv|users.jsonl>")
+            return False
+        
+        try:
+            workers = int(args_dict['workers']) if args_dict.get('workers') else None
+        except ValueError:
+            print("Ошибка: параметр --workers должен быть числом")
+            return False
+        
+        try:
+            records = AuthUseCases.read_import_file(path)
+            result = AuthUseCases.bulk_register(records, workers)
+        except FileNotFoundError:
+            print(f"Ошибка: файл '{path}' не найден")
+            return False
+        except Exception as e:
+            print(f"Ошибка импорта: {e}")
+            return False
+        
+        for error in result['errors'][:20]:
+            print(f"  строка {error['line']}: {error['error']}")
+        if len(result['errors']) > 20:
+            print(f"  ... и ещё {len(result['errors']) - 20} ошибок")
+        
+        print(f"Импортировано пользователей: {result['imported']}, пропущено: {len(result['errors'])}") # noqa: E501
+        print(f"Время: {result['elapsed']:.2f} с ({result['users_per_second']:,.0f} пользователей/с)") # noqa: E501
+        return result['imported'] > 0
+    
+    def logout(self, args_dict):
+        sessions.clear()
+        if not self.current_user:
+            print("Вы не были авторизованы")
+            return False
+        print(f"Вы вышли из аккаунта '{self.current_user['username']}'")
+        self.current_user = None
+        return True
+    
     def show_portfolio(self, args_dict):
         if not self.current_user:
             print("Сначала выполните login")
             return False
         
         base_currency = args_dict.get('base', 'USD').upper()
+        user_id = self.current_user['user_id']
         
-        try:
-            result = PortfolioUseCases.show_portfolio(
-                self.current_user['user_id'], 
-                base_currency
+        if 'watch' in args_dict:
+            from ..infra.database import db as DatabaseManager
+            
+            shown = {}
+            
+            def render():
+                # Пока не менялись ни портфель пользователя, ни курсы,
+                # valuation_cache отдаёт тот же объект результата
+                result = PortfolioUseCases.show_portfolio(user_id, base_currency)
+                if shown.get('result') is result:
+                    return None
+                shown['result'] = result
+                return "\n".join(self._portfolio_lines(result, base_currency))
+            
+            return self._watch(
+                [DatabaseManager._get_path('portfolios.json'),
+                 DatabaseManager._get_path('rates.json')],
+                render
             )
-            
-            print(f"Портфель пользователя '{self.current_user['username']}' (база: {base_currency}):") # noqa: E501
-            
-            if not result['wallets']:
-                print("Портфель пуст")
-            else:
-                for wallet in result['wallets']:
-                    try:
-                        currency_obj = get_currency(wallet['currency'])
-                        
-                        if isinstance(currency_obj, FiatCurrency):
-                            currency_type = "[FIAT]"
-                        elif isinstance(currency_obj, CryptoCurrency):
-                            currency_type = "[CRYPTO]"
-                        else:
-                            currency_type = "[?]"
-                    except CurrencyNotFoundError:
-                        currency_type = "[?]"
-                    
-                    if wallet['value_in_base'] > 0:
-                        print(f"- {currency_type} {wallet['currency']}: {wallet['balance']:.4f}  → {wallet['value_in_base']:.2f} {base_currency}") # noqa: E501
-                    else:
-                        print(f"- {currency_type} {wallet['currency']}: {wallet['balance']:.4f}") # noqa: E501
         
-            print(f"ИТОГО: {result['total_value']:,.2f} {base_currency}")
+        try:
+            result = PortfolioUseCases.show_portfolio(user_id, base_currency)
+            for line in self._portfolio_lines(result, base_currency):
+                print(line)
             return True
         except Exception as e:
             print(f"Ошибка: {e}")
             return False
+    
+    def _portfolio_lines(self, result, base_currency):
+        lines = [f"Портфель пользователя '{self.current_user['username']}' (база: {base_currency}):"] # noqa: E501
+        
+        if not result['wallets']:
+            lines.append("Портфель пуст")
+        else:
+            for wallet in result['wallets']:
+                try:
+                    currency_obj = get_currency(wallet['currency'])
+                    
+                    if isinstance(currency_obj, FiatCurrency):
+                        currency_type = "[FIAT]"
+                    elif isinstance(currency_obj, CryptoCurrency):
+                        currency_type = "[CRYPTO]"
+                    else:
+                        currency_type = "[?]"
+                except CurrencyNotFoundError:
+                    currency_type = "[?]"
+                
+                if wallet['value_in_base'] > 0:
+                    line = f"- {currency_type} {wallet['currency']}: {wallet['balance']:.4f}  → {wallet['value_in_base']:.2f} {base_currency}" # noqa: E501
+                else:
+                    line = f"- {currency_type} {wallet['currency']}: {wallet['balance']:.4f}" # noqa: E501
+                
+                if wallet['unrealized_pnl'] is not None:
+                    line += f" | P&L: {wallet['unrealized_pnl']:+.2f} {base_currency} (себест. {wallet['cost_basis']:.2f})" # noqa: E501
+                if wallet.get('untracked_balance'):
+                    line += f" | P&L n/a для {wallet['untracked_balance']:.4f} без себестоимости" # noqa: E501
+                if wallet['realized_pnl']:
+                    line += f" | реализ.: {wallet['realized_pnl']:+.2f} {base_currency}" # noqa: E501
+                lines.append(line)
+        
+        lines.append(f"ИТОГО: {result['total_value']:,.2f} {base_currency}")
+        lines.append(f"P&L нереализованный: {result['total_unrealized_pnl']:+,.2f} {base_currency}, реализованный: {result['total_realized_pnl']:+,.2f} {base_currency}") # noqa: E501
+        return lines
+    
+    def _watch(self, paths, render):
+        """
+        Режим --watch: render() вызывается при старте и после каждого
+        изменения файлов paths (inotify или опрос stat, без таймера
+        перечитывания) и возвращает текст экрана или None, если
+        показывать нечего нового. Экран перерисовывается, только когда
+        текст изменился.
+        """
+        import sys
+        
+        from ..infra.database import db as DatabaseManager
+        from ..infra.settings import settings
+        from ..infra.watcher import FileWatcher
+        
+        # Кэш разобранных файлов — только на время наблюдения: остальные
+        # команды интерактивной сессии читают файлы как обычно
+        cache_was_enabled = DatabaseManager.cache_enabled
+        DatabaseManager.enable_cache()
+        watcher = FileWatcher(
+            paths,
+            poll_interval=settings.get('watch_poll_interval', 0.5),
+            use_inotify=settings.get('watch_inotify', True)
+        )
+        interactive = sys.stdout.isatty()
+        screen = None
+        try:
+            while True:
+                try:
+                    text = render()
+                except Exception as e:
+                    text = f"Ошибка: {e}"
+                if text is not None and text != screen:
+                    screen = text
+                    if interactive:
+                        print("\033[H\033[J", end='')
+                    print(screen)
+                    print(f"(обновлено {datetime.now():%H:%M:%S}, наблюдение: {watcher.mode}; Ctrl+C — выход)") # noqa: E501
+                    sys.stdout.flush()
+                watcher.wait()
+        except KeyboardInterrupt:
+            print()
+            return True
+        finally:
+            watcher.close()
+            if not cache_was_enabled:
+                DatabaseManager.disable_cache()
 
     def update_rates(self, args_dict):
         source = args_dict.get('source') 
@@ -131,6 +250,9 @@ class CLIInterface:
         print("Начало обновления курсов...")
         
         try:
+            # requests и API-клиенты нужны только этой команде
+            from ..parser_service.updater import RatesUpdater
+
             updater = RatesUpdater()
             
             sources = None
@@ -306,6 +428,7 @@ class CLIInterface:
                     print("Изменения в портфеле:")
                     print(f"- {currency}: было {result['old_balance']:.4f} → стало {result['new_balance']:.4f}") # noqa: E501
                     print(f"Оценочная выручка: {result['revenue_usd']:.2f} USD")
+                    print(f"Реализованный P&L: {result['realized_pnl']:+.2f} USD")
                 else:
                     print(f"Продажа выполнена: {amount:.4f} {currency}")
                     print("Изменения в портфеле:")
@@ -325,6 +448,8 @@ class CLIInterface:
         print("\nПоддерживаемые валюты:")
         
         try:
+            from ..parser_service.config import ParserConfig
+
             config = ParserConfig()
             
             print(f"\nФиатные валюты (база: {config.BASE_CURRENCY}):")
@@ -369,70 +494,463 @@ class CLIInterface:
             except Exception:
                 print("Не удалось получить список валют. Проверьте настройки парсера.")
     def show_rates(self, args_dict):
+        from ..core.rates_query import rates_query
+        from ..infra.settings import settings
+
+        def option(name):
+            value = args_dict.get(name)
+            return value if isinstance(value, str) and value else None
+        
+        limit = option('top') or option('limit')
         try:
-            if not os.path.exists('data/rates.json'):
-                print("Локальный кэш курсов пуст.")
-                print("Выполните 'update-rates', чтобы загрузить данные.")
-                return False
-            
-            with open('data/rates.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            currency_filter = args_dict.get('currency', '').upper()
-            top_count = args_dict.get('top')
-            
-            if top_count:
-                try:
-                    top_count = int(top_count)
-                except ValueError:
-                    print("Ошибка: параметр --top должен быть числом")
-                    return False
-            
-            pairs = data.get('pairs', {})
-            
-            if not pairs:
-                print("Кэш курсов пуст.")
-                print("Выполните 'update-rates', чтобы загрузить данные.")
+            limit = int(limit) if limit else settings.get('rates_page_size', 50)
+        except ValueError:
+            print("Ошибка: параметры --top и --limit должны быть числами")
+            return False
+        
+        query = {
+            'asset_class': option('class'),
+            'base': option('base'),
+            'source': option('source'),
+            'currency': option('currency'),
+            'sort': option('sort') or 'rate',
+            'descending': 'asc' not in args_dict,
+            'limit': None if 'all' in args_dict else limit,
+            'cursor': option('cursor'),
+        }
+        
+        try:
+            page = rates_query.query(**query)
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return False
+        except Exception as e:
+            print(f"Ошибка при отображении курсов: {e}")
+            return False
+        
+        if 'watch' in args_dict:
+            from ..infra.database import db as DatabaseManager
+            
+            rendered = {}
+            
+            def render_row(row):
+                # Текст строки пересобирается, только если изменился её курс;
+                # стрелка показывает направление последнего изменения
+                state = (row['rate'], row['updated_at'], row['source'])
+                cached = rendered.get(row['pair'])
+                if cached is None or cached[0] != state:
+                    marker = ''
+                    if cached is not None and cached[0][0] != row['rate']:
+                        marker = ' ▲' if row['rate'] > cached[0][0] else ' ▼'
+                    cached = rendered[row['pair']] = (
+                        state, self._rate_block(row, marker)
+                    )
+                return cached[1]
+            
+            def render():
+                text, _ = self._rates_page_text(
+                    rates_query.query(**query), query['currency'], render_row
+                )
+                return text
+            
+            return self._watch([DatabaseManager._get_path('rates.json')], render)
+        
+        text, ok = self._rates_page_text(page, query['currency'], self._rate_block)
+        print(text)
+        return ok
+    
+    @staticmethod
+    def _rate_block(row, marker=''):
+        return (
+            f"  {row['from']} → {row['to']}:\n"
+            f"    Курс: {row['rate']:.6f}{marker}\n"
+            f"    Обновлен: {row['updated_at']}\n"
+            f"    Источник: {row['source']}\n" + "-" * 40
+        )
+    
+    @staticmethod
+    def _rates_page_text(page, currency_filter, render_row):
+        if not page['total']:
+            return (
+                "Локальный кэш курсов пуст.\n"
+                "Выполните 'update-rates', чтобы загрузить данные."
+            ), False
+        
+        if not page['matched']:
+            if currency_filter:
+                return f"Курс для '{currency_filter.upper()}' не найден в кеше.", False
+            return "Курсы по заданным фильтрам не найдены в кеше.", False
+        
+        lines = [
+            f"\nКурсы валют из кэша (обновлено: {page['last_refresh']}):",
+            "=" * 60,
+        ]
+        lines.extend(render_row(row) for row in page['rows'])
+        lines.append(f"Показано курсов: {page['shown']} из {page['matched']}")
+        if page['next_cursor']:
+            lines.append(f"Следующая страница: --cursor {page['next_cursor']}")
+        return "\n".join(lines), True
+    
+    def rate_events(self, args_dict):
+        import sys
+        
+        from ..infra.database import db as DatabaseManager
+        from ..infra.rate_events import RateChangeNotifier
+        
+        try:
+            timeout = float(args_dict['timeout']) if args_dict.get('timeout') else None
+        except ValueError:
+            print("Ошибка: --timeout ожидает число секунд")
+            return False
+        
+        notifier = RateChangeNotifier(DatabaseManager._get_path('rates.json'))
+        current = notifier.current()
+        if current:
+            print(f"Текущая версия курсов: {current['version']} ({current['published_at']})") # noqa: E501
+        print("Ожидание обновлений курсов (Ctrl+C — выход)...")
+        sys.stdout.flush()
+        
+        received = 0
+        try:
+            with notifier.subscribe() as subscription:
+                while True:
+                    event = subscription.get(timeout)
+                    if event is None:
+                        print(f"Время ожидания истекло, получено обновлений: {received}") # noqa: E501
+                        return received > 0
+                    received += 1
+                    if event['changed'] is None:
+                        changed = "пропущены события, перечитайте все курсы" if event.get('missed') else "изменились все курсы" # noqa: E501
+                    elif event['changed']:
+                        changed = f"изменилось пар: {len(event['changed'])} — {', '.join(event['changed'][:20])}" # noqa: E501
+                        if len(event['changed']) > 20:
+                            changed += ", ..."
+                    else:
+                        changed = "курсы не изменились"
+                    print(f"[{datetime.now():%H:%M:%S}] версия {event['version']}: {changed}") # noqa: E501
+                    sys.stdout.flush()
+                    if 'once' in args_dict:
+                        return True
+        except KeyboardInterrupt:
+            print()
+            return True
+    
+    def bulk_valuation(self, args_dict):
+        from ..core.valuation import BulkValuation
+
+        bases = [
+            code.strip().upper()
+            for code in args_dict.get('base', 'USD').split(',')
+            if code.strip()
+        ]
+        
+        try:
+            top_n = int(args_dict.get('top', 10))
+            batch_size = int(args_dict.get('batch-size', 50_000))
+        except ValueError:
+            print("Ошибка: параметры --top и --batch-size должны быть числами")
+            return False
+        
+        try:
+            valuation = BulkValuation(bases, batch_size=batch_size, top_n=top_n)
+            result = valuation.run(args_dict.get('output'))
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return False
+        except Exception as e:
+            print(f"Ошибка при оценке портфелей: {e}")
+            return False
+        
+        primary = result['base_currencies'][0]
+        print(f"\nОценено портфелей: {result['users']}")
+        if result['skipped_wallets']:
+            print(f"Пропущено кошельков с неизвестной валютой: {result['skipped_wallets']}") # noqa: E501
+        
+        print("Суммарная стоимость:")
+        for base, total in result['totals'].items():
+            print(f"  {total:,.2f} {base}")
+        
+        print(f"\nAUM по валютам (в {primary}):")
+        for code, info in sorted(
+            result['aum'].items(), key=lambda x: x[1]['value'], reverse=True
+        ):
+            print(f"  {code}: {info['balance']:,.4f} → {info['value']:,.2f} {primary}")
+        
+        if result['leaderboard']:
+            print(f"\nТоп-{len(result['leaderboard'])} портфелей ({primary}):")
+            for place, entry in enumerate(result['leaderboard'], start=1):
+                print(f"  {place}. user_id={entry['user_id']}: {entry['value']:,.2f}")
+        
+        if args_dict.get('output'):
+            print(f"\nОценки по пользователям сохранены в {args_dict['output']}")
+        return True
+
+    def cache_stats(self, args_dict):
+        from ..core.valuation_cache import valuation_cache
+
+        stats = valuation_cache.stats()
+        print("\nКэш оценок портфелей:")
+        print(f"  Запросов: {stats['requests']} (записей в кэше: {stats['entries']})")
+        print(f"  Попаданий: {stats['hits']} по файлам, {stats['version_hits']} по версиям") # noqa: E501
+        print(f"  Частичных пересчётов: {stats['partial']}, промахов: {stats['misses']}") # noqa: E501
+        print(f"  Hit rate: {stats['hit_rate']:.1%}")
+        print(f"  Строк переиспользовано: {stats['rows_reused']}, пересчитано: {stats['rows_recomputed']} ({stats['row_reuse_rate']:.1%} повторно)") # noqa: E501
+        return True
+
+    def portfolio_history(self, args_dict):
+        if not self.current_user:
+            print("Сначала выполните login")
+            return False
+        
+        from datetime import datetime
+
+        import numpy as np
+
+        from ..core.history import PortfolioHistory
+        from ..parser_service.config import ParserConfig
+        from ..parser_service.storage import RatesStorage
+
+        base_currency = args_dict.get('base', 'USD').upper()
+        resolution = args_dict.get('resolution', '1h')
+        output_path = args_dict.get('output')
+        
+        try:
+            start = datetime.fromisoformat(args_dict['from']) if args_dict.get('from') else None # noqa: E501
+            end = datetime.fromisoformat(args_dict['to']) if args_dict.get('to') else None # noqa: E501
+            limit = int(args_dict.get('limit', 50))
+        except ValueError:
+            print("Ошибка: --from/--to должны быть в формате ISO, --limit — числом")
+            return False
+        
+        try:
+            portfolio = PortfolioUseCases._load_portfolio(self.current_user['user_id'])
+            balances = portfolio.balances()
+            if not any(balances.values()):
+                print("Портфель пуст")
                 return False
             
-            filtered_pairs = {}
-            for pair, info in pairs.items():
-                if currency_filter:
-                    from_curr, to_curr = pair.split('_')
-                    if from_curr != currency_filter and to_curr != currency_filter:
-                        continue
-                filtered_pairs[pair] = info
-            
-            if not filtered_pairs:
-                print(f"Курс для '{currency_filter}' не найден в кеше.")
+            config = ParserConfig()
+            history = PortfolioHistory(
+                RatesStorage(config.RATES_FILE_PATH, config.HISTORY_FILE_PATH)
+            )
+            times, values = history.value_series(
+                balances, base_currency, resolution, start, end
+            )
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return False
+        except Exception as e:
+            print(f"Ошибка при расчёте истории портфеля: {e}")
+            return False
+        
+        if output_path:
+            PortfolioHistory.write_csv(output_path, times, values, base_currency)
+            print(f"Временной ряд ({len(times)} точек) сохранён в {output_path}")
+        
+        print(f"\nСтоимость портфеля '{self.current_user['username']}' по текущим балансам (база: {base_currency}, шаг: {resolution}):") # noqa: E501
+        labels = np.datetime_as_string(times, unit='s')
+        shown = range(max(len(times) - limit, 0), len(times))
+        if len(times) > limit:
+            print(f"  ... показаны последние {limit} из {len(times)} точек")
+        for i in shown:
+            value = f"{values[i]:,.2f}" if not np.isnan(values[i]) else "нет данных"
+            print(f"  {labels[i]}  {value}")
+        
+        valid = values[~np.isnan(values)]
+        if len(valid):
+            print(f"Мин: {valid.min():,.2f}  Макс: {valid.max():,.2f}  Последнее: {valid[-1]:,.2f} {base_currency}") # noqa: E501
+        return True
+
+    def risk(self, args_dict):
+        from ..core.risk import RiskAnalytics
+        from ..parser_service.config import ParserConfig
+        from ..parser_service.storage import RatesStorage
+
+        base_currency = args_dict.get('base', 'USD').upper()
+        resolution = args_dict.get('resolution', '1d')
+        
+        try:
+            window = int(args_dict.get('window', 30))
+        except ValueError:
+            print("Ошибка: параметр --window должен быть числом")
+            return False
+        
+        try:
+            config = ParserConfig()
+            analytics = RiskAnalytics(
+                RatesStorage(config.RATES_FILE_PATH, config.HISTORY_FILE_PATH)
+            )
+            model = analytics.model(base_currency, resolution, window)
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return False
+        except Exception as e:
+            print(f"Ошибка при расчёте риска: {e}")
+            return False
+        
+        codes = model['codes']
+        print(f"\nРиск-метрики (база: {base_currency}, шаг: {resolution}, наблюдений: {model['observations']}, окно: {model['window']}):") # noqa: E501
+        print("Волатильность (за шаг / годовая):")
+        for i, code in enumerate(codes):
+            print(f"  {code:>5}: {model['volatility'][i]:8.4%}  {model['volatility_annual'][i]:8.2%}") # noqa: E501
+        
+        print("\nКорреляции:")
+        print("       " + "".join(f"{code:>7}" for code in codes))
+        for i, code in enumerate(codes):
+            row = "".join(
+                f"{value:7.2f}" if value == value else f"{'—':>7}"
+                for value in model['correlation'][i]
+            )
+            print(f"  {code:>5}{row}")
+        
+        if self.current_user:
+            portfolio = PortfolioUseCases._load_portfolio(self.current_user['user_id'])
+            balances = portfolio.balances()
+            var = analytics.value_at_risk(balances, base_currency, resolution, window)
+            print(f"\n1-дневный VaR портфеля '{self.current_user['username']}' (под риском: {var['exposure']:,.2f} {base_currency}):") # noqa: E501
+            for level in var['historical']:
+                print(f"  {level:.0%}: исторический {var['historical'][level]:,.2f}, параметрический {var['parametric'][level]:,.2f} {base_currency}") # noqa: E501
+        else:
+            print("\nВыполните login, чтобы рассчитать VaR своего портфеля")
+        return True
+
+    def metrics(self, args_dict):
+        from ..infra.metrics import metrics
+
+        if 'reset' in args_dict:
+            metrics.clear_persisted()
+            print("Накопленные метрики сброшены")
+            return True
+        
+        if args_dict.get('serve'):
+            host = args_dict.get('host') or '127.0.0.1'
+            try:
+                port = int(args_dict['serve'])
+            except ValueError:
+                print("Ошибка: --serve ожидает номер порта")
                 return False
-            
-            sorted_pairs = sorted(
-                filtered_pairs.items(),
-                key=lambda x: x[1]['rate'],
-                reverse=True
+            metrics.persist()
+            print(f"Метрики доступны на http://{host}:{port}/metrics (Ctrl+C — остановить)") # noqa: E501
+            try:
+                metrics.serve(host, port)
+            except KeyboardInterrupt:
+                pass
+            return True
+        
+        combined = metrics.combined()
+        if args_dict.get('export'):
+            combined.write_prometheus(args_dict['export'])
+            print(f"Метрики в формате Prometheus сохранены в {args_dict['export']}")
+            return True
+        
+        latency = combined.get('valutatrade_action_duration_seconds')
+        totals = combined.get('valutatrade_actions_total')
+        if latency is None or not latency.samples():
+            print("Метрик пока нет: их накапливают демон (serve), HTTP API (api), --script и интерактивный режим") # noqa: E501
+            return True
+        
+        errors = {
+            key[0]: value for key, value in (totals.samples() if totals else [])
+            if key[1] == 'ERROR'
+        }
+        print("\nЗадержки use case (мс):")
+        print(f"  {'действие':<16}{'вызовов':>9}{'ошибок':>8}{'p50':>10}{'p95':>10}{'p99':>10}") # noqa: E501
+        for key, value in sorted(latency.samples()):
+            count = sum(value['counts'])
+            p50, p95, p99 = (latency.quantile(q, key) * 1000 for q in (0.5, 0.95, 0.99))
+            print(f"  {key[0]:<16}{count:>9}{int(errors.get(key[0], 0)):>8}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}") # noqa: E501
+        
+        storage = combined.get('valutatrade_storage_duration_seconds')
+        moved_bytes = {
+            op: dict(metric.samples()) if metric else {}
+            for op, metric in (
+                ('read', combined.get('valutatrade_storage_read_bytes_total')),
+                ('write', combined.get('valutatrade_storage_written_bytes_total')),
             )
-            
-            if top_count:
-                sorted_pairs = sorted_pairs[:top_count]
-            
-            print(f"\nКурсы валют из кэша (обновлено: {data.get('last_refresh')}):")
-            print("=" * 60)
-            
-            for pair, info in sorted_pairs:
-                from_curr, to_curr = pair.split('_')
-                print(f"  {from_curr} → {to_curr}:")
-                print(f"    Курс: {info['rate']:.6f}")
-                print(f"    Обновлен: {info['updated_at']}")
-                print(f"    Источник: {info['source']}")
-                print("-" * 40)
-            
-            print(f"Всего курсов: {len(sorted_pairs)}")
+        }
+        if storage and storage.samples():
+            print("\nХранилище:")
+            print(f"  {'файл':<22}{'операция':<10}{'раз':>7}{'p95, мс':>10}{'байт':>14}") # noqa: E501
+            for key, value in sorted(storage.samples()):
+                filename, op = key
+                moved = moved_bytes[op].get((filename,), 0)
+                p95 = storage.quantile(0.95, key) * 1000
+                print(f"  {filename:<22}{op:<10}{sum(value['counts']):>7}{p95:>10.2f}{int(moved):>14,}") # noqa: E501
+        return True
+
+    def audit(self, args_dict):
+        from datetime import datetime
+
+        from ..infra.audit_index import AuditLogIndex
+        from ..infra.settings import settings
+
+        index = AuditLogIndex()
+        if 'reindex' in args_dict:
+            stats = index.rebuild()
+            print(f"Индекс перестроен: сегментов {stats['segments']}, блоков {stats['blocks']}, {stats['indexed_bytes']:,} байт") # noqa: E501
+        
+        try:
+            user_id = int(args_dict['user-id']) if args_dict.get('user-id') else None
+            limit = int(args_dict.get('limit') or 100)
+            start = args_dict.get('from') or None
+            end = args_dict.get('to') or None
+            for value in (start, end):
+                if value:
+                    datetime.fromisoformat(value)
+        except ValueError:
+            print("Ошибка: --user-id и --limit — целые числа, --from/--to — даты ISO 8601") # noqa: E501
+            return False
+        if end and len(end) == 10:
+            end += 'T23:59:59.999999'
+        action = args_dict['action'].upper() if args_dict.get('action') else None
+        
+        records = list(index.query(
+            action=action, user_id=user_id, start=start, end=end,
+            username=args_dict.get('username') or None, limit=limit
+        ))
+        if not records:
+            print("Записей не найдено")
+            if settings.get('log_format', '').lower() != 'json':
+                print("Индексируются только записи в формате JSON: установите \"log_format\": \"json\" в data/config.json") # noqa: E501
             return True
-            
-        except json.JSONDecodeError:
-            print("Ошибка чтения файла с курсами. Файл поврежден.")
+        
+        print(f"\nНайдено записей: {len(records)}" + (" (достигнут --limit)" if len(records) == limit else "")) # noqa: E501
+        for record in records:
+            who = record.get('user_id', record.get('username', '-'))
+            details = " ".join(
+                f"{key}={record[key]}" for key in ('currency_code', 'amount', 'rate')
+                if key in record
+            )
+            print(f"  {record.get('timestamp', '')[:19]}  {record.get('action', '-'):<9} user={who:<6} {record.get('result', '-'):<5} {details}") # noqa: E501
+        return True
+
+    def serve(self, args_dict):
+        from .daemon import TradingDaemon
+
+        socket_path = args_dict.get('socket')
+        daemon = TradingDaemon(socket_path if isinstance(socket_path, str) else None)
+        print(f"Демон слушает {daemon.socket_path} (Ctrl+C — остановить)")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\nДемон остановлен, обработано команд: {daemon.requests}")
+        return True
+
+    def api(self, args_dict):
+        from .http_api import TradingApiServer
+
+        try:
+            port = int(args_dict['port']) if args_dict.get('port') else None
+            workers = int(args_dict['workers']) if args_dict.get('workers') else None
+        except ValueError:
+            print("Ошибка: --port и --workers должны быть числами")
             return False
-        except Exception as e:
-            print(f"Ошибка при отображении курсов: {e}")
-            return False
\ No newline at end of file
+        
+        server = TradingApiServer(args_dict.get('host') or None, port, workers)
+        print(f"HTTP API на http://{server.host}:{server.port} (Ctrl+C — остановить)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(f"API остановлен, обработано запросов: {server.requests}")
+        return True
@@ -1,6 +1,9 @@
 # valutatrade_hub/core/currencies.py
+import json
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List, Optional
 
 from .exceptions import CurrencyNotFoundError
 
@@ -101,51 +104,137 @@ class CryptoCurrency(Currency):
                 f"algorithm='{self.algorithm}', market_cap={self.market_cap})")
 
 
+CURRENCIES_FILE_NAME = "currencies.json"
+
 _CURRENCY_REGISTRY: Dict[str, Currency] = {}
+_DEFINITIONS: Dict[str, dict] = {}
+_ORDINALS: Dict[str, int] = {}
+_CODES: List[str] = []
+_loaded = False
+_lock = threading.Lock()
+
+
+def currencies_file_path() -> str:
+    from ..infra.settings import settings
+
+    return os.path.join(settings.get('data_path', 'data'), CURRENCIES_FILE_NAME)
+
+
+def load_currency_definitions(path: Optional[str] = None) -> List[dict]:
+    """
+    Описания валют из currencies.json в каталоге данных — единый источник
+    для реестра и для ParserConfig (списки фиатных/крипто валют, id
+    в CoinGecko). Без этого файла реестр пуст, поэтому его отсутствие —
+    ошибка, а не пустой список.
+    """
+    path = path or currencies_file_path()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Не найден файл описаний валют: {path}")
+    with open(path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+    if not isinstance(definitions, list):
+        raise ValueError(f"Файл описаний валют {path} должен содержать список")
+    return definitions
+
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        for definition in load_currency_definitions():
+            _add_definition(definition)
+        _loaded = True
+
+
+def _add_definition(definition: dict) -> None:
+    code = definition['code'].upper()
+    if code not in _ORDINALS:
+        _ORDINALS[code] = len(_CODES)
+        _CODES.append(code)
+    _DEFINITIONS[code] = definition
+    _CURRENCY_REGISTRY.pop(code, None)
+
+
+def _build_currency(definition: dict) -> Currency:
+    if definition.get('type') == 'crypto':
+        return CryptoCurrency(
+            definition['name'],
+            definition['code'],
+            definition.get('algorithm', 'unknown'),
+            market_cap=definition.get('market_cap', 0.0)
+        )
+    return FiatCurrency(
+        definition['name'],
+        definition['code'],
+        definition.get('issuing_country', 'unknown')
+    )
 
 
 def register_currency(currency: Currency) -> None:
+    _ensure_loaded()
+    if currency.code not in _ORDINALS:
+        _ORDINALS[currency.code] = len(_CODES)
+        _CODES.append(currency.code)
     _CURRENCY_REGISTRY[currency.code] = currency
 
 
 def get_currency(code: str) -> Currency:
+    _ensure_loaded()
     code_upper = code.upper()
-    if code_upper not in _CURRENCY_REGISTRY:
-        raise CurrencyNotFoundError(code) 
-    return _CURRENCY_REGISTRY[code_upper]
+    currency = _CURRENCY_REGISTRY.get(code_upper)
+    if currency is None:
+        definition = _DEFINITIONS.get(code_upper)
+        if definition is None:
+            raise CurrencyNotFoundError(code) 
+        currency = _CURRENCY_REGISTRY[code_upper] = _build_currency(definition)
+    return currency
 
 def get_all_currencies() -> Dict[str, Currency]:
-    return _CURRENCY_REGISTRY.copy()
-
-
-def _initialize_currency_registry():
-    fiats = [
-        FiatCurrency("US Dollar", "USD", "United States"),
-        FiatCurrency("Euro", "EUR", "Eurozone"),
-        FiatCurrency("British Pound", "GBP", "United Kingdom"),
-        FiatCurrency("Japanese Yen", "JPY", "Japan"),
-        FiatCurrency("Swiss Franc", "CHF", "Switzerland"),
-        FiatCurrency("Canadian Dollar", "CAD", "Canada"),
-        FiatCurrency("Australian Dollar", "AUD", "Australia"),
-        FiatCurrency("Russian Ruble", "RUB", "Russia"),
-        FiatCurrency("Chinese Yuan", "CNY", "China"),
-    ]
-    
-    cryptos = [
-        CryptoCurrency("Bitcoin", "BTC", "SHA-256", market_cap=1.12e12),
-        CryptoCurrency("Ethereum", "ETH", "Ethash", market_cap=4.2e11),
-        CryptoCurrency("Binance Coin", "BNB", "BEP-20", market_cap=8.5e10),
-        CryptoCurrency("Cardano", "ADA", "Ouroboros", market_cap=3.2e10),
-        CryptoCurrency("Solana", "SOL", "Proof of History", market_cap=7.8e10),
-        CryptoCurrency("Ripple", "XRP", "XRP Ledger", market_cap=4.5e10),
-        CryptoCurrency("Polkadot", "DOT", "Nominated Proof-of-Stake", market_cap=2.9e10), # noqa: E501
-        CryptoCurrency("Dogecoin", "DOGE", "Scrypt", market_cap=2.3e10),
+    _ensure_loaded()
+    return {code: get_currency(code) for code in _CODES}
+
+
+def get_currency_codes(currency_type: Optional[str] = None) -> List[str]:
+    """
+    Коды валют в порядке их ординалов, без создания объектов валют.
+    currency_type: 'fiat' или 'crypto' для фильтрации.
+    """
+    _ensure_loaded()
+    if currency_type is None:
+        return list(_CODES)
+    return [
+        code for code in _CODES
+        if _currency_type(code) == currency_type
     ]
-    
-    for fiat in fiats:
-        register_currency(fiat)
-    
-    for crypto in cryptos:
-        register_currency(crypto)
 
-_initialize_currency_registry()
\ No newline at end of file
+
+def _currency_type(code: str) -> str:
+    if code in _DEFINITIONS:
+        return _DEFINITIONS[code].get('type', 'fiat')
+    return 'crypto' if isinstance(_CURRENCY_REGISTRY[code], CryptoCurrency) else 'fiat'
+
+
+def get_currency_ordinal(code: str) -> int:
+    """Плотный целочисленный индекс валюты (0..N-1) для работы с массивами"""
+    _ensure_loaded()
+    ordinal = _ORDINALS.get(code.upper())
+    if ordinal is None:
+        raise CurrencyNotFoundError(code)
+    return ordinal
+
+
+def get_currency_code(ordinal: int) -> str:
+    _ensure_loaded()
+    return _CODES[ordinal]
+
+
+def get_crypto_id_map() -> Dict[str, str]:
+    _ensure_loaded()
+    return {
+        code: definition['coingecko_id']
+        for code, definition in _DEFINITIONS.items()
+        if definition.get('coingecko_id')
+    }
@@ -0,0 +1,159 @@
+# valutatrade_hub/core/history.py
+import csv
+import re
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..parser_service.storage import RatesStorage
+from .currencies import FiatCurrency, get_currency
+from .exceptions import CurrencyNotFoundError
+
+_RESOLUTION_UNITS = {
+    's': 1,
+    'min': 60,
+    'h': 3600,
+    'd': 86400,
+}
+
+MAX_POINTS = 10_000_000
+
+
+def parse_resolution(resolution: str) -> int:
+    """'5min' -> 300, '1h' -> 3600, 'd' -> 86400 (в секундах)"""
+    match = re.fullmatch(r'(\d*)(s|min|h|d)', resolution.strip().lower())
+    if not match:
+        raise ValueError(
+            f"Неверное разрешение '{resolution}'. Примеры: 1min, 15min, 1h, 1d"
+        )
+    count = int(match.group(1) or 1)
+    if count <= 0:
+        raise ValueError("Разрешение должно быть положительным")
+    return count * _RESOLUTION_UNITS[match.group(2)]
+
+
+class PortfolioHistory:
+    """
+    Стоимость портфеля во времени по истории курсов (RatesStorage).
+
+    История каждой пары X_USD приводится к цене единицы X в USD и хранится
+    как отсортированные массивы (время, цена). Для сетки времени нужного
+    разрешения цены берутся методом «последнее известное значение»
+    через np.searchsorted, после чего стоимость портфеля во всех точках
+    считается одним матричным произведением (точки × валюты) · (балансы).
+    """
+
+    def __init__(self, storage: RatesStorage):
+        self.storage = storage
+        self._series: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+
+    @property
+    def series(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        if self._series is None:
+            self._series = self._load_series()
+        return self._series
+
+    def _load_series(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        series = {}
+        for pair, (times, values) in self.storage.load_history_series().items():
+            from_code, to_code = pair.split('_')
+            if to_code != 'USD':
+                continue
+
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+
+            try:
+                is_fiat = isinstance(get_currency(from_code), FiatCurrency)
+            except CurrencyNotFoundError:
+                continue
+            if is_fiat:
+                with np.errstate(divide='ignore'):
+                    values = np.where(values != 0, 1 / values, 0.0)
+
+            series[from_code] = (times, values)
+        return series
+
+    def prices_at(self, currency_code: str, grid: np.ndarray) -> np.ndarray:
+        """Цена единицы валюты в USD в точках grid (NaN до первого наблюдения)"""
+        if currency_code == 'USD':
+            return np.ones(len(grid))
+        if currency_code not in self.series:
+            return np.full(len(grid), np.nan)
+
+        times, prices = self.series[currency_code]
+        idx = np.searchsorted(times, grid, side='right') - 1
+        return np.where(idx >= 0, prices[np.maximum(idx, 0)], np.nan)
+
+    def time_grid(
+        self,
+        codes: list,
+        resolution: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> np.ndarray:
+        """
+        Равномерная сетка моментов (микросекунды) с шагом resolution,
+        по умолчанию покрывающая всю историю валют codes.
+        """
+        step = parse_resolution(resolution) * 1_000_000
+
+        relevant = [self.series[code][0] for code in codes if code in self.series]
+        if not relevant:
+            raise ValueError("История курсов для валют портфеля пуста")
+
+        start_us = (
+            int(np.datetime64(start, 'us').astype(np.int64)) if start
+            else min(int(times[0]) for times in relevant)
+        )
+        end_us = (
+            int(np.datetime64(end, 'us').astype(np.int64)) if end
+            else max(int(times[-1]) for times in relevant)
+        )
+        if end_us < start_us:
+            raise ValueError("Конец периода раньше начала")
+        if (end_us - start_us) // step + 1 > MAX_POINTS:
+            raise ValueError(
+                "Слишком много точек для выбранного периода, увеличьте разрешение"
+            )
+
+        return np.arange(start_us, end_us + 1, step, dtype=np.int64)
+
+    def value_series(
+        self,
+        balances: Dict[str, float],
+        base_currency: str = 'USD',
+        resolution: str = '1h',
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает (моменты времени datetime64[us], стоимость в base_currency).
+        Валюты без курса на момент времени в стоимость не входят.
+        """
+        codes = [code for code, balance in balances.items() if balance]
+        grid = self.time_grid(codes + [base_currency], resolution, start, end)
+
+        prices = np.empty((len(grid), len(codes)))
+        for column, code in enumerate(codes):
+            prices[:, column] = self.prices_at(code, grid)
+        amounts = np.array([balances[code] for code in codes], dtype=float)
+        values_usd = np.nan_to_num(prices, nan=0.0) @ amounts
+
+        base_prices = self.prices_at(base_currency, grid)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(base_prices > 0, values_usd / base_prices, np.nan)
+
+        return grid.astype('datetime64[us]'), values
+
+    @staticmethod
+    def write_csv(path: str, times: np.ndarray, values: np.ndarray,
+                  base_currency: str):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', f'value_{base_currency}'])
+            writer.writerows(
+                zip(np.datetime_as_string(times, unit='s').tolist(),
+                    np.round(values, 2).tolist())
+            )
@@ -1,4 +1,3 @@
-import hashlib
 from datetime import datetime
 
 from ..infra.database import db as DatabaseManager
@@ -8,9 +7,14 @@ from .exceptions import (
     InsufficientFundsError,
     WalletNotFoundError,
 )
+from .utils import PasswordHasher
 
 
 class User:
+
+    __slots__ = (
+        '_user_id', '_username', '_hashed_password', '_salt', '_registration_date'
+    )
     
     def __init__(
         self,
@@ -63,16 +67,12 @@ class User:
     def change_password(self, new_password: str):
         if len(new_password) < 4:
             raise ValueError("Пароль должен быть не короче 4 символов")
-        hash_object = hashlib.sha256()
-        salted_password = new_password + self._salt
-        hash_object.update(salted_password.encode('utf-8'))
-        self._hashed_password = hash_object.hexdigest()
+        self._hashed_password = PasswordHasher.hash_password(new_password, self._salt)
     
     def verify_password(self, password: str):
-        hash_object = hashlib.sha256()
-        salted_password = password + self._salt
-        hash_object.update(salted_password.encode('utf-8'))
-        return hash_object.hexdigest() == self._hashed_password
+        return PasswordHasher.verify_password(
+            password, self._salt, self._hashed_password
+        )
 
 class Wallet:
     '''
@@ -84,10 +84,17 @@ class Wallet:
     get_balance_info() — вывод информации о текущем балансе.  
     '''
 
+    __slots__ = (
+        '_currency_object', 'currency_code', '_balance',
+        '_lots', '_lots_shared', '_cost_basis', '_realized_pnl'
+    )
+
     def __init__(
         self,
         currency_code: str,
         balance: float = 0.0,
+        lots: list | None = None,
+        realized_pnl: float = 0.0,
     ):
         try:
             self._currency_object = get_currency(currency_code) 
@@ -97,10 +104,41 @@ class Wallet:
         self.currency_code = currency_code
         self._balance = 0.0
         self.balance = balance
+        self._lots = [dict(lot) for lot in lots] if lots else []
+        self._lots_shared = False
+        self._cost_basis = float(
+            sum(lot['amount'] * lot['price'] for lot in self._lots)
+        )
+        self._realized_pnl = float(realized_pnl)
+
+    @classmethod
+    def from_trusted(cls, currency_code: str, wallet_info: dict) -> 'Wallet':
+        """
+        Быстрая загрузка кошелька из уже проверенных при записи данных:
+        без поиска валюты в реестре и без проверок баланса.
+        """
+        wallet = cls.__new__(cls)
+        wallet._currency_object = None
+        wallet.currency_code = currency_code
+        wallet._balance = wallet_info['balance']
+        # Список лотов разделяется с исходными (возможно, закэшированными)
+        # данными и копируется при первом изменении (_own_lots); сами
+        # словари лотов никогда не меняются на месте.
+        wallet._lots = wallet_info.get('lots') or []
+        wallet._lots_shared = True
+        cost_basis = wallet_info.get('cost_basis')
+        wallet._cost_basis = (
+            cost_basis if cost_basis is not None
+            else float(sum(lot['amount'] * lot['price'] for lot in wallet._lots))
+        )
+        wallet._realized_pnl = wallet_info.get('realized_pnl', 0.0)
+        return wallet
     
     @property
     def currency(self):
         """Добавляем геттер для объекта валюты (для использования в UI)"""
+        if self._currency_object is None:
+            self._currency_object = get_currency(self.currency_code)
         return self._currency_object
 
     @property
@@ -138,21 +176,125 @@ class Wallet:
         
         self.balance -= amount
     
+    @property
+    def lots(self) -> list:
+        return [dict(lot) for lot in self._lots]
+
+    @property
+    def tracked_amount(self) -> float:
+        """Объём баланса, учтённый в открытых лотах"""
+        return float(sum(lot['amount'] for lot in self._lots))
+
+    @property
+    def cost_basis(self) -> float:
+        """Суммарная стоимость открытых лотов в USD"""
+        return self._cost_basis
+
+    @property
+    def realized_pnl(self) -> float:
+        return self._realized_pnl
+
+    def _own_lots(self):
+        if self._lots_shared:
+            self._lots = list(self._lots)
+            self._lots_shared = False
+
+    def add_lot(self, amount: float, price: float, method: str = 'fifo'):
+        """
+        Учесть покупку amount единиц по цене price (USD за единицу).
+        При method='average' все лоты сворачиваются в один со средней ценой.
+        """
+        if amount <= 0:
+            raise ValueError('Объём лота должен быть положительным')
+
+        self._own_lots()
+        self._cost_basis += amount * price
+        if method == 'average' and self._lots:
+            tracked = sum(lot['amount'] for lot in self._lots) + amount
+            self._lots = [{"amount": tracked, "price": self._cost_basis / tracked}]
+        else:
+            self._lots.append({"amount": amount, "price": price})
+
+    def close_lots(self, amount: float, price: float, method: str = 'fifo') -> float:
+        """
+        Списать amount единиц из открытых лотов при продаже по цене price.
+        Возвращает реализованный P&L сделки в USD. Объём сверх учтённых лотов
+        (например, баланс, появившийся до ведения лотов) считается
+        с нулевой себестоимостью.
+        """
+        self._own_lots()
+        if method == 'average' and self._lots:
+            tracked = sum(lot['amount'] for lot in self._lots)
+            closed = min(amount, tracked)
+            closed_cost = self._cost_basis * closed / tracked
+            remaining = tracked - closed
+            self._lots = (
+                [{"amount": remaining, "price": self._cost_basis / tracked}]
+                if remaining > 0 else []
+            )
+        else:
+            closed_cost = 0.0
+            to_close = amount
+            while to_close > 0 and self._lots:
+                lot = self._lots[0]
+                take = min(lot['amount'], to_close)
+                closed_cost += take * lot['price']
+                to_close -= take
+                if lot['amount'] - take <= 0:
+                    self._lots.pop(0)
+                else:
+                    self._lots[0] = {**lot, "amount": lot['amount'] - take}
+
+        self._cost_basis = max(self._cost_basis - closed_cost, 0.0)
+        if not self._lots:
+            self._cost_basis = 0.0
+
+        realized = amount * price - closed_cost
+        self._realized_pnl += realized
+        return realized
+
+    def state_key(self) -> tuple:
+        """Дешёвый отпечаток состояния для отслеживания изменений"""
+        return (
+            self._balance, self._cost_basis, self._realized_pnl, len(self._lots)
+        )
+
     def get_balance_info(self):
         return {
             "currency_code": self.currency_code,
-            "balance": self._balance
+            "balance": self._balance,
+            "lots": list(self._lots),
+            "cost_basis": self._cost_basis,
+            "realized_pnl": self._realized_pnl
         }
         
 class Portfolio:
+    """
+    Портфель хранит сырые данные кошельков из portfolios.json и создаёт
+    объекты Wallet только при первом обращении. Для созданных кошельков
+    запоминается снимок состояния, чтобы при сохранении записывать
+    только изменившиеся (dirty) кошельки.
+    """
+
+    __slots__ = ('_user_id', '_wallets', '_raw', '_snapshots', 'version')
 
     def __init__(
             self,
             user_id: int,
-            wallets: dict[str, Wallet]
+            wallets: dict[str, Wallet],
+            version: int = 0
     ):
         self._user_id = user_id
         self._wallets = wallets
+        self._raw: dict = {}
+        self._snapshots: dict = {}
+        self.version = version
+
+    @classmethod
+    def from_raw(cls, user_id: int, raw_wallets: dict, version: int = 0):
+        portfolio = cls(user_id, {}, version)
+        portfolio._raw = raw_wallets
+        return portfolio
     
     @property
     def user(self):
@@ -160,10 +302,44 @@ class Portfolio:
     
     @property
     def wallets(self) -> dict:
-        return self._wallets.copy()
+        return {code: self._materialize(code) for code in self.currency_codes()}
+
+    def __contains__(self, currency_code: str) -> bool:
+        return currency_code in self._wallets or currency_code in self._raw
+
+    def currency_codes(self) -> list:
+        return list(dict.fromkeys([*self._raw, *self._wallets]))
+
+    def balances(self) -> dict:
+        """Балансы всех кошельков без создания объектов Wallet"""
+        return {
+            code: (self._wallets[code].balance if code in self._wallets
+                   else self._raw[code]['balance'])
+            for code in self.currency_codes()
+        }
+
+    def _materialize(self, currency_code: str) -> Wallet:
+        wallet = self._wallets.get(currency_code)
+        if wallet is None:
+            wallet = Wallet.from_trusted(currency_code, self._raw[currency_code])
+            self._wallets[currency_code] = wallet
+            self._snapshots[currency_code] = wallet.state_key()
+        return wallet
+
+    def dirty_wallets(self) -> dict:
+        """Кошельки, созданные или изменённые после загрузки/сохранения"""
+        return {
+            code: wallet for code, wallet in self._wallets.items()
+            if self._snapshots.get(code) != wallet.state_key()
+        }
+
+    def mark_clean(self):
+        self._snapshots = {
+            code: wallet.state_key() for code, wallet in self._wallets.items()
+        }
     
     def add_currency(self, currency_code: str):
-        if currency_code in self._wallets:
+        if currency_code in self:
             raise ValueError(f'Валюта {currency_code} уже есть в портфеле')
         self._wallets[currency_code] = Wallet(currency_code, 0.0)
 
@@ -171,32 +347,26 @@ class Portfolio:
         rates = DatabaseManager.read_rates()
     
         total_value = 0.0
-        for currency_code, wallet in self._wallets.items():
+        for currency_code, balance in self.balances().items():
             if currency_code == base_currency:
-                total_value += wallet.balance
+                total_value += balance
             else:
                 pair = f"{currency_code}_{base_currency}"
                 if pair in rates:
                     rate = rates[pair]['rate']
-                    total_value += wallet.balance * rate
+                    total_value += balance * rate
                 else:
                     if currency_code != 'USD' and base_currency != 'USD':
                         pair1 = f"{currency_code}_USD"
                         pair2 = f"USD_{base_currency}"
                         if pair1 in rates and pair2 in rates:
                             rate = rates[pair1]['rate'] * rates[pair2]['rate']
-                            total_value += wallet.balance * rate
+                            total_value += balance * rate
     
         return round(total_value, 2)
     
     def get_wallet(self, currency_code: str):
-        if currency_code not in self._wallets:
+        if currency_code not in self:
             raise WalletNotFoundError(currency_code) 
         
-        return self._wallets[currency_code]
-
-    
-
-
-
-    
+        return self._materialize(currency_code)
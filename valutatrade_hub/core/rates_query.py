@@ -0,0 +1,203 @@
+# valutatrade_hub/core/rates_query.py
+import base64
+import heapq
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from ..infra.database import db as DatabaseManager
+from .currencies import get_currency_codes
+
+SORT_FIELDS = {'rate': 'rate', 'pair': 'pair', 'updated': 'updated_at'}
+# Типы элементов ключа сортировки (см. RatesQuery._sort_key)
+SORT_KEY_TYPES = {
+    'rate': ((int, float), str),
+    'pair': (str,),
+    'updated': (str, str),
+}
+ASSET_CLASSES = ('fiat', 'crypto')
+
+
+class RatesIndex:
+    """
+    Индекс одного снимка rates.json.
+
+    Строки курсов лежат в списке, а для класса актива (fiat/crypto
+    по первой валюте пары), базовой валюты (второй), источника и кода
+    валюты (любой стороны пары) хранятся списки позиций. Фильтр
+    пересекает списки, начиная с самого короткого, и не просматривает
+    строки, не подходящие хотя бы под один критерий.
+    """
+
+    def __init__(self, snapshot: Dict):
+        pairs = snapshot.get('pairs', snapshot) if isinstance(snapshot, dict) else {}
+        self.last_refresh = snapshot.get('last_refresh') if pairs else None
+        self.rows: List[Dict[str, Any]] = []
+        self._postings: Dict[str, Dict[str, List[int]]] = {
+            'asset_class': {}, 'base': {}, 'source': {}, 'currency': {},
+        }
+
+        crypto = set(get_currency_codes('crypto'))
+        fiat = set(get_currency_codes('fiat'))
+        for pair, info in pairs.items():
+            if not isinstance(info, dict) or '_' not in pair or 'rate' not in info:
+                continue
+            from_code, to_code = pair.split('_', 1)
+            asset_class = (
+                'crypto' if from_code in crypto
+                else 'fiat' if from_code in fiat else 'unknown'
+            )
+            position = len(self.rows)
+            self.rows.append({
+                'pair': pair,
+                'from': from_code,
+                'to': to_code,
+                'rate': info['rate'],
+                'updated_at': info.get('updated_at', ''),
+                'source': info.get('source', ''),
+                'asset_class': asset_class,
+            })
+            self._post('asset_class', asset_class, position)
+            self._post('base', to_code, position)
+            self._post('source', info.get('source', ''), position)
+            self._post('currency', from_code, position)
+            if to_code != from_code:
+                self._post('currency', to_code, position)
+
+    def _post(self, field: str, value: str, position: int):
+        self._postings[field].setdefault(value, []).append(position)
+
+    def select(self, **filters: Optional[str]) -> List[int]:
+        """Позиции строк, подходящих под все заданные (не None) фильтры"""
+        postings = [
+            self._postings[field].get(value, [])
+            for field, value in filters.items() if value is not None
+        ]
+        if not postings:
+            return list(range(len(self.rows)))
+
+        postings.sort(key=len)
+        selected = postings[0]
+        for other in postings[1:]:
+            if not selected:
+                break
+            allowed = set(other)
+            selected = [position for position in selected if position in allowed]
+        return selected
+
+
+class RatesQuery:
+    """
+    Запросы к кэшу курсов: фильтрация по индексу, частичная сортировка
+    для первых N строк (heapq) и постраничный вывод по курсору.
+
+    Курсор — непрозрачная строка с ключом сортировки последней
+    показанной строки: следующая страница начинается строго после неё,
+    поэтому страницы не пересекаются и не пропускают строк, даже если
+    между запросами курсы добавились. Индекс перестраивается, только
+    когда меняется версия rates.json.
+    """
+
+    def __init__(self):
+        self._index: Optional[RatesIndex] = None
+        self._version: Optional[tuple] = None
+
+    def index(self) -> RatesIndex:
+        version = DatabaseManager.get_version('rates.json')
+        if self._index is None or version != self._version:
+            self._index = RatesIndex(DatabaseManager.read_rates_snapshot())
+            self._version = version
+        return self._index
+
+    @staticmethod
+    def _sort_key(sort: str) -> Callable[[Dict], tuple]:
+        field = SORT_FIELDS[sort]
+        if field == 'pair':
+            return lambda row: (row['pair'],)
+        return lambda row: (row[field], row['pair'])
+
+    @staticmethod
+    def encode_cursor(sort: str, descending: bool, key: tuple) -> str:
+        payload = json.dumps([sort, descending, list(key)], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            cursor_sort, cursor_descending, key = json.loads(raw)
+        except (ValueError, TypeError):
+            raise ValueError("Некорректный курсор")
+        if cursor_sort != sort or cursor_descending != descending:
+            raise ValueError("Курсор получен для другой сортировки")
+        # Ключ сравнивается с ключами строк: чужая форма или типы дали бы
+        # TypeError при сравнении, а не ошибку запроса
+        types = SORT_KEY_TYPES[sort]
+        if (not isinstance(key, list) or len(key) != len(types) or any(
+            isinstance(value, bool) or not isinstance(value, expected)
+            for value, expected in zip(key, types)
+        )):
+            raise ValueError("Некорректный курсор")
+        return tuple(key)
+
+    def query(
+        self,
+        asset_class: Optional[str] = None,
+        base: Optional[str] = None,
+        source: Optional[str] = None,
+        currency: Optional[str] = None,
+        sort: str = 'rate',
+        descending: bool = True,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Страница курсов. rows — список строк в порядке сортировки;
+        matched — сколько строк подходит под фильтры (без учёта курсора);
+        next_cursor — курсор следующей страницы или None.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(
+                f"Сортировка '{sort}' не поддерживается: {', '.join(SORT_FIELDS)}"
+            )
+        if asset_class is not None and asset_class not in ASSET_CLASSES:
+            raise ValueError(f"Класс актива: {' или '.join(ASSET_CLASSES)}")
+        if limit is not None and limit <= 0:
+            raise ValueError("Размер страницы должен быть положительным")
+
+        index = self.index()
+        positions = index.select(
+            asset_class=asset_class,
+            base=base.upper() if base else None,
+            source=source,
+            currency=currency.upper() if currency else None,
+        )
+        key = self._sort_key(sort)
+        candidates = [index.rows[position] for position in positions]
+        matched = len(candidates)
+
+        if cursor:
+            after = self.decode_cursor(cursor, sort, descending)
+            candidates = [
+                row for row in candidates
+                if (key(row) < after if descending else key(row) > after)
+            ]
+
+        if limit is None or limit >= len(candidates):
+            page = sorted(candidates, key=key, reverse=descending)
+            next_cursor = None
+        else:
+            select = heapq.nlargest if descending else heapq.nsmallest
+            page = select(limit, candidates, key=key)
+            next_cursor = self.encode_cursor(sort, descending, key(page[-1]))
+
+        return {
+            'rows': page,
+            'shown': len(page),
+            'matched': matched,
+            'total': len(index.rows),
+            'next_cursor': next_cursor,
+            'last_refresh': index.last_refresh,
+        }
+
+
+rates_query = RatesQuery()
@@ -0,0 +1,133 @@
+# valutatrade_hub/core/risk.py
+from statistics import NormalDist
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from ..parser_service.storage import RatesStorage
+from .history import PortfolioHistory, parse_resolution
+
+_MODEL_CACHE: Dict[tuple, Dict[str, Any]] = {}
+_MODEL_CACHE_SIZE = 16
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_YEAR = 365 * SECONDS_PER_DAY
+
+
+class RiskAnalytics:
+    """
+    Риск-метрики по истории курсов из RatesStorage.
+
+    Все валюты выравниваются на общую сетку времени (PortfolioHistory),
+    после чего доходности, скользящая волатильность, ковариации и корреляции
+    считаются над матрицей (точки × валюты) целиком. Модель кэшируется
+    по версии файла истории, поэтому повторные запросы не перечитывают JSON;
+    VaR конкретного портфеля — это одно произведение на закэшированные
+    доходности.
+    """
+
+    def __init__(self, storage: RatesStorage):
+        self.storage = storage
+
+    def model(self, base_currency: str = 'USD', resolution: str = '1d',
+              window: int = 30) -> Dict[str, Any]:
+        key = (self.storage.history_version(), base_currency, resolution, window)
+        if key not in _MODEL_CACHE:
+            if len(_MODEL_CACHE) >= _MODEL_CACHE_SIZE:
+                _MODEL_CACHE.pop(next(iter(_MODEL_CACHE)))
+            _MODEL_CACHE[key] = self._build_model(base_currency, resolution, window)
+        return _MODEL_CACHE[key]
+
+    def _build_model(self, base_currency: str, resolution: str,
+                     window: int) -> Dict[str, Any]:
+        if window < 2:
+            raise ValueError("Окно волатильности должно быть не меньше 2")
+
+        history = PortfolioHistory(self.storage)
+        codes = sorted(code for code in history.series if code != base_currency)
+        if not codes:
+            raise ValueError("История курсов пуста")
+        grid = history.time_grid(codes, resolution)
+        # История хранится парами X_USD, поэтому USD в ней нет; при другой
+        # базе USD — такой же рисковый актив (prices_at('USD') равна 1)
+        if base_currency != 'USD':
+            codes = sorted(codes + ['USD'])
+
+        base_prices = history.prices_at(base_currency, grid)
+        prices = np.column_stack([history.prices_at(code, grid) for code in codes])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            prices = prices / base_prices[:, None]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = prices[1:] / prices[:-1] - 1
+        returns = returns[np.isfinite(returns).all(axis=1)]
+        if len(returns) < 2:
+            raise ValueError(
+                "Недостаточно истории для расчёта риска: "
+                "выполните update-rates несколько раз или уменьшите разрешение"
+            )
+
+        # Волатильность, корреляции, ковариация и исторический P&L считаются
+        # по одним и тем же простым доходностям
+        window = min(window, len(returns))
+        cumsum = np.vstack([np.zeros(len(codes)), np.cumsum(returns, axis=0)])
+        cumsum_sq = np.vstack([np.zeros(len(codes)), np.cumsum(returns ** 2, axis=0)])
+        sums = cumsum[window:] - cumsum[:-window]
+        sums_sq = cumsum_sq[window:] - cumsum_sq[:-window]
+        rolling_var = (sums_sq - sums ** 2 / window) / (window - 1)
+        rolling_vol = np.sqrt(np.maximum(rolling_var, 0.0))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correlation = np.corrcoef(returns, rowvar=False)
+
+        periods_per_year = SECONDS_PER_YEAR / parse_resolution(resolution)
+        return {
+            "base_currency": base_currency,
+            "resolution": resolution,
+            "window": window,
+            "codes": codes,
+            "observations": len(returns),
+            "returns": returns,
+            "covariance": np.atleast_2d(np.cov(returns, rowvar=False)),
+            "correlation": np.atleast_2d(correlation),
+            "volatility": rolling_vol[-1],
+            "volatility_annual": rolling_vol[-1] * np.sqrt(periods_per_year),
+            "last_prices": prices[-1],
+        }
+
+    def value_at_risk(
+        self,
+        balances: Dict[str, float],
+        base_currency: str = 'USD',
+        resolution: str = '1d',
+        window: int = 30,
+        confidence_levels: Tuple[float, ...] = (0.95, 0.99)
+    ) -> Dict[str, Any]:
+        """
+        1-дневный VaR портфеля (положительное число — ожидаемый убыток
+        в base_currency). Доходности другого шага приводятся к одному дню
+        по правилу квадратного корня из времени.
+        """
+        model = self.model(base_currency, resolution, window)
+        index = {code: i for i, code in enumerate(model['codes'])}
+
+        exposure = np.zeros(len(index))
+        for code, balance in balances.items():
+            if code in index:
+                exposure[index[code]] = balance * model['last_prices'][index[code]]
+        exposure = np.nan_to_num(exposure, nan=0.0)
+
+        horizon = np.sqrt(SECONDS_PER_DAY / parse_resolution(resolution))
+        pnl = model['returns'] @ exposure
+        sigma = float(np.sqrt(max(exposure @ model['covariance'] @ exposure, 0.0)))
+
+        result = {
+            "exposure": float(exposure.sum()),
+            "historical": {},
+            "parametric": {},
+        }
+        for level in confidence_levels:
+            historical = -np.percentile(pnl, (1 - level) * 100)
+            result["historical"][level] = max(0.0, float(historical)) * horizon
+            result["parametric"][level] = NormalDist().inv_cdf(level) * sigma * horizon
+        return result
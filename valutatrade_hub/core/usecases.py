@@ -1,8 +1,19 @@
 # valutatrade_hub/core/usecases.py
+import csv
+import json
+import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from ..decorators import log_buy, log_get_rate, log_login, log_register, log_sell
+from ..decorators import (
+    log_buy,
+    log_event,
+    log_get_rate,
+    log_login,
+    log_register,
+    log_sell,
+    timed_action,
+)
 from ..infra.database import db as DatabaseManager
 from ..infra.settings import settings
 from .currencies import CryptoCurrency, FiatCurrency, get_currency
@@ -14,6 +25,7 @@ from .exceptions import (
 )
 from .models import Portfolio, User, Wallet
 from .utils import PasswordHasher
+from .valuation_cache import valuation_cache
 
 
 class AuthUseCases:
@@ -43,40 +55,47 @@ class AuthUseCases:
         if len(password) < 4:
             raise ValueError("Пароль должен быть не короче 4 символов")
         
-        user_id = 1
-        if users:
-            user_id = max(user['user_id'] for user in users) + 1
-        
         salt = PasswordHasher.generate_salt()
         hashed_password = PasswordHasher.hash_password(password, salt)
         
-        user_data = {
-            "user_id": user_id,
-            "username": username,
-            "hashed_password": hashed_password,
-            "salt": salt,
-            "registration_date": datetime.now().isoformat()
-        }
-        
-        users.append(user_data)
-        DatabaseManager.write_users(users)
-        
-        portfolios = DatabaseManager.read_portfolios()
-        
-        portfolio_exists = any(p['user_id'] == user_id for p in portfolios)
-        
-        if not portfolio_exists:
-            portfolio_data = {
+        # Хеширование — вне блокировки; уникальность и id проверяются
+        # повторно по свежему users.json перед записью
+        with DatabaseManager.locked():
+            users = DatabaseManager.read_users()
+            if any(user['username'] == username for user in users):
+                raise ValueError(f"Имя пользователя '{username}' уже занято")
+            
+            user_id = 1
+            if users:
+                user_id = max(user['user_id'] for user in users) + 1
+            
+            user_data = {
                 "user_id": user_id,
-                "wallets": {
-                    "USD": {
-                        "currency_code": "USD",
-                        "balance": 10000.0
-                }
+                "username": username,
+                "hashed_password": hashed_password,
+                "salt": salt,
+                "registration_date": datetime.now().isoformat()
             }
-        }
-            portfolios.append(portfolio_data)
-            DatabaseManager.write_portfolios(portfolios)
+            
+            # Прочитанные списки общие с кэшем: меняются только копии
+            users = users + [user_data]
+            DatabaseManager.write_users(users)
+            
+            portfolios = DatabaseManager.read_portfolios()
+            
+            portfolio_exists = any(p['user_id'] == user_id for p in portfolios)
+            
+            if not portfolio_exists:
+                portfolio_data = {
+                    "user_id": user_id,
+                    "wallets": {
+                        "USD": {
+                            "currency_code": "USD",
+                            "balance": 10000.0
+                        }
+                    }
+                }
+                DatabaseManager.write_portfolios(portfolios + [portfolio_data])
         
         return {
             "success": True,
@@ -102,6 +121,15 @@ class AuthUseCases:
                 )
                 
                 if user.verify_password(password):
+                    if PasswordHasher.needs_rehash(user.hashed_password):
+                        user.change_password(password)
+                        with DatabaseManager.locked():
+                            users = [
+                                dict(stored, hashed_password=user.hashed_password)
+                                if stored['user_id'] == user.user_id else stored
+                                for stored in DatabaseManager.read_users()
+                            ]
+                            DatabaseManager.write_users(users)
                     return {
                         "user_id": user.user_id,
                         "username": user.username,
@@ -110,69 +138,363 @@ class AuthUseCases:
         
         return None
 
+    @staticmethod
+    def read_import_file(path: str) -> List[Dict]:
+        """
+        Чтение файла импорта пользователей:
+        - CSV с колонками username,password и, по желанию, колонками
+          с кодами валют (USD,BTC,...) для начальных балансов;
+        - JSONL: {"username": ..., "password": ..., "balances": {"USD": 100}}.
+        Без баланса USD пользователь получает, как при register, 10000 USD.
+        """
+        records = []
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if path.endswith(('.jsonl', '.ndjson')):
+                for line_no, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        record = {"error": "некорректная строка JSON"}
+                    if not isinstance(record, dict):
+                        record = {"error": "строка должна быть JSON-объектом"}
+                    record['line'] = line_no
+                    records.append(record)
+            else:
+                reader = csv.DictReader(f)
+                for line_no, row in enumerate(reader, start=2):
+                    records.append({
+                        "line": line_no,
+                        "username": row.get('username'),
+                        "password": row.get('password'),
+                        "balances": {
+                            code.strip().upper(): value
+                            for code, value in row.items()
+                            if code not in ('username', 'password')
+                            and code and value not in (None, '')
+                        }
+                    })
+        return records
+
+    @staticmethod
+    def bulk_register(records: List[Dict], workers: Optional[int] = None) -> Dict:
+        """
+        Массовая регистрация: проверка уникальности по множеству имён
+        в памяти, хеширование паролей в пуле процессов и однократная
+        запись users.json и portfolios.json. Каждый созданный пользователь
+        попадает в журнал действий как REGISTER.
+        """
+        started = time.perf_counter()
+        
+        taken = {user['username'] for user in DatabaseManager.read_users()}
+        
+        accepted = []
+        errors = []
+        for record in records:
+            username = str(record.get('username') or '').strip()
+            password = str(record.get('password') or '')
+            
+            error = record.get('error')
+            balances = None
+            if not error:
+                if not username:
+                    error = "пустое имя пользователя"
+                elif username in taken:
+                    error = f"имя пользователя '{username}' уже занято"
+                elif len(password) < 4:
+                    error = "пароль короче 4 символов"
+                else:
+                    balances, error = AuthUseCases._parse_import_balances(
+                        record.get('balances')
+                    )
+            
+            if error:
+                errors.append({
+                    "line": record.get('line'),
+                    "username": username,
+                    "error": error
+                })
+                continue
+            
+            taken.add(username)
+            accepted.append((username, password, balances, record.get('line')))
+        
+        salts = [PasswordHasher.generate_salt() for _ in accepted]
+        hashes = PasswordHasher.hash_many(
+            [(password, salt) for (_, password, _, _), salt in zip(accepted, salts)],
+            workers
+        )
+        
+        # Хеширование — вне блокировки; имена и id проверяются повторно
+        # по свежему users.json: за это время мог записать другой процесс
+        created = []
+        with DatabaseManager.locked():
+            users = list(DatabaseManager.read_users())
+            taken = {user['username'] for user in users}
+            user_id = max((user['user_id'] for user in users), default=0) + 1
+            portfolios = list(DatabaseManager.read_portfolios())
+            existing = {p['user_id'] for p in portfolios}
+            registration_date = datetime.now().isoformat()
+            
+            for (username, _, balances, line), salt, hashed in zip(
+                accepted, salts, hashes
+            ):
+                if username in taken:
+                    errors.append({
+                        "line": line,
+                        "username": username,
+                        "error": f"имя пользователя '{username}' уже занято"
+                    })
+                    continue
+                taken.add(username)
+                created.append((user_id, username))
+                users.append({
+                    "user_id": user_id,
+                    "username": username,
+                    "hashed_password": hashed,
+                    "salt": salt,
+                    "registration_date": registration_date
+                })
+                if user_id not in existing:
+                    portfolios.append({
+                        "user_id": user_id,
+                        "wallets": {
+                            code: {"currency_code": code, "balance": amount}
+                            for code, amount in balances.items()
+                        }
+                    })
+                user_id += 1
+            
+            if created:
+                DatabaseManager.write_users(users)
+                DatabaseManager.write_portfolios(portfolios)
+        
+        for user_id, username in created:
+            log_event('REGISTER', user_id=user_id, username=username)
+        
+        elapsed = time.perf_counter() - started
+        return {
+            "success": True,
+            "imported": len(created),
+            "errors": errors,
+            "elapsed": elapsed,
+            "users_per_second": len(created) / elapsed if elapsed > 0 else 0.0
+        }
+
+    @staticmethod
+    def _parse_import_balances(raw_balances) -> tuple:
+        if not raw_balances:
+            return {"USD": 10000.0}, None
+        if not isinstance(raw_balances, dict):
+            return None, "balances должен быть объектом {валюта: сумма}"
+        
+        balances = {}
+        for code, amount in raw_balances.items():
+            code = str(code).strip().upper()
+            try:
+                get_currency(code)
+            except CurrencyNotFoundError:
+                return None, f"неизвестная валюта '{code}'"
+            try:
+                amount = float(amount)
+            except (TypeError, ValueError):
+                return None, f"баланс {code} должен быть числом"
+            if amount < 0:
+                return None, f"баланс {code} не может быть отрицательным"
+            balances[code] = amount
+        # Как при register: без явного баланса USD — стартовые 10000 USD
+        balances.setdefault("USD", 10000.0)
+        return balances, None
+
 
 class PortfolioUseCases:
 
     @staticmethod
+    @timed_action('SHOW_PORTFOLIO')
     def show_portfolio(user_id: int, base_currency: str = 'USD') -> Dict:
 
         if base_currency is None:
             base_currency = settings.get('default_base_currency', 'USD')
         
+        files_version = (
+            DatabaseManager.get_version('portfolios.json'),
+            DatabaseManager.get_version('rates.json')
+        )
+        cached = valuation_cache.lookup(user_id, base_currency, files_version)
+        if cached is not None:
+            return cached
+        
         portfolio = PortfolioUseCases._load_portfolio(user_id)
+        rates_version = files_version[1]
+        
+        cached = valuation_cache.lookup_versions(
+            user_id, base_currency, files_version, portfolio.version, rates_version
+        )
+        if cached is not None:
+            return cached
         
         rates = DatabaseManager.read_rates()
+        cached_rows = valuation_cache.get_rows(user_id, base_currency)
         
-        wallets_info = []
-        for currency_code, wallet in portfolio._wallets.items():
-            if currency_code == base_currency:
-                value_in_base = wallet.balance
+        rows = {}
+        reused = 0
+        for currency_code, wallet in portfolio.wallets.items():
+            key = PortfolioUseCases._wallet_row_key(
+                currency_code, wallet, base_currency, rates
+            )
+            cached_row = cached_rows.get(currency_code)
+            if cached_row is not None and cached_row[0] == key:
+                rows[currency_code] = cached_row
+                reused += 1
             else:
-                pair = f"{currency_code}_{base_currency}"
-                if pair in rates:
-                    rate = rates[pair]['rate']
-                    value_in_base = wallet.balance * rate
-                else:
-                    value_in_base = 0  
-            
-            wallets_info.append({
-                'currency': currency_code,
-                'balance': wallet.balance,
-                'value_in_base': value_in_base
-            })
+                rows[currency_code] = (key,) + PortfolioUseCases._wallet_row(
+                    currency_code, wallet, base_currency, rates
+                )
         
-        total_value = portfolio.get_total_value(base_currency)
+        wallets_info = [row[1] for row in rows.values()]
+        total_value = round(sum(row[2] for row in rows.values()), 2)
+        total_unrealized = sum(
+            info['unrealized_pnl'] for info in wallets_info
+            if info['unrealized_pnl'] is not None
+        )
+        total_realized = sum(info['realized_pnl'] for info in wallets_info)
         
-        return {
+        result = {
             "user_id": user_id,
             "wallets": wallets_info,
             "total_value": total_value,
-            "base_currency": base_currency
+            "base_currency": base_currency,
+            "total_unrealized_pnl": total_unrealized,
+            "total_realized_pnl": total_realized
         }
-    
+        valuation_cache.store(
+            user_id, base_currency, files_version, portfolio.version,
+            rates_version, rows, result, reused
+        )
+        return result
+
     @staticmethod
-    def _save_portfolio(portfolio: Portfolio):
-        portfolios_data = DatabaseManager.read_portfolios()
+    def _wallet_row_key(currency_code: str, wallet: Wallet,
+                        base_currency: str, rates: Dict) -> tuple:
+        """Всё, от чего зависит строка кошелька: состояние кошелька и его курсы"""
+        def rate_of(pair):
+            rate_info = rates.get(pair)
+            return rate_info.get('rate') if isinstance(rate_info, dict) else rate_info
         
-        portfolio_dict = {
-            "user_id": portfolio._user_id,
-            "wallets": {}
+        return (
+            wallet.balance,
+            wallet.tracked_amount,
+            wallet.cost_basis,
+            wallet.realized_pnl,
+            rate_of(f"{currency_code}_USD"),
+            rate_of(f"{base_currency}_USD"),
+        )
+
+    @staticmethod
+    def _wallet_row(currency_code: str, wallet: Wallet,
+                    base_currency: str, rates: Dict) -> tuple:
+        """
+        Строка портфеля и её вклад в итог. Стоимость, себестоимость и P&L
+        считаются по одной цене валюты в USD (_get_usd_price, как при
+        сделках и в BulkValuation) и переводятся в базовую валюту.
+        Баланс без лотов (до ведения лотов, импорт) себестоимости
+        не имеет: P&L для него не считается (untracked_balance).
+        """
+        balance = wallet.balance
+        price_usd = PortfolioUseCases._get_usd_price(currency_code, rates)
+        base_price_usd = PortfolioUseCases._get_usd_price(base_currency, rates)
+        
+        if currency_code == base_currency:
+            value_in_base = balance
+        elif price_usd is not None and base_price_usd:
+            value_in_base = balance * price_usd / base_price_usd
+        else:
+            value_in_base = 0.0
+        
+        # USD — валюта расчётов, лотов у него нет и P&L не считается
+        tracked = min(wallet.tracked_amount, balance)
+        untracked = balance - tracked
+        if currency_code == 'USD' or untracked <= 1e-12:
+            untracked = 0.0
+        
+        cost_basis = unrealized_pnl = None
+        realized_pnl = wallet.realized_pnl
+        if base_price_usd:
+            cost_basis = wallet.cost_basis / base_price_usd
+            realized_pnl = wallet.realized_pnl / base_price_usd
+            if tracked > 0 and price_usd is not None:
+                unrealized_pnl = tracked * price_usd / base_price_usd - cost_basis
+        
+        info = {
+            'currency': currency_code,
+            'balance': balance,
+            'value_in_base': value_in_base,
+            'cost_basis': cost_basis,
+            'unrealized_pnl': unrealized_pnl,
+            'untracked_balance': untracked,
+            'realized_pnl': realized_pnl
         }
+        return info, value_in_base
+
+    @staticmethod
+    def _get_usd_price(currency_code: str, rates: Dict) -> Optional[float]:
+        """
+        Цена одной единицы валюты в USD по снимку курсов
+        (с той же трактовкой фиатных курсов, что и при покупке/продаже).
+        """
+        if currency_code == 'USD':
+            return 1.0
         
-        for currency_code, wallet in portfolio._wallets.items():
-            portfolio_dict["wallets"][currency_code] = wallet.get_balance_info()
+        rate_info = rates.get(f"{currency_code}_USD")
+        if rate_info is None:
+            return None
         
-        found = False
-        for i, p in enumerate(portfolios_data):
-            if p['user_id'] == portfolio._user_id:
-                portfolios_data[i] = portfolio_dict
-                found = True
-                break
+        rate_value = rate_info.get('rate', 0) if isinstance(rate_info, dict) else rate_info # noqa: E501
+        try:
+            currency_obj = get_currency(currency_code)
+        except CurrencyNotFoundError:
+            return None
         
-        if not found:
-            portfolios_data.append(portfolio_dict)
+        if isinstance(currency_obj, FiatCurrency):
+            return 1 / rate_value if rate_value != 0 else 0
+        return rate_value
+    
+    @staticmethod
+    def _save_portfolio(portfolio: Portfolio):
+        dirty = portfolio.dirty_wallets()
+        if not dirty:
+            return
         
-        DatabaseManager.write_portfolios(portfolios_data)
+        with DatabaseManager.locked():
+            # Копия списка и изменённой записи, остальные записи общие
+            # с кэшем DatabaseManager (copy-on-write)
+            portfolios_data = list(DatabaseManager.read_portfolios())
+            portfolio.version += 1
+            
+            found = False
+            for index, p in enumerate(portfolios_data):
+                if p['user_id'] == portfolio._user_id:
+                    p = portfolios_data[index] = dict(
+                        p, version=portfolio.version, wallets=dict(p['wallets'])
+                    )
+                    for currency_code, wallet in dirty.items():
+                        p['wallets'][currency_code] = wallet.get_balance_info()
+                    found = True
+                    break
+            
+            if not found:
+                portfolios_data.append({
+                    "user_id": portfolio._user_id,
+                    "version": portfolio.version,
+                    "wallets": {
+                        currency_code: wallet.get_balance_info()
+                        for currency_code, wallet in portfolio.wallets.items()
+                    }
+                })
+            
+            DatabaseManager.write_portfolios(portfolios_data)
+        portfolio.mark_clean()
     
     @staticmethod
     def _load_portfolio(user_id: int) -> Portfolio:
@@ -180,10 +502,11 @@ class PortfolioUseCases:
     
         for portfolio_data in portfolios_data:
             if portfolio_data['user_id'] == user_id:
-                wallets = {}
-                for currency_code, wallet_info in portfolio_data['wallets'].items():
-                    wallets[currency_code] = Wallet(currency_code, wallet_info['balance']) # noqa: E501
-                return Portfolio(user_id, wallets)
+                return Portfolio.from_raw(
+                    user_id,
+                    portfolio_data['wallets'],
+                    portfolio_data.get('version', 0)
+                )
     
         return Portfolio(user_id, {})
 
@@ -255,74 +578,80 @@ class ExchangeUseCases:
                 "error": f"Неверный код валюты: {currency_code}. {e}"
             }
         
-        portfolio = PortfolioUseCases._load_portfolio(user_id)
+        # Чтение, проверка баланса и запись — под одной блокировкой:
+        # иначе сделки того же пользователя в другом процессе теряются
+        with DatabaseManager.locked():
+            portfolio = PortfolioUseCases._load_portfolio(user_id)
     
-        rates = DatabaseManager.read_rates()
-        pair = f"{currency_code}_USD"
+            rates = DatabaseManager.read_rates()
+            pair = f"{currency_code}_USD"
     
-        if pair not in rates:
-            return {
-                "success": False,
-                "error": str(ApiRequestError(f"Не удалось получить курс для {currency_code}→USD")) # noqa: E501
-            }
+            if pair not in rates:
+                return {
+                    "success": False,
+                    "error": str(ApiRequestError(f"Не удалось получить курс для {currency_code}→USD")) # noqa: E501
+                }
 
-        rate_info = rates[pair]
+            rate_info = rates[pair]
 
-        if isinstance(rate_info, dict):
-            rate_value = rate_info.get('rate', 0)
-        else:
-            rate_value = rate_info
+            if isinstance(rate_info, dict):
+                rate_value = rate_info.get('rate', 0)
+            else:
+                rate_value = rate_info
 
-        if isinstance(currency_obj, FiatCurrency):
-            rate = 1 / rate_value if rate_value != 0 else 0
-        elif isinstance(currency_obj, CryptoCurrency):
-            rate = rate_value
-        else:
-            rate = rate_value
+            if isinstance(currency_obj, FiatCurrency):
+                rate = 1 / rate_value if rate_value != 0 else 0
+            elif isinstance(currency_obj, CryptoCurrency):
+                rate = rate_value
+            else:
+                rate = rate_value
 
-        cost_usd = amount * rate
+            cost_usd = amount * rate
     
     
-        if 'USD' not in portfolio._wallets:
-            portfolio.add_currency('USD')
+            if 'USD' not in portfolio:
+                portfolio.add_currency('USD')
     
-        usd_wallet = portfolio.get_wallet('USD')
+            usd_wallet = portfolio.get_wallet('USD')
     
     
-        try:
-            if usd_wallet.balance < cost_usd:
-                raise InsufficientFundsError(
-                    currency_code='USD',
-                    available=usd_wallet.balance,
-                    required=cost_usd
-                )
+            try:
+                if usd_wallet.balance < cost_usd:
+                    raise InsufficientFundsError(
+                        currency_code='USD',
+                        available=usd_wallet.balance,
+                        required=cost_usd
+                    )
     
     
-            usd_wallet.withdraw(cost_usd)
+                usd_wallet.withdraw(cost_usd)
     
-        except InsufficientFundsError as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            except InsufficientFundsError as e:
+                return {
+                    "success": False,
+                    "error": str(e)
+                }
     
     
-        if currency_code not in portfolio._wallets:
-            portfolio.add_currency(currency_code)
-        target_wallet = portfolio.get_wallet(currency_code)
-        target_wallet.deposit(amount)
+            if currency_code not in portfolio:
+                portfolio.add_currency(currency_code)
+            target_wallet = portfolio.get_wallet(currency_code)
+            target_wallet.deposit(amount)
+            target_wallet.add_lot(
+                amount, rate, settings.get('cost_basis_method', 'fifo')
+            )
     
-        PortfolioUseCases._save_portfolio(portfolio)
+            PortfolioUseCases._save_portfolio(portfolio)
     
-        return {
-            "success": True,
-            "currency": currency_code,
-            "amount": amount,
-            "new_balance": target_wallet.balance,
-            "rate": rate,
-            "estimated_cost_usd": cost_usd,
-            "usd_spent": cost_usd
-        }
+            return {
+                "success": True,
+                "currency": currency_code,
+                "amount": amount,
+                "new_balance": target_wallet.balance,
+                "rate": rate,
+                "estimated_cost_usd": cost_usd,
+                "usd_spent": cost_usd
+            }
     
     @staticmethod
     @log_sell(verbose=True)
@@ -342,81 +671,88 @@ class ExchangeUseCases:
                 "error": f"Неверный код валюты: {currency_code}. {e}"
             }
         
-        portfolio = PortfolioUseCases._load_portfolio(user_id)
-        try:
-            if currency_code not in portfolio._wallets:
-                raise WalletNotFoundError(currency_code)
+        # Чтение, проверка баланса и запись — под одной блокировкой:
+        # иначе сделки того же пользователя в другом процессе теряются
+        with DatabaseManager.locked():
+            portfolio = PortfolioUseCases._load_portfolio(user_id)
+            try:
+                if currency_code not in portfolio:
+                    raise WalletNotFoundError(currency_code)
                 
-            wallet = portfolio.get_wallet(currency_code)
+                wallet = portfolio.get_wallet(currency_code)
         
-            if wallet.balance < amount:
-                raise InsufficientFundsError(
-                    currency_code=currency_code,
-                    available=wallet.balance,
-                    required=amount
-                )
+                if wallet.balance < amount:
+                    raise InsufficientFundsError(
+                        currency_code=currency_code,
+                        available=wallet.balance,
+                        required=amount
+                    )
             
-            old_balance = wallet.balance
-            wallet.withdraw(amount) 
-            new_balance = wallet.balance
+                old_balance = wallet.balance
+                wallet.withdraw(amount) 
+                new_balance = wallet.balance
             
-        except (WalletNotFoundError, InsufficientFundsError) as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            except (WalletNotFoundError, InsufficientFundsError) as e:
+                return {
+                    "success": False,
+                    "error": str(e)
+                }
 
-        if currency_code == 'USD':
-            PortfolioUseCases._save_portfolio(portfolio)
-            return {
-                "success": True,
-                "currency": currency_code,
-                "amount": amount,
-                "old_balance": old_balance,
-                "new_balance": new_balance,
-                "rate": 1.0,
-                "revenue_usd": amount
-            }
+            if currency_code == 'USD':
+                PortfolioUseCases._save_portfolio(portfolio)
+                return {
+                    "success": True,
+                    "currency": currency_code,
+                    "amount": amount,
+                    "old_balance": old_balance,
+                    "new_balance": new_balance,
+                    "rate": 1.0,
+                    "revenue_usd": amount
+                }
 
-        rates = DatabaseManager.read_rates()
-        pair = f"{currency_code}_USD"
+            rates = DatabaseManager.read_rates()
+            pair = f"{currency_code}_USD"
 
-        if pair not in rates:
-            return {
-                "success": False,
-                "error": str(ApiRequestError(f"Не удалось получить курс для {currency_code}→USD")) # noqa: E501
-            }
+            if pair not in rates:
+                return {
+                    "success": False,
+                    "error": str(ApiRequestError(f"Не удалось получить курс для {currency_code}→USD")) # noqa: E501
+                }
 
-        rate_info = rates[pair]
+            rate_info = rates[pair]
 
-        if isinstance(rate_info, dict):
-            rate_value = rate_info.get('rate', 0)
-        else:
-            rate_value = rate_info
+            if isinstance(rate_info, dict):
+                rate_value = rate_info.get('rate', 0)
+            else:
+                rate_value = rate_info
 
-        if isinstance(currency_obj, FiatCurrency):
-            rate = 1 / rate_value if rate_value != 0 else 0
-        elif isinstance(currency_obj, CryptoCurrency):
-            rate = rate_value
-        else:
-            rate = rate_value
+            if isinstance(currency_obj, FiatCurrency):
+                rate = 1 / rate_value if rate_value != 0 else 0
+            elif isinstance(currency_obj, CryptoCurrency):
+                rate = rate_value
+            else:
+                rate = rate_value
 
-        revenue_usd = amount * rate
+            revenue_usd = amount * rate
+            realized_pnl = wallet.close_lots(
+                amount, rate, settings.get('cost_basis_method', 'fifo')
+            )
 
-        if 'USD' not in portfolio._wallets:
-            portfolio.add_currency('USD')
+            if 'USD' not in portfolio:
+                portfolio.add_currency('USD')
 
-        usd_wallet = portfolio.get_wallet('USD')
-        usd_wallet.deposit(revenue_usd)
+            usd_wallet = portfolio.get_wallet('USD')
+            usd_wallet.deposit(revenue_usd)
 
-        PortfolioUseCases._save_portfolio(portfolio)
+            PortfolioUseCases._save_portfolio(portfolio)
 
-        return {
-            "success": True,
-            "currency": currency_code,
-            "amount": amount,
-            "old_balance": old_balance,
-            "new_balance": new_balance,
-            "rate": rate,
-            "revenue_usd": revenue_usd
-        }
+            return {
+                "success": True,
+                "currency": currency_code,
+                "amount": amount,
+                "old_balance": old_balance,
+                "new_balance": new_balance,
+                "rate": rate,
+                "revenue_usd": revenue_usd,
+                "realized_pnl": realized_pnl
+            }
@@ -1,9 +1,16 @@
 # valutatrade_hub/core/utils.py
 import hashlib
+import hmac
 import json
-import uuid
+import logging
+import os
+import secrets
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+from ..infra.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 
 class JSONFileManager:
@@ -76,14 +83,146 @@ class JSONFileManager:
 
 
 class PasswordHasher:
+    """
+    Хеширование паролей с настраиваемым алгоритмом и стоимостью.
+
+    Хеш хранит свои параметры, поэтому проверка не зависит от текущих
+    настроек, а needs_rehash() показывает, что хеш пора пересчитать:
+        pbkdf2_sha256$<итерации>$<hex>
+        scrypt$<n>$<r>$<p>$<hex>
+        <hex>  — прежний формат: один проход SHA-256 от password + salt
+    """
+
+    DEFAULT_COSTS = {
+        'pbkdf2_sha256': 200_000,
+        'scrypt': 2 ** 14,
+    }
+    SCRYPT_R = 8
+    SCRYPT_P = 1
+
+    @staticmethod
+    def configured() -> Tuple[str, int]:
+        from ..infra.settings import settings
+
+        algorithm = settings.get('password_hash_algorithm', 'pbkdf2_sha256')
+        if algorithm not in PasswordHasher.DEFAULT_COSTS:
+            raise ValueError(f"Неизвестный алгоритм хеширования: {algorithm}")
+        # Стоимость задаётся для каждого алгоритма отдельно: 200000 итераций
+        # PBKDF2 — недопустимое n для scrypt. Общий password_hash_cost
+        # прежних конфигураций учитывается, если подходит алгоритму
+        default = PasswordHasher.DEFAULT_COSTS[algorithm]
+        key = f'password_hash_cost_{algorithm}'
+        cost = settings.get(key)
+        if cost is None:
+            key = 'password_hash_cost'
+            cost = settings.get(key)
+        if cost is None:
+            return algorithm, default
+        if not PasswordHasher.valid_cost(algorithm, cost):
+            logger.warning(
+                f"Недопустимая стоимость {key}={cost!r} для {algorithm}, "
+                f"используется {default}"
+            )
+            return algorithm, default
+        return algorithm, int(cost)
+
+    @staticmethod
+    def valid_cost(algorithm: str, cost) -> bool:
+        """PBKDF2 — положительное число итераций, scrypt — n = 2^k, k ≥ 1"""
+        if isinstance(cost, bool) or not isinstance(cost, int) or cost < 1:
+            return False
+        if algorithm == 'scrypt':
+            return cost > 1 and cost & (cost - 1) == 0
+        return True
+
+    @staticmethod
+    @traced('hash_password', 'crypto')
+    def hash_password(password: str, salt: str, algorithm: Optional[str] = None,
+                      cost: Optional[int] = None) -> str:
+        if algorithm is None:
+            algorithm, configured_cost = PasswordHasher.configured()
+            cost = cost or configured_cost
+        cost = cost or PasswordHasher.DEFAULT_COSTS.get(algorithm)
+        
+        password_bytes = password.encode('utf-8')
+        salt_bytes = salt.encode('utf-8')
+        
+        if algorithm == 'pbkdf2_sha256':
+            digest = hashlib.pbkdf2_hmac('sha256', password_bytes, salt_bytes, cost)
+            return f"pbkdf2_sha256${cost}${digest.hex()}"
+        if algorithm == 'scrypt':
+            r, p = PasswordHasher.SCRYPT_R, PasswordHasher.SCRYPT_P
+            digest = hashlib.scrypt(
+                password_bytes, salt=salt_bytes, n=cost, r=r, p=p,
+                maxmem=256 * cost * r + 2 ** 20
+            )
+            return f"scrypt${cost}${r}${p}${digest.hex()}"
+        if algorithm == 'sha256':
+            return hashlib.sha256(password_bytes + salt_bytes).hexdigest()
+        raise ValueError(f"Неизвестный алгоритм хеширования: {algorithm}")
+
+    @staticmethod
+    @traced('verify_password', 'crypto')
+    def verify_password(password: str, salt: str, hashed_password: str) -> bool:
+        parts = hashed_password.split('$')
+        password_bytes = password.encode('utf-8')
+        salt_bytes = salt.encode('utf-8')
+        
+        try:
+            if parts[0] == 'pbkdf2_sha256' and len(parts) == 3:
+                digest = hashlib.pbkdf2_hmac(
+                    'sha256', password_bytes, salt_bytes, int(parts[1])
+                )
+            elif parts[0] == 'scrypt' and len(parts) == 5:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                digest = hashlib.scrypt(
+                    password_bytes, salt=salt_bytes, n=n, r=r, p=p,
+                    maxmem=256 * n * r + 2 ** 20
+                )
+            elif len(parts) == 1:
+                digest = hashlib.sha256(password_bytes + salt_bytes).digest()
+            else:
+                return False
+        except ValueError:
+            return False
+        
+        return hmac.compare_digest(digest.hex(), parts[-1])
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        algorithm, cost = PasswordHasher.configured()
+        parts = hashed_password.split('$')
+        if parts[0] != algorithm:
+            return True
+        if algorithm == 'scrypt':
+            return parts[1:4] != [
+                str(cost), str(PasswordHasher.SCRYPT_R), str(PasswordHasher.SCRYPT_P)
+            ]
+        return parts[1] != str(cost)
     
     @staticmethod
-    def hash_password(password: str, salt: str) -> str:
-        hash_object = hashlib.sha256()
-        salted_password = password + salt
-        hash_object.update(salted_password.encode('utf-8'))
-        return hash_object.hexdigest()
+    def hash_many(credentials: List[Tuple[str, str]],
+                  workers: Optional[int] = None) -> List[str]:
+        """
+        Хеширование пачки пар (пароль, соль) в пуле процессов
+        с текущими настройками алгоритма и стоимости.
+        """
+        algorithm, cost = PasswordHasher.configured()
+        jobs = [(password, salt, algorithm, cost) for password, salt in credentials]
+        if workers == 1 or len(jobs) < 2:
+            return [_hash_password_job(job) for job in jobs]
+        
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+            return list(pool.map(_hash_password_job, jobs, chunksize=chunksize))
     
     @staticmethod
     def generate_salt() -> str:
-        return str(uuid.uuid4().hex[:8])
\ No newline at end of file
+        return secrets.token_hex(16)
+
+
+def _hash_password_job(job: Tuple[str, str, str, int]) -> str:
+    password, salt, algorithm, cost = job
+    return PasswordHasher.hash_password(password, salt, algorithm, cost)
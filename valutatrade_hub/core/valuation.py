@@ -0,0 +1,155 @@
+# valutatrade_hub/core/valuation.py
+import csv
+import heapq
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..infra.database import db as DatabaseManager
+from .currencies import get_currency_codes, get_currency_ordinal
+from .exceptions import CurrencyNotFoundError
+from .usecases import PortfolioUseCases
+
+
+class BulkValuation:
+    """
+    Пакетная оценка всех портфелей сразу в нескольких базовых валютах.
+
+    Портфели читаются потоком и складываются в матрицу балансов
+    (пользователи × валюты) пачками по batch_size строк; каждая пачка
+    умножается на матрицу курсов (валюты × базы) одним матричным
+    произведением. Память ограничена размером пачки, а не числом
+    пользователей.
+    """
+
+    def __init__(
+        self,
+        base_currencies: List[str],
+        batch_size: int = 50_000,
+        top_n: int = 10
+    ):
+        if not base_currencies:
+            raise ValueError("Нужна хотя бы одна базовая валюта")
+        if batch_size <= 0:
+            raise ValueError("Размер пачки должен быть положительным")
+
+        self.base_currencies = [code.upper() for code in base_currencies]
+        self.batch_size = batch_size
+        self.top_n = top_n
+
+        self.currencies = get_currency_codes()
+        self._rate_matrix = self._build_rate_matrix(DatabaseManager.read_rates())
+
+    def _build_rate_matrix(self, rates: Dict) -> np.ndarray:
+        """Матрица стоимости одной единицы валюты (строки) в каждой базе (столбцы)"""
+        usd_prices = np.array([
+            PortfolioUseCases._get_usd_price(code, rates) or np.nan
+            for code in self.currencies
+        ])
+
+        base_prices = []
+        for base in self.base_currencies:
+            price = PortfolioUseCases._get_usd_price(base, rates)
+            if not price:
+                raise ValueError(f"Нет курса для базовой валюты {base}")
+            base_prices.append(price)
+
+        matrix = usd_prices[:, None] / np.array(base_prices)[None, :]
+        return np.nan_to_num(matrix, nan=0.0)
+
+    def run(self, output_path: Optional[str] = None) -> Dict:
+        n_currencies = len(self.currencies)
+        balances = np.zeros((self.batch_size, n_currencies))
+        user_ids = np.zeros(self.batch_size, dtype=np.int64)
+
+        aum_balances = np.zeros(n_currencies)
+        totals = np.zeros(len(self.base_currencies))
+        leaderboard: list = []
+        users_count = 0
+        skipped_wallets = 0
+
+        writer = None
+        output_file = None
+        if output_path:
+            output_file = open(output_path, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(output_file)
+            writer.writerow(['user_id'] + self.base_currencies)
+
+        def flush(size: int):
+            nonlocal totals
+            batch = balances[:size]
+            values = batch @ self._rate_matrix
+
+            aum_balances[:] += batch.sum(axis=0)
+            totals = totals + values.sum(axis=0)
+
+            primary = values[:, 0]
+            if self.top_n > 0:
+                k = min(self.top_n, size)
+                candidates = np.argpartition(primary, size - k)[size - k:]
+                for i in candidates:
+                    item = (float(primary[i]), int(user_ids[i]))
+                    if len(leaderboard) < self.top_n:
+                        heapq.heappush(leaderboard, item)
+                    elif item > leaderboard[0]:
+                        heapq.heapreplace(leaderboard, item)
+
+            if writer:
+                writer.writerows(
+                    [uid, *row] for uid, row in
+                    zip(user_ids[:size].tolist(), np.round(values, 2).tolist())
+                )
+            batch[:] = 0.0
+
+        try:
+            rows, cols, vals = [], [], []
+            size = 0
+            for portfolio in DatabaseManager.iter_portfolios():
+                user_ids[size] = portfolio['user_id']
+                for code, wallet_info in portfolio.get('wallets', {}).items():
+                    try:
+                        col = get_currency_ordinal(code)
+                    except CurrencyNotFoundError:
+                        skipped_wallets += 1
+                        continue
+                    rows.append(size)
+                    cols.append(col)
+                    vals.append(wallet_info['balance'])
+                size += 1
+                users_count += 1
+
+                if size == self.batch_size:
+                    balances[rows, cols] = vals
+                    flush(size)
+                    rows, cols, vals = [], [], []
+                    size = 0
+
+            if size:
+                balances[rows, cols] = vals
+                flush(size)
+        finally:
+            if output_file:
+                output_file.close()
+
+        aum_values = aum_balances * self._rate_matrix[:, 0]
+        return {
+            "users": users_count,
+            "skipped_wallets": skipped_wallets,
+            "base_currencies": self.base_currencies,
+            "totals": {
+                base: round(float(total), 2)
+                for base, total in zip(self.base_currencies, totals)
+            },
+            "aum": {
+                code: {
+                    "balance": float(aum_balances[i]),
+                    "value": round(float(aum_values[i]), 2)
+                }
+                for i, code in enumerate(self.currencies)
+                if aum_balances[i] > 0
+            },
+            "leaderboard": [
+                {"user_id": user_id, "value": round(value, 2)}
+                for value, user_id in sorted(leaderboard, reverse=True)
+            ]
+        }
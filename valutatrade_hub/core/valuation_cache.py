@@ -0,0 +1,93 @@
+# valutatrade_hub/core/valuation_cache.py
+import copy
+from typing import Any, Dict, Optional, Tuple
+
+
+class ValuationCache:
+    """
+    Кэш оценок портфелей в рамках процесса.
+
+    Запись хранится по ключу (user_id, base_currency) и помечена версиями:
+    - files_version — stat-отпечатки portfolios.json и rates.json; если файлы
+      не менялись, ответ отдаётся без чтения и разбора JSON;
+    - (portfolio_version, rates_version) — если менялись чужие портфели,
+      но не портфель пользователя и не курсы;
+    - построчный ключ кошелька (баланс, себестоимость, задействованные курсы),
+      по которому после сделки или обновления курсов пересчитываются
+      только изменившиеся строки.
+
+    Ответы хранятся и отдаются копиями: вызывающий может менять
+    полученный словарь, не портя кэш.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._stats = {
+            'hits': 0,
+            'version_hits': 0,
+            'partial': 0,
+            'misses': 0,
+            'rows_reused': 0,
+            'rows_recomputed': 0,
+        }
+
+    def lookup(self, user_id: int, base_currency: str,
+               files_version: tuple) -> Optional[Dict]:
+        entry = self._entries.get((user_id, base_currency))
+        if entry is None or entry['files_version'] != files_version:
+            return None
+        self._stats['hits'] += 1
+        return copy.deepcopy(entry['result'])
+
+    def lookup_versions(self, user_id: int, base_currency: str, files_version: tuple,
+                        portfolio_version: int, rates_version: Any) -> Optional[Dict]:
+        entry = self._entries.get((user_id, base_currency))
+        if (entry is None
+                or entry['portfolio_version'] != portfolio_version
+                or entry['rates_version'] != rates_version):
+            return None
+        entry['files_version'] = files_version
+        self._stats['version_hits'] += 1
+        return copy.deepcopy(entry['result'])
+
+    def get_rows(self, user_id: int, base_currency: str) -> Dict[str, tuple]:
+        entry = self._entries.get((user_id, base_currency))
+        return entry['rows'] if entry else {}
+
+    def store(self, user_id: int, base_currency: str, files_version: tuple,
+              portfolio_version: int, rates_version: Any,
+              rows: Dict[str, tuple], result: Dict, reused: int):
+        had_entry = (user_id, base_currency) in self._entries
+        self._entries[(user_id, base_currency)] = {
+            'files_version': files_version,
+            'portfolio_version': portfolio_version,
+            'rates_version': rates_version,
+            'rows': copy.deepcopy(rows),
+            'result': copy.deepcopy(result),
+        }
+        self._stats['partial' if had_entry and reused else 'misses'] += 1
+        self._stats['rows_reused'] += reused
+        self._stats['rows_recomputed'] += len(rows) - reused
+
+    def invalidate(self, user_id: Optional[int] = None):
+        if user_id is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        requests = (stats['hits'] + stats['version_hits']
+                    + stats['partial'] + stats['misses'])
+        rows = stats['rows_reused'] + stats['rows_recomputed']
+        stats['requests'] = requests
+        stats['entries'] = len(self._entries)
+        stats['hit_rate'] = (
+            (stats['hits'] + stats['version_hits']) / requests if requests else 0.0
+        )
+        stats['row_reuse_rate'] = stats['rows_reused'] / rows if rows else 0.0
+        return stats
+
+
+valuation_cache = ValuationCache()
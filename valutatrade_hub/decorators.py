@@ -1,8 +1,12 @@
 import functools
 import logging
-from datetime import datetime
+import random
+import time
 from typing import Any, Callable, Dict
 
+from .infra.metrics import ACTION_LATENCY, ACTIONS_TOTAL
+from .infra.settings import settings
+from .infra.tracing import tracer
 from .logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -36,107 +40,185 @@ def _log_action(logger: logging.Logger, context: Dict,
     
     message = ", ".join(message_parts)
     
-    logger.log(level, message, extra=context, exc_info=exc_info)
+    with tracer.span('log', 'logging', level=logging.getLevelName(level)):
+        logger.log(level, message, extra=context, exc_info=exc_info)
 
 def log_action(action_name: str, verbose: bool = False):
+    """
+    Логирует вызов use case как действие action_name.
+
+    Всё, что зависит только от действия, готовится при декорировании:
+    экстрактор полей и частота выборки (log_sample_rates в конфиге).
+    Если INFO для логгера выключен или вызов не попал в выборку,
+    обёртка сразу вызывает функцию, не собирая контекст. Ошибки
+    логируются всегда, без выборки. Задержка и результат вызова
+    попадают в метрики независимо от уровня логирования.
+    """
+    extract = _build_extractor(action_name)
+    sample_rate = settings.get('log_sample_rates', {}).get(action_name, 1.0)
+
     def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs) -> Any:
-            context = {
-                'action': action_name,
-                'timestamp': datetime.now().isoformat(),
-                'function': func.__name__
-            }
-            
-            if verbose:
+        function_name = func.__name__
+
+        def run(*args, **kwargs) -> Any:
+            enabled = logger.isEnabledFor(logging.INFO) and (
+                sample_rate >= 1.0 or random.random() < sample_rate
+            )
+            if enabled and verbose:
                 logger.info(f"Начало выполнения {action_name}")
-            
+
+            start = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                _extract_logging_data(context, args, kwargs, result, verbose)
-                context['result'] = 'OK' 
-                _log_action(logger, context, logging.INFO)
-                return result
-                
             except Exception as e:
-                context['error'] = str(e)
-                context['error_type'] = type(e).__name__
-                context['result'] = 'ERROR'
-                _log_action(logger, context, logging.ERROR, exc_info=True)
+                ACTION_LATENCY.observe(time.perf_counter() - start, action=action_name)
+                ACTIONS_TOTAL.inc(action=action_name, result='ERROR')
+                if logger.isEnabledFor(logging.ERROR):
+                    context = {
+                        'action': action_name,
+                        'function': function_name,
+                        'error': str(e),
+                        'error_type': type(e).__name__,
+                        'result': 'ERROR',
+                    }
+                    _log_action(logger, context, logging.ERROR, exc_info=True)
                 raise
-        
+            ACTION_LATENCY.observe(time.perf_counter() - start, action=action_name)
+            ACTIONS_TOTAL.inc(action=action_name, result='OK')
+
+            if enabled:
+                context = {'action': action_name, 'function': function_name}
+                extract(context, args, kwargs, result)
+                context['result'] = 'OK'
+                _log_action(logger, context, logging.INFO)
+            return result
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            if tracer.enabled:
+                with tracer.span(action_name, 'usecase'):
+                    return run(*args, **kwargs)
+            return run(*args, **kwargs)
+
         return wrapper
     return decorator
 
-def _extract_logging_data(context: Dict, args: tuple, kwargs: Dict,  
-                        result: Any, verbose: bool) -> None:
-    if 'action' in context and context['action'] not in ['REGISTER', 'LOGIN']:
-        if 'username' in context:
-            del context['username']
-    
-    action = context.get('action', '')
-    
-    if action in ['REGISTER', 'LOGIN']:
-        if 'username' in kwargs:
-            context['username'] = kwargs['username']
-        elif args and len(args) > 0 and isinstance(args[0], str):
-            context['username'] = args[0]
-    
-    elif action in ['BUY', 'SELL']:
-        if len(args) >= 1:
-            context['user_id'] = args[0]
-        if len(args) >= 2:
-            context['currency_code'] = args[1]
-        if len(args) >= 3:
-            try:
-                context['amount'] = float(args[2])
-            except (ValueError, TypeError):
-                pass
-        if 'user_id' in kwargs:
-            context['user_id'] = kwargs['user_id']
-        if 'currency_code' in kwargs:
-            context['currency_code'] = kwargs['currency_code']
-        elif 'currency' in kwargs:
-            context['currency_code'] = kwargs['currency']
-        if 'amount' in kwargs:
+
+def log_event(action_name: str, **fields) -> None:
+    """Запись действия в журнал без обёрнутого вызова (например, строка импорта)"""
+    if logger.isEnabledFor(logging.INFO):
+        context = {'action': action_name, **fields, 'result': 'OK'}
+        _log_action(logger, context, logging.INFO)
+
+
+def timed_action(action_name: str):
+    """Только метрики (задержка и число вызовов), без записи в лог"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            start = time.perf_counter()
+            result = 'ERROR'
             try:
-                context['amount'] = float(kwargs['amount'])
-            except (ValueError, TypeError):
-                pass
-    
-    elif action == 'GET_RATE':
-        if len(args) >= 1:
-            context['currency_code'] = args[0] 
-        if len(args) >= 2:
-            context['base_currency'] = args[1] 
-        
-        if 'from_currency' in kwargs:
-            context['currency_code'] = kwargs['from_currency']
-        elif 'from' in kwargs:
-            context['currency_code'] = kwargs['from']
-        
-        if 'to_currency' in kwargs:
-            context['base_currency'] = kwargs['to_currency']
-        elif 'to' in kwargs:
-            context['base_currency'] = kwargs['to']
-        
-    
-    if result and isinstance(result, dict):
-        if 'currency' in result:
-            context['currency_code'] = result['currency']
-        if 'amount' in result:
-            context['amount'] = result['amount']
-        if 'rate' in result:
-            context['rate'] = result['rate']
-        if 'from' in result and 'to' in result:
-            context['currency_code'] = result['from']
-            context['base_currency'] = result['to']
-        if 'base_currency' in result:
-            context['base_currency'] = result['base_currency']
-        if 'new_balance' in result:
-            context['new_balance'] = result['new_balance']
-        if 'old_balance' in result:
-            context['old_balance'] = result['old_balance']
+                with tracer.span(action_name, 'usecase'):
+                    value = func(*args, **kwargs)
+                result = 'OK'
+                return value
+            finally:
+                ACTION_LATENCY.observe(time.perf_counter() - start, action=action_name)
+                ACTIONS_TOTAL.inc(action=action_name, result=result)
+
+        return wrapper
+    return decorator
+
+
+def _extract_username(context: Dict, args: tuple, kwargs: Dict):
+    if 'username' in kwargs:
+        context['username'] = kwargs['username']
+    elif args and isinstance(args[0], str):
+        context['username'] = args[0]
+
+
+def _extract_trade(context: Dict, args: tuple, kwargs: Dict):
+    if len(args) >= 1:
+        context['user_id'] = args[0]
+    if len(args) >= 2:
+        context['currency_code'] = args[1]
+    if len(args) >= 3:
+        try:
+            context['amount'] = float(args[2])
+        except (ValueError, TypeError):
+            pass
+    if 'user_id' in kwargs:
+        context['user_id'] = kwargs['user_id']
+    if 'currency_code' in kwargs:
+        context['currency_code'] = kwargs['currency_code']
+    elif 'currency' in kwargs:
+        context['currency_code'] = kwargs['currency']
+    if 'amount' in kwargs:
+        try:
+            context['amount'] = float(kwargs['amount'])
+        except (ValueError, TypeError):
+            pass
+
+
+def _extract_rate_query(context: Dict, args: tuple, kwargs: Dict):
+    if len(args) >= 1:
+        context['currency_code'] = args[0]
+    if len(args) >= 2:
+        context['base_currency'] = args[1]
+
+    if 'from_currency' in kwargs:
+        context['currency_code'] = kwargs['from_currency']
+    elif 'from' in kwargs:
+        context['currency_code'] = kwargs['from']
+
+    if 'to_currency' in kwargs:
+        context['base_currency'] = kwargs['to_currency']
+    elif 'to' in kwargs:
+        context['base_currency'] = kwargs['to']
+
+
+_ARGUMENT_EXTRACTORS = {
+    'REGISTER': _extract_username,
+    'LOGIN': _extract_username,
+    'BUY': _extract_trade,
+    'SELL': _extract_trade,
+    'GET_RATE': _extract_rate_query,
+}
+
+
+def _extract_result(context: Dict, result: Any):
+    if not result or not isinstance(result, dict):
+        return
+    if 'currency' in result:
+        context['currency_code'] = result['currency']
+    if 'amount' in result:
+        context['amount'] = result['amount']
+    if 'rate' in result:
+        context['rate'] = result['rate']
+    if 'from' in result and 'to' in result:
+        context['currency_code'] = result['from']
+        context['base_currency'] = result['to']
+    if 'base_currency' in result:
+        context['base_currency'] = result['base_currency']
+    if 'new_balance' in result:
+        context['new_balance'] = result['new_balance']
+    if 'old_balance' in result:
+        context['old_balance'] = result['old_balance']
+
+
+def _build_extractor(action_name: str) -> Callable:
+    """Экстрактор полей контекста, выбранный один раз для действия"""
+    extract_arguments = _ARGUMENT_EXTRACTORS.get(action_name)
+
+    if extract_arguments is None:
+        def extract(context: Dict, args: tuple, kwargs: Dict, result: Any):
+            _extract_result(context, result)
+    else:
+        def extract(context: Dict, args: tuple, kwargs: Dict, result: Any):
+            extract_arguments(context, args, kwargs)
+            _extract_result(context, result)
+    return extract
 
 def log_buy(verbose: bool = False):
     return log_action(action_name='BUY', verbose=verbose)
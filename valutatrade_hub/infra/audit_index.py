@@ -0,0 +1,255 @@
+# valutatrade_hub/infra/audit_index.py
+import glob
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class AuditLogIndex:
+    """
+    Индекс журнала действий (actions.log и ротированные actions.log.N).
+
+    Каждый сегмент делится на блоки примерно по block_size байт; для блока
+    в индексе хранятся смещение, длина, диапазон времени и множества
+    user_id и действий. Запрос сначала отбирает блоки по индексу, затем
+    читает с диска только их. Индексируются строки JSONFormatter;
+    строки текстового формата пропускаются.
+
+    Сегмент идентифицируется устройством и inode, поэтому переименование
+    при ротации не требует переиндексации. Дописанные строки добавляются
+    к индексу инкрементально: перечитывается только последний неполный
+    блок и новый хвост файла.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    VERSION = 1
+    FINGERPRINT_BYTES = 256
+
+    def __init__(self, log_path: Optional[str] = None,
+                 filename: str = 'actions.log', block_size: int = BLOCK_SIZE):
+        if log_path is None:
+            from .settings import settings
+            log_path = settings.get('log_path', 'logs')
+        self.log_file = os.path.join(log_path, filename)
+        self.index_path = self.log_file + '.idx'
+        self.block_size = block_size
+        self._index: Optional[Dict[str, Any]] = None
+
+    def segments(self) -> List[str]:
+        """Сегменты от самого старого к текущему"""
+        rotated = []
+        for path in glob.glob(glob.escape(self.log_file) + '.*'):
+            suffix = path[len(self.log_file) + 1:]
+            if suffix.isdigit():
+                rotated.append((int(suffix), path))
+        paths = [path for _, path in sorted(rotated, reverse=True)]
+        if os.path.exists(self.log_file):
+            paths.append(self.log_file)
+        return paths
+
+    def _load(self) -> Dict[str, Any]:
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                index = None
+            if (not isinstance(index, dict)
+                    or index.get('version') != self.VERSION
+                    or index.get('block_size') != self.block_size):
+                index = {
+                    'version': self.VERSION,
+                    'block_size': self.block_size,
+                    'segments': {},
+                }
+            self._index = index
+        return self._index
+
+    def _save(self):
+        temp_file = self.index_path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, separators=(',', ':'))
+        os.replace(temp_file, self.index_path)
+
+    @staticmethod
+    def _segment_key(stat: os.stat_result) -> str:
+        return f"{stat.st_dev}:{stat.st_ino}"
+
+    def _fingerprint(self, f, size: int) -> str:
+        f.seek(0)
+        return hashlib.sha1(f.read(min(size, self.FINGERPRINT_BYTES))).hexdigest()
+
+    def refresh(self) -> Dict[str, int]:
+        """Доиндексирует новые строки; возвращает статистику индекса"""
+        index = self._load()
+        segments = {}
+        changed = False
+
+        for path in self.segments():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            key = self._segment_key(stat)
+            entry = index['segments'].get(key)
+            updated = self._index_segment(path, stat.st_size, entry)
+            changed = changed or updated is not entry
+            segments[key] = updated
+
+        if changed or set(segments) != set(index['segments']):
+            index['segments'] = segments
+            self._save()
+
+        return {
+            'segments': len(segments),
+            'indexed_bytes': sum(s['indexed_bytes'] for s in segments.values()),
+            'blocks': sum(len(s['blocks']) for s in segments.values()),
+        }
+
+    def _index_segment(self, path: str, size: int,
+                       entry: Optional[Dict]) -> Dict:
+        with open(path, 'rb') as f:
+            if entry is not None and entry['indexed_bytes']:
+                fingerprint = self._fingerprint(f, entry['indexed_bytes'])
+                if size < entry['indexed_bytes'] or fingerprint != entry['fingerprint']:
+                    entry = None
+            if entry is not None and entry['indexed_bytes'] == size:
+                return entry
+
+            blocks = list(entry['blocks']) if entry else []
+            offset = 0
+            if blocks and blocks[-1][1] < self.block_size:
+                offset = blocks.pop()[0]
+            elif blocks:
+                offset = blocks[-1][0] + blocks[-1][1]
+
+            blocks.extend(self._scan(f, offset))
+            indexed = blocks[-1][0] + blocks[-1][1] if blocks else offset
+            return {
+                'indexed_bytes': indexed,
+                'fingerprint': self._fingerprint(f, indexed) if indexed else '',
+                'blocks': blocks,
+            }
+
+    def _scan(self, f, offset: int) -> List[list]:
+        """Блоки [offset, length, t_min, t_max, users, actions] с позиции offset"""
+        f.seek(offset)
+        blocks = []
+        start, position = offset, offset
+        t_min = t_max = None
+        users, actions = set(), set()
+
+        def close_block():
+            blocks.append([
+                start, position - start, t_min, t_max,
+                sorted(users), sorted(actions),
+            ])
+
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            position += len(line)
+            if line.startswith(b'{'):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict):
+                    timestamp = record.get('timestamp')
+                    if timestamp:
+                        t_min = timestamp if t_min is None else min(t_min, timestamp)
+                        t_max = timestamp if t_max is None else max(t_max, timestamp)
+                    if record.get('user_id') is not None:
+                        users.add(str(record['user_id']))
+                    if record.get('action'):
+                        actions.add(record['action'])
+
+            if position - start >= self.block_size:
+                close_block()
+                start = position
+                t_min = t_max = None
+                users, actions = set(), set()
+
+        if position > start:
+            close_block()
+        return blocks
+
+    def query(
+        self,
+        action: Optional[str] = None,
+        user_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        username: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Записи журнала по фильтрам, от старых к новым. start и end —
+        строки ISO 8601 (сравниваются с полем timestamp), end включительно.
+        """
+        self.refresh()
+        index = self._load()
+        user_key = str(user_id) if user_id is not None else None
+        found = 0
+
+        for path in self.segments():
+            try:
+                entry = index['segments'].get(self._segment_key(os.stat(path)))
+            except OSError:
+                continue
+            if entry is None:
+                continue
+            with open(path, 'rb') as f:
+                for offset, length, t_min, t_max, users, actions in entry['blocks']:
+                    if t_min is None:
+                        continue
+                    if action is not None and action not in actions:
+                        continue
+                    if user_key is not None and user_key not in users:
+                        continue
+                    if start is not None and t_max < start:
+                        continue
+                    if end is not None and t_min > end:
+                        continue
+
+                    f.seek(offset)
+                    for line in f.read(length).splitlines():
+                        if not line.startswith(b'{'):
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if not self._matches(record, action, user_key, start, end,
+                                             username):
+                            continue
+                        yield record
+                        found += 1
+                        if limit is not None and found >= limit:
+                            return
+
+    @staticmethod
+    def _matches(record: Dict, action: Optional[str], user_key: Optional[str],
+                 start: Optional[str], end: Optional[str],
+                 username: Optional[str]) -> bool:
+        if action is not None and record.get('action') != action:
+            return False
+        if user_key is not None and str(record.get('user_id')) != user_key:
+            return False
+        timestamp = record.get('timestamp', '')
+        if start is not None and timestamp < start:
+            return False
+        if end is not None and timestamp > end:
+            return False
+        if username is not None and record.get('username') != username:
+            return False
+        return True
+
+    def rebuild(self) -> Dict[str, int]:
+        self._index = None
+        try:
+            os.remove(self.index_path)
+        except FileNotFoundError:
+            pass
+        return self.refresh()
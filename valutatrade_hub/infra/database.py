@@ -1,7 +1,37 @@
 # valutatrade_hub/infra/database.py
+import contextlib
 import json
 import os
-from typing import Any, Dict, List
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .metrics import (
+    STORAGE_FILE_BYTES,
+    STORAGE_LATENCY,
+    STORAGE_READ_BYTES,
+    STORAGE_WRITTEN_BYTES,
+)
+from .tracing import tracer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def file_version(stat: os.stat_result) -> tuple:
+    """
+    Отпечаток файла: inode, mtime и размер. Файлы данных заменяются
+    через os.replace, поэтому каждая запись меняет inode — перезапись
+    того же размера в пределах одного тика часов ФС не остаётся
+    незамеченной.
+    """
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class BatchConflictError(RuntimeError):
+    """Файл пакета изменён другим процессом до контрольной точки"""
 
 
 class DatabaseManager:
@@ -17,8 +47,125 @@ class DatabaseManager:
         if not self._initialized:
             from .settings import settings
             self.data_path = settings.get('data_path', 'data')
+            self._cache: Optional[Dict[str, tuple]] = None
+            # Чтение-изменение-запись общего файла из нескольких потоков
+            # выполняется под этой блокировкой (см. http_api), а между
+            # процессами — под flock на db.lock (см. locked)
+            self.lock = threading.RLock()
+            self._lock_file = None
+            self._lock_depth = 0
+            # Файлы, запись которых отложена до checkpoint (см. begin_batch)
+            self._deferred: Optional[Dict[str, int]] = None
+            # Версия файла на диске, от которой отсчитаны изменения пакета
+            self._batch_base: Dict[str, Optional[tuple]] = {}
+            self._write_seq = 0
+            # Таблица курсов в разделяемой памяти (см. shared_rates)
+            self._shared_rates = settings.get('rates_shared_memory', True)
             self._initialized = True
     
+    def enable_cache(self):
+        """
+        Держать разобранные файлы в памяти (для долгоживущего процесса).
+        Запись обновляет кэш, а чтение сверяет версию файла (file_version),
+        так что изменения, сделанные другими процессами, не теряются.
+        
+        read_* отдают сам объект из кэша, общий для всех читателей, поэтому
+        изменения — только копированием (copy-on-write): новый список
+        и копии изменённых записей, остальные записи разделяются. Запись
+        того же списка, что лежит в кэше, отклоняется (_write_json).
+        """
+        if self._cache is None:
+            self._cache = {}
+    
+    @property
+    def cache_enabled(self) -> bool:
+        return self._cache is not None
+    
+    def disable_cache(self):
+        """Вернуться к чтению файлов при каждом обращении"""
+        if self._deferred is None:
+            self._cache = None
+    
+    def begin_batch(self):
+        """
+        Отложенная запись для пакетного режима (main.py --script).
+        write_* меняют только данные в памяти, на диск они попадают
+        при checkpoint() и end_batch(). Пока файл не сохранён, get_version
+        отдаёт номер последней записи в памяти, поэтому кэши, сверяющие
+        версии файлов (valuation_cache), видят несохранённые изменения.
+        
+        Для каждого файла запоминается версия на диске, из которой
+        получены данные пакета. Если к контрольной точке файл изменил
+        другой процесс, checkpoint() ничего не записывает и бросает
+        BatchConflictError, а не затирает чужие изменения.
+        """
+        self.enable_cache()
+        if self._deferred is None:
+            self._deferred = {}
+            self._batch_base = {}
+    
+    def checkpoint(self) -> int:
+        """Сохраняет отложенные записи; возвращает число записанных файлов"""
+        if not self._deferred:
+            return 0
+        written = 0
+        with self.locked():
+            changed = [
+                filename for filename in self._deferred
+                if self._disk_version(filename) != self._batch_base.get(filename)
+            ]
+            if changed:
+                raise BatchConflictError(
+                    "Файлы изменены другим процессом во время пакета: "
+                    f"{', '.join(sorted(changed))}. Изменения пакета не сохранены"
+                )
+            for filename in list(self._deferred):
+                # Файл остаётся отложенным, пока запись не удалась: при ошибке
+                # изменения сохранятся в памяти и будут записаны повторно
+                self._dump_json(filename, self._cache[filename][1])
+                del self._deferred[filename]
+                self._batch_base[filename] = self._disk_version(filename)
+                written += 1
+        return written
+    
+    def end_batch(self) -> int:
+        try:
+            written = self.checkpoint()
+        except BatchConflictError:
+            self._deferred = None
+            self._batch_base = {}
+            raise
+        self._deferred = None
+        self._batch_base = {}
+        return written
+    
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Блокировка чтения-изменения-записи users.json и portfolios.json.
+        Потоки процесса сериализуются self.lock, процессы (демон, API,
+        CLI, --script) — flock на db.lock в каталоге данных. Повторный
+        вход в том же потоке не берёт flock заново.
+        """
+        with self.lock:
+            if self._lock_depth == 0 and fcntl:
+                os.makedirs(self.data_path, exist_ok=True)
+                self._lock_file = open(self._get_path("db.lock"), 'a')
+                try:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                except BaseException:
+                    self._lock_file.close()
+                    self._lock_file = None
+                    raise
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    self._lock_file.close()
+                    self._lock_file = None
+    
     def _get_path(self, filename: str) -> str:
         return os.path.join(self.data_path, filename)
     
@@ -34,31 +181,203 @@ class DatabaseManager:
     def write_portfolios(self, portfolios: List[Dict]):
         self._write_json("portfolios.json", portfolios)
     
+    def iter_portfolios(self, chunk_size: int = 1 << 20) -> Iterator[Dict]:
+        """
+        Потоковое чтение portfolios.json: портфели отдаются по одному,
+        в памяти держится только буфер порядка chunk_size символов.
+        """
+        if self._deferred and "portfolios.json" in self._deferred:
+            yield from self._cache["portfolios.json"][1]
+            return
+        
+        path = self._get_path("portfolios.json")
+        if not os.path.exists(path):
+            return
+        
+        decoder = json.JSONDecoder()
+        with open(path, 'r', encoding='utf-8') as f:
+            buffer = f.read(chunk_size)
+            pos = buffer.find('[')
+            if pos < 0:
+                return
+            pos += 1
+            
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos >= len(buffer):
+                    buffer = f.read(chunk_size)
+                    pos = 0
+                    if not buffer:
+                        return
+                    continue
+                if buffer[pos] == ']':
+                    return
+                
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        return
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    continue
+                
+                yield item
+                
+                if pos > chunk_size:
+                    buffer = buffer[pos:]
+                    pos = 0
+    
     def read_rates(self) -> Dict:
-        data = self._read_json("rates.json", {})
+        data = self._read_rates_document()
         if isinstance(data, dict) and 'pairs' in data:
             return data['pairs']  
         return data 
     
+    def read_rates_snapshot(self) -> Dict:
+        """rates.json целиком: пары и служебные поля (last_refresh)"""
+        return self._read_rates_document()
+    
+    def _read_rates_document(self) -> Dict:
+        """
+        Курсы берутся из таблицы в разделяемой памяти, если она собрана
+        из текущей версии rates.json; иначе файл разбирается, и таблица
+        публикуется для остальных процессов. Пары снимка — отображение
+        только для чтения (RatesSnapshot), а не dict.
+        """
+        if not self._shared_rates:
+            return self._read_json("rates.json", {})
+        
+        version = self.get_version("rates.json")
+        if self._cache is not None:
+            cached = self._cache.get("rates.json")
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        if version is None or version[0] == 'deferred':
+            return self._read_json("rates.json", {})
+        
+        from .shared_rates import shared_rate_table
+        
+        table = shared_rate_table(self._get_path("rates.json"))
+        try:
+            snapshot = table.snapshot(version)
+        except OSError:
+            snapshot = None
+        if snapshot is not None:
+            data = {"pairs": snapshot, "last_refresh": snapshot.last_refresh}
+            if self._cache is not None:
+                self._cache["rates.json"] = (version, data)
+            return data
+        
+        data = self._read_json("rates.json", {})
+        # Публикуется только версия, снятая до чтения: если файл успели
+        # заменить, отпечаток не совпадёт и таблицу пересоберёт следующий
+        pairs = data.get('pairs') if isinstance(data, dict) else None
+        if isinstance(pairs, dict) and pairs:
+            try:
+                table.publish(pairs, data.get('last_refresh'), version)
+            except OSError:
+                pass
+        return data
+    
     def write_rates(self, rates: Dict):
         self._write_json("rates.json", rates)
     
+    def get_version(self, filename: str) -> Optional[tuple]:
+        """Дешёвый отпечаток файла (file_version) без чтения содержимого"""
+        if self._deferred and filename in self._deferred:
+            return ('deferred', self._deferred[filename])
+        return self._disk_version(filename)
+    
+    def _disk_version(self, filename: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(self._get_path(filename))
+        except OSError:
+            return None
+        return file_version(stat)
+    
     def _read_json(self, filename: str, default: Any = None) -> Any:
         path = self._get_path(filename)
+        batch_base = self._deferred is not None and filename not in self._deferred
+        if self._cache is not None:
+            cached = self._cache.get(filename)
+            if cached is not None and cached[0] == self.get_version(filename):
+                if batch_base:
+                    self._batch_base[filename] = cached[0]
+                return cached[1]
+        
         if not os.path.exists(path):
+            if batch_base:
+                self._batch_base[filename] = None
             return default if default is not None else {}
         
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            start = time.perf_counter()
+            with tracer.span('db.read', 'storage', file=filename), \
+                    open(path, 'r', encoding='utf-8') as f:
+                stat = os.fstat(f.fileno())
+                data = json.load(f)
+            STORAGE_LATENCY.observe(
+                time.perf_counter() - start, file=filename, op='read'
+            )
+            STORAGE_READ_BYTES.inc(stat.st_size, file=filename)
         except Exception:
             return default if default is not None else {}
+        
+        if batch_base:
+            self._batch_base[filename] = file_version(stat)
+        if self._cache is not None:
+            self._cache[filename] = (file_version(stat), data)
+        return data
     
     def _write_json(self, filename: str, data: Any):
+        if self._cache is not None:
+            cached = self._cache.get(filename)
+            if cached is not None and cached[1] is data:
+                # Список из кэша изменён на месте: его видят и другие
+                # читатели, а версия в кэше уже не соответствует содержимому.
+                # Запись кэша сбрасывается, следующее чтение — с диска
+                if not (self._deferred and filename in self._deferred):
+                    del self._cache[filename]
+                raise ValueError(
+                    f"{filename}: данные из кэша изменены на месте, нужна копия"
+                )
+        if self._deferred is not None:
+            if filename not in self._deferred and filename not in self._batch_base:
+                self._batch_base[filename] = self._disk_version(filename)
+            self._write_seq += 1
+            self._deferred[filename] = self._write_seq
+            self._cache[filename] = (('deferred', self._write_seq), data)
+            return
+        self._dump_json(filename, data)
+    
+    def _dump_json(self, filename: str, data: Any):
         path = self._get_path(filename)
         os.makedirs(os.path.dirname(path), exist_ok=True)
         
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Запись во временный файл и атомарная замена: параллельный читатель
+        # видит либо старую, либо новую версию, но не обрезанный файл.
+        # Кэш обновляется только после успешной замены
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        start = time.perf_counter()
+        with tracer.span('db.write', 'storage', file=filename):
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    size = f.tell()
+                os.replace(temp_path, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(temp_path)
+                raise
+            stat = os.stat(path)
+        STORAGE_LATENCY.observe(time.perf_counter() - start, file=filename, op='write')
+        STORAGE_WRITTEN_BYTES.inc(size, file=filename)
+        STORAGE_FILE_BYTES.set(size, file=filename)
+        
+        if self._cache is not None:
+            self._cache[filename] = (file_version(stat), data)
 
 db = DatabaseManager()
\ No newline at end of file
@@ -0,0 +1,398 @@
+# valutatrade_hub/infra/metrics.py
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[tuple, Any]]:
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    def _copy(self, value: Any) -> Any:
+        return value
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def merge(self, key: tuple, value: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def merge(self, key: tuple, value: float):
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин (в секундах)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _copy(self, value: Dict) -> Dict:
+        return {"counts": list(value["counts"]), "sum": value["sum"]}
+
+    def _slot(self, key: tuple) -> Dict:
+        slot = self._values.get(key)
+        if slot is None:
+            slot = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            self._values[key] = slot
+        return slot
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            slot = self._slot(key)
+            slot["counts"][index] += 1
+            slot["sum"] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def merge(self, key: tuple, value: Dict):
+        with self._lock:
+            slot = self._slot(key)
+            for i, count in enumerate(value["counts"][:len(slot["counts"])]):
+                slot["counts"][i] += count
+            slot["sum"] += value["sum"]
+
+    def quantile(self, q: float, key: tuple) -> Optional[float]:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        with self._lock:
+            slot = self._values.get(key)
+            counts = list(slot["counts"]) if slot else []
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса: счётчики, gauge и гистограммы задержек.
+
+    Значения копятся в памяти. Долгоживущие процессы (демон, HTTP API,
+    сценарий --script, интерактивный режим) вызывают persist_at_exit:
+    при выходе накопленное добавляется к снимку в файле metrics_file
+    (по умолчанию data/metrics.json), и команда metrics видит его
+    после перезапуска. Одиночные команды CLI файл не трогают: каждая
+    иначе брала бы блокировку и переписывала снимок; при запущенном
+    демоне они выполняются в нём. Пустое значение metrics_file
+    отключает сохранение.
+    """
+
+    _TYPES = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._persist_at_exit = False
+
+    def _get_or_create(self, kind: str, name: str, help_text: str,
+                       labelnames: Tuple[str, ...], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._TYPES[kind](name, help_text, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif metric.kind != kind:
+                raise ValueError(f"Метрика '{name}' уже объявлена как {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str,
+                labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create('counter', name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str,
+              labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create('gauge', name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(
+            'histogram', name, help_text, labelnames, buckets=buckets
+        )
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def __iter__(self) -> Iterator[_Metric]:
+        return iter(sorted(self._metrics.values(), key=lambda m: m.name))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        result = {}
+        for metric in self:
+            samples = metric.samples()
+            if not samples:
+                continue
+            entry = {
+                "type": metric.kind,
+                "help": metric.help,
+                "labelnames": list(metric.labelnames),
+                "samples": [[list(key), value] for key, value in samples],
+            }
+            if isinstance(metric, Histogram):
+                entry["buckets"] = list(metric.buckets)
+            result[metric.name] = entry
+        return result
+
+    def merge(self, snapshot: Dict[str, Dict]):
+        for name, entry in snapshot.items():
+            kwargs = {}
+            if entry["type"] == 'histogram':
+                kwargs["buckets"] = tuple(entry["buckets"])
+            metric = self._get_or_create(
+                entry["type"], name, entry["help"], tuple(entry["labelnames"]),
+                **kwargs
+            )
+            if isinstance(metric, Histogram) and metric.buckets != kwargs["buckets"]:
+                continue
+            for key, value in entry["samples"]:
+                metric.merge(tuple(key), value)
+
+    def reset(self):
+        for metric in self:
+            metric.reset()
+
+    def render_prometheus(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4"""
+        lines = []
+        for metric in self:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in sorted(samples):
+                labels = list(zip(metric.labelnames, key))
+                if not isinstance(metric, Histogram):
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_num(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), value["counts"]):
+                    cumulative += count
+                    le = labels + [('le', '+Inf' if bound == math.inf else _num(bound))]
+                    lines.append(
+                        f"{metric.name}_bucket{_format_labels(le)} {cumulative}"
+                    )
+                lines.append(
+                    f"{metric.name}_sum{_format_labels(labels)} {_num(value['sum'])}"
+                )
+                lines.append(
+                    f"{metric.name}_count{_format_labels(labels)} {cumulative}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = path + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_file, path)
+
+    @staticmethod
+    def _persist_path() -> str:
+        from .settings import settings
+        return settings.get(
+            'metrics_file',
+            os.path.join(settings.get('data_path', 'data'), 'metrics.json')
+        )
+
+    @staticmethod
+    def load_persisted() -> Dict[str, Dict]:
+        path = MetricsRegistry._persist_path()
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def persist(self):
+        """Добавляет накопленное к снимку на диске и обнуляет метрики процесса"""
+        path = self._persist_path()
+        snapshot = self.snapshot()
+        if not path or not snapshot:
+            return
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + ".lock", 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            combined = MetricsRegistry()
+            combined.merge(self.load_persisted())
+            combined.merge(snapshot)
+            temp_file = path + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(combined.snapshot(), f, ensure_ascii=False)
+            os.replace(temp_file, path)
+        self.reset()
+
+    def persist_at_exit(self):
+        """Сохранить накопленное при выходе из процесса (один раз)"""
+        if not self._persist_at_exit:
+            self._persist_at_exit = True
+            atexit.register(self.persist)
+
+    def combined(self) -> 'MetricsRegistry':
+        """Снимок с диска плюс ещё не сохранённые значения этого процесса"""
+        combined = MetricsRegistry()
+        combined.merge(self.load_persisted())
+        combined.merge(self.snapshot())
+        return combined
+
+    def clear_persisted(self):
+        path = self._persist_path()
+        if path and os.path.exists(path):
+            os.remove(path)
+        self.reset()
+
+    def serve(self, host: str = '127.0.0.1', port: int = 9108):
+        """HTTP-эндпоинт /metrics для Prometheus (блокирующий)"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.combined().render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        value = value.replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+metrics = MetricsRegistry()
+
+ACTION_LATENCY = metrics.histogram(
+    'valutatrade_action_duration_seconds',
+    'Время выполнения use case', ('action',)
+)
+ACTIONS_TOTAL = metrics.counter(
+    'valutatrade_actions_total',
+    'Число вызовов use case по результату', ('action', 'result')
+)
+STORAGE_READ_BYTES = metrics.counter(
+    'valutatrade_storage_read_bytes_total',
+    'Прочитано байт из файлов данных', ('file',)
+)
+STORAGE_WRITTEN_BYTES = metrics.counter(
+    'valutatrade_storage_written_bytes_total',
+    'Записано байт в файлы данных', ('file',)
+)
+STORAGE_LATENCY = metrics.histogram(
+    'valutatrade_storage_duration_seconds',
+    'Время разбора (read) и сериализации (write) JSON', ('file', 'op')
+)
+STORAGE_FILE_BYTES = metrics.gauge(
+    'valutatrade_storage_file_bytes',
+    'Размер файла данных после последней записи', ('file',)
+)
+API_REQUEST_LATENCY = metrics.histogram(
+    'valutatrade_api_request_duration_seconds',
+    'Время обработки HTTP-запроса API', ('route', 'status')
+)
@@ -0,0 +1,188 @@
+# valutatrade_hub/infra/rate_events.py
+import contextlib
+import itertools
+import json
+import os
+import select
+import socket
+import time
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Список пар в уведомлении ограничен: при большем числе изменений
+# отправляется changed = None («изменилось всё, перечитайте курсы»)
+MAX_DATAGRAM_BYTES = 32 * 1024
+
+_subscription_ids = itertools.count()
+
+
+class RateChangeNotifier:
+    """
+    Уведомления об обновлении курсов без опроса rates.json.
+
+    После сохранения курсов писатель увеличивает номер версии в файле
+    rates.json.version (номер, время, список изменившихся пар) и рассылает
+    то же событие датаграммой в каждый Unix-сокет каталога подписчиков.
+    Брокера нет: подписчик сам создаёт сокет в каталоге и удаляет его
+    при закрытии, а сокеты завершившихся процессов писатель удаляет,
+    получив отказ в соединении. Если очередь подписчика переполнена,
+    событие ему не доставляется — пропуск виден по номеру версии.
+    """
+
+    def __init__(self, rates_path: str):
+        self.version_path = rates_path + '.version'
+        self.subscribers_dir = os.path.join(
+            os.path.dirname(rates_path) or '.', 'rates.subscribers'
+        )
+
+    def current(self) -> Optional[Dict]:
+        """Последнее событие из файла версии или None, если его ещё нет"""
+        try:
+            with open(self.version_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def publish(self, changed: Optional[List[str]],
+                last_refresh: Optional[str] = None) -> Dict:
+        """Записывает новую версию и рассылает её подписчикам"""
+        os.makedirs(os.path.dirname(self.version_path) or '.', exist_ok=True)
+        with open(self.version_path + '.lock', 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            previous = self.current() or {}
+            event = {
+                'version': previous.get('version', 0) + 1,
+                'published_at': datetime.now().isoformat(),
+                'last_refresh': last_refresh,
+                'changed': sorted(changed) if changed is not None else None,
+            }
+            temp_file = self.version_path + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(event, f, ensure_ascii=False)
+            os.replace(temp_file, self.version_path)
+            # Рассылка под той же блокировкой: подписчики получают
+            # события в порядке версий
+            self._broadcast(event)
+        return event
+
+    def _broadcast(self, event: Dict) -> int:
+        try:
+            names = [
+                name for name in os.listdir(self.subscribers_dir)
+                if name.endswith('.sock')
+            ]
+        except FileNotFoundError:
+            return 0
+        if not names:
+            return 0
+
+        payload = json.dumps(event, ensure_ascii=False).encode('utf-8')
+        if len(payload) > MAX_DATAGRAM_BYTES:
+            payload = json.dumps(dict(event, changed=None)).encode('utf-8')
+
+        delivered = 0
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            sender.setblocking(False)
+            for name in names:
+                path = os.path.join(self.subscribers_dir, name)
+                try:
+                    sender.sendto(payload, path)
+                    delivered += 1
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Процесс подписчика завершился, не удалив сокет
+                    with contextlib.suppress(OSError):
+                        os.remove(path)
+                except OSError:
+                    # Очередь подписчика переполнена: он увидит пропуск версии
+                    pass
+        return delivered
+
+    def subscribe(self) -> 'RateSubscription':
+        return RateSubscription(self)
+
+
+class RateSubscription:
+    """
+    Подписка процесса на события RateChangeNotifier.
+
+    get() ждёт следующее событие. Если между событиями пропущены версии
+    (подписчик не успевал читать), событие помечается missed = True
+    и changed = None: изменения нужно перечитать целиком.
+    """
+
+    def __init__(self, notifier: RateChangeNotifier):
+        self.notifier = notifier
+        current = notifier.current()
+        self.version = current['version'] if current else 0
+
+        os.makedirs(notifier.subscribers_dir, exist_ok=True)
+        self.path = os.path.join(
+            notifier.subscribers_dir,
+            f"{os.getpid()}.{next(_subscription_ids)}.sock"
+        )
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        old_umask = os.umask(0o177)
+        try:
+            self._socket.bind(self.path)
+        except OSError:
+            self._socket.close()
+            raise
+        finally:
+            os.umask(old_umask)
+
+    def fileno(self) -> int:
+        return self._socket.fileno()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Следующее событие или None по истечении timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            ready, _, _ = select.select([self._socket], [], [], remaining)
+            if not ready:
+                return None
+            try:
+                event = json.loads(self._socket.recv(MAX_DATAGRAM_BYTES * 2))
+            except ValueError:
+                continue
+            if event.get('version', 0) <= self.version:
+                continue
+            if event['version'] > self.version + 1:
+                event = dict(event, changed=None, missed=True)
+            self.version = event['version']
+            return event
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+
+    def __enter__(self) -> 'RateSubscription':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def changed_pairs(previous: Mapping, current: Mapping) -> List[str]:
+    """Пары, курс которых появился, изменился или исчез"""
+    changed = [
+        pair for pair, info in current.items()
+        if _rate(previous.get(pair)) != _rate(info)
+    ]
+    changed.extend(pair for pair in previous if pair not in current)
+    return changed
+
+
+def _rate(info) -> Optional[float]:
+    return info.get('rate') if isinstance(info, dict) else None
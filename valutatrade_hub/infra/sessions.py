@@ -0,0 +1,125 @@
+# valutatrade_hub/infra/sessions.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Dict, Optional
+
+
+class SessionManager:
+    """
+    Подписанные токены сессии для неинтерактивного режима.
+
+    После login токен {user_id, username, exp}, подписанный HMAC-SHA256
+    локальным секретом, сохраняется в файл сессии. Следующие команды
+    проверяют подпись и срок действия за O(1), не читая users.json и не
+    хешируя пароль заново. Токен можно передать и через переменную
+    окружения VALUTATRADE_SESSION: login --print-token выводит его
+    строкой export.
+    """
+
+    _instance = None
+
+    ENV_VAR = 'VALUTATRADE_SESSION'
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(SessionManager, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            from .settings import settings
+            data_path = settings.get('data_path', 'data')
+            self.session_path = settings.get(
+                'session_file', os.path.join(data_path, 'session.json')
+            )
+            self.key_path = os.path.join(data_path, '.session_key')
+            self.ttl_seconds = settings.get('session_ttl_seconds', 3600)
+            self._key: Optional[bytes] = None
+            self._initialized = True
+
+    def _get_key(self) -> bytes:
+        if self._key is None:
+            if os.path.exists(self.key_path):
+                with open(self.key_path, 'rb') as f:
+                    self._key = f.read()
+            else:
+                key = secrets.token_bytes(32)
+                os.makedirs(os.path.dirname(self.key_path) or '.', exist_ok=True)
+                try:
+                    fd = os.open(
+                        self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600
+                    )
+                except FileExistsError:
+                    with open(self.key_path, 'rb') as f:
+                        key = f.read()
+                else:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(key)
+                self._key = key
+        return self._key
+
+    def _sign(self, payload: bytes) -> str:
+        digest = hmac.new(self._get_key(), payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+    def issue_token(self, user_id: int, username: str) -> str:
+        payload = json.dumps(
+            {"user_id": user_id, "username": username,
+             "exp": int(time.time()) + self.ttl_seconds},
+            separators=(',', ':')
+        ).encode('utf-8')
+        encoded = base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+        return f"{encoded}.{self._sign(payload)}"
+
+    def verify_token(self, token: str) -> Optional[Dict]:
+        try:
+            encoded, signature = token.strip().split('.')
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+        except (ValueError, TypeError):
+            return None
+
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            return None
+        if data.get('exp', 0) < time.time():
+            return None
+        return {"user_id": data['user_id'], "username": data['username']}
+
+    def save(self, user_id: int, username: str) -> str:
+        token = self.issue_token(user_id, username)
+        os.makedirs(os.path.dirname(self.session_path) or '.', exist_ok=True)
+        fd = os.open(self.session_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"token": token}, f)
+        return token
+
+    def restore(self) -> Optional[Dict]:
+        token = os.environ.get(self.ENV_VAR)
+        if not token:
+            try:
+                with open(self.session_path, 'r', encoding='utf-8') as f:
+                    token = json.load(f).get('token')
+            except (OSError, json.JSONDecodeError, AttributeError):
+                return None
+        if not token:
+            return None
+        return self.verify_token(token)
+
+    def clear(self):
+        try:
+            os.remove(self.session_path)
+        except FileNotFoundError:
+            pass
+
+
+sessions = SessionManager()
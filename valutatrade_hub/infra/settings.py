@@ -4,6 +4,12 @@ from typing import Any, Dict
 
 
 class SettingsLoader:
+    """
+    Настройки из data/config.json с значениями по умолчанию.
+
+    Файл читается при первом обращении к настройкам, а не при импорте,
+    и загрузка не создаёт каталогов: их создают те, кто пишет файлы.
+    """
     
     _instance = None
     
@@ -19,17 +25,20 @@ class SettingsLoader:
         
         self._config: Dict[str, Any] = {}
         self._config_path = "data/config.json"
-        
-        self._load_config()
-        self._set_defaults()
+        self._loaded = False
         self._initialized = True
     
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load_config()
+            self._set_defaults()
+    
     def _load_config(self):
         if os.path.exists(self._config_path):
             try:
                 with open(self._config_path, 'r', encoding='utf-8') as f:
                     self._config = json.load(f)
-                print(f"Конфигурация загружена из: {self._config_path}")
             except Exception as e:
                 print(f"Ошибка загрузки конфигурации: {e}")
     
@@ -41,37 +50,33 @@ class SettingsLoader:
             'log_path': 'logs',
             'log_format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             'log_level': 'INFO',
+            'log_mode': 'sync',
+            'cost_basis_method': 'fifo',
+            'session_ttl_seconds': 3600,
+            'password_hash_algorithm': 'pbkdf2_sha256',
         }
         
         for key, value in defaults.items():
             if key not in self._config:
                 self._config[key] = value
     
-        self._ensure_directories()
-    
-    def _ensure_directories(self):
-        directories = [
-            self.get('data_path', 'data'),
-            self.get('log_path', 'logs'),
-        ]
-        
-        for directory in directories:
-            if directory:
-                os.makedirs(directory, exist_ok=True)
-    
     def get(self, key: str, default: Any = None) -> Any:
+        self._ensure_loaded()
         return self._config.get(key, default)
     
     def set(self, key: str, value: Any):
+        self._ensure_loaded()
         self._config[key] = value
     
     def reload(self):
         self._config = {}
+        self._loaded = True
         self._load_config()
         self._set_defaults()
         print("Конфигурация перезагружена")
     
     def get_all(self) -> Dict[str, Any]:
+        self._ensure_loaded()
         return self._config.copy()
 
 settings = SettingsLoader()
\ No newline at end of file
@@ -0,0 +1,336 @@
+# valutatrade_hub/infra/shared_rates.py
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import ItemsView, Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MAGIC = b'VTRT'
+RETIRED = b'DEAD'
+LAYOUT_VERSION = 2
+
+# Заголовок: магия, версия раскладки, seq, число пар, ёмкость,
+# отпечаток rates.json (inode, mtime_ns, размер), last_refresh
+HEADER = struct.Struct('<4sIQIIQqq32s')
+HEADER_SIZE = 128
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+
+# Запись: пара, курс, источник, updated_at; записи отсортированы по паре
+ENTRY = struct.Struct('<16sd16s32s')
+PAIR_SIZE = 16
+SOURCE_SIZE = 16
+UPDATED_SIZE = 32
+
+DEFAULT_CAPACITY = 4096
+SHM_DIR = '/dev/shm'
+
+
+def _field(value, size: int) -> Optional[bytes]:
+    raw = str(value or '').encode('utf-8')
+    return raw if len(raw) <= size else None
+
+
+def _text(raw: bytes) -> str:
+    return raw.rstrip(b'\0').decode('utf-8', 'replace')
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0):
+    """
+    multiprocessing.shared_memory без учёта в resource_tracker: таблица
+    должна переживать процесс, который её создал, а до Python 3.13
+    трекер удаляет зарегистрированные сегменты при выходе процесса.
+    """
+    from multiprocessing import resource_tracker, shared_memory
+
+    try:
+        return shared_memory.SharedMemory(
+            name, create=create, size=size, track=False
+        )
+    except TypeError:
+        pass
+    segment = shared_memory.SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+class RatesSnapshot(Mapping):
+    """
+    Согласованный снимок таблицы курсов — отображение пара → словарь
+    курса, как pairs из rates.json. Записи скопированы из общей памяти
+    одним срезом; поиск пары — bisect по ключам фиксированной длины
+    (список ключей нарезается при первом поиске), словарь курса
+    собирается только для запрошенной пары.
+    """
+
+    __slots__ = ('_data', '_count', '_keys', 'seq', 'last_refresh', 'source_version')
+
+    def __init__(self, data: bytes, count: int, seq: int, last_refresh: str,
+                 source_version: tuple):
+        self._data = data
+        self._count = count
+        self._keys: Optional[List[bytes]] = None
+        self.seq = seq
+        self.last_refresh = last_refresh
+        self.source_version = source_version
+
+    def _position(self, pair) -> int:
+        key = _field(pair, PAIR_SIZE) if isinstance(pair, str) else None
+        if key is None:
+            return -1
+        if self._keys is None:
+            data, size = self._data, ENTRY.size
+            self._keys = [
+                data[start:start + PAIR_SIZE]
+                for start in range(0, self._count * size, size)
+            ]
+        key = key.ljust(PAIR_SIZE, b'\0')
+        position = bisect.bisect_left(self._keys, key)
+        if position < self._count and self._keys[position] == key:
+            return position
+        return -1
+
+    def _row(self, position: int) -> Tuple[str, Dict]:
+        pair, rate, source, updated_at = ENTRY.unpack_from(
+            self._data, position * ENTRY.size
+        )
+        return _text(pair), {
+            'rate': rate, 'updated_at': _text(updated_at), 'source': _text(source),
+        }
+
+    def __getitem__(self, pair: str) -> Dict:
+        position = self._position(pair)
+        if position < 0:
+            raise KeyError(pair)
+        return self._row(position)[1]
+
+    def __contains__(self, pair) -> bool:
+        return self._position(pair) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._count):
+            start = position * ENTRY.size
+            yield _text(self._data[start:start + PAIR_SIZE])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self) -> ItemsView:
+        return _SnapshotItems(self)
+
+
+class _SnapshotItems(ItemsView):
+    """Полный обход записей подряд, без поиска каждой пары"""
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict]]:
+        snapshot = self._mapping
+        for position in range(len(snapshot)):
+            yield snapshot._row(position)
+
+
+class SharedRateTable:
+    """
+    Таблица текущих курсов в разделяемой памяти.
+
+    Сегмент фиксированной раскладки (заголовок и отсортированные записи
+    struct) публикует процесс, записавший или разобравший rates.json;
+    остальные процессы с тем же каталогом данных читают его без файлового
+    ввода-вывода и разбора JSON. Согласованность обеспечивает seqlock:
+    писатель делает seq нечётным, пишет записи и заголовок и делает seq
+    чётным, а читатель копирует записи и повторяет попытку, если seq
+    был нечётным или изменился за время копирования. Писатели
+    сериализуются flock на файле рядом с rates.json.
+
+    В заголовке хранится отпечаток (inode, mtime, размер) rates.json,
+    из которого собрана таблица: снимок отдаётся, только если он совпадает
+    с текущей версией файла, поэтому правка файла в обход публикации
+    не приводит к чтению устаревших курсов.
+
+    На Linux сегмент открывается через mmap файла в /dev/shm, так что
+    читателю не нужен ни импорт multiprocessing, ни resource_tracker;
+    создаётся сегмент через multiprocessing.shared_memory.
+    """
+
+    READ_RETRIES = 100
+
+    def __init__(self, rates_path: str, capacity: int = DEFAULT_CAPACITY):
+        digest = hashlib.sha1(os.path.abspath(rates_path).encode('utf-8'))
+        self.name = f"valutatrade_rates_{digest.hexdigest()[:12]}"
+        self.lock_path = rates_path + '.shm.lock'
+        self.capacity = capacity
+        self._buf = None
+        self._segment = None
+        # Отображение общее для потоков процесса (http_api): закрытие
+        # и переоткрытие не должны пересекаться с чтением
+        self._lock = threading.Lock()
+
+    def _shm_path(self) -> Optional[str]:
+        return os.path.join(SHM_DIR, self.name) if os.path.isdir(SHM_DIR) else None
+
+    def _attach(self) -> bool:
+        if self._buf is not None:
+            return True
+        path = self._shm_path()
+        try:
+            if path is not None:
+                fd = os.open(path, os.O_RDWR)
+                try:
+                    self._buf = mmap.mmap(fd, 0)
+                finally:
+                    os.close(fd)
+            else:
+                self._segment = _open_segment(self.name)
+                self._buf = self._segment.buf
+        except (FileNotFoundError, ValueError):
+            return False
+        if len(self._buf) < HEADER_SIZE:
+            self.close()
+            return False
+        return True
+
+    def _create(self, capacity: int):
+        """Новый сегмент вместо текущего; старый помечается выведенным"""
+        path = self._shm_path()
+        if self._attach():
+            seq = SEQ.unpack_from(self._buf, SEQ_OFFSET)[0]
+            SEQ.pack_into(self._buf, SEQ_OFFSET, seq | 1)
+            self._buf[0:4] = RETIRED
+            self.close()
+            if path is None:
+                segment = _open_segment(self.name)
+                segment.unlink()
+                segment.close()
+        if path is not None and os.path.exists(path):
+            os.unlink(path)
+
+        self._segment = _open_segment(
+            self.name, create=True, size=HEADER_SIZE + capacity * ENTRY.size
+        )
+        self._buf = self._segment.buf
+        HEADER.pack_into(
+            self._buf, 0, MAGIC, LAYOUT_VERSION, 0, 0, capacity, 0, 0, 0, b''
+        )
+
+    def close(self):
+        if self._segment is not None:
+            self._buf = None
+            self._segment.close()
+            self._segment = None
+        elif self._buf is not None:
+            self._buf.close()
+            self._buf = None
+
+    def publish(self, pairs: Mapping, last_refresh: Optional[str],
+                source_version: tuple) -> bool:
+        """
+        Публикует курсы, собранные из версии source_version rates.json.
+        Возвращает False, если пары не укладываются в раскладку записи.
+        """
+        entries = []
+        for pair, info in pairs.items():
+            if not isinstance(info, dict) or 'rate' not in info:
+                continue
+            key = _field(pair, PAIR_SIZE)
+            source = _field(info.get('source'), SOURCE_SIZE)
+            updated_at = _field(info.get('updated_at'), UPDATED_SIZE)
+            if key is None or source is None or updated_at is None:
+                return False
+            try:
+                rate = float(info['rate'])
+            except (TypeError, ValueError):
+                return False
+            entries.append((key.ljust(PAIR_SIZE, b'\0'), rate, source, updated_at))
+        entries.sort()
+        payload = b''.join(ENTRY.pack(*entry) for entry in entries)
+        refresh = _field(last_refresh, 32) or b''
+        inode, mtime_ns, size = source_version
+
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            capacity = self._capacity() if self._attach() else None
+            if capacity is None or capacity < len(entries):
+                self._create(max(self.capacity, 2 * len(entries)))
+                capacity = self._capacity()
+
+            buf = self._buf
+            seq = SEQ.unpack_from(buf, SEQ_OFFSET)[0] & ~1
+            SEQ.pack_into(buf, SEQ_OFFSET, seq + 1)
+            buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+            HEADER.pack_into(
+                buf, 0, MAGIC, LAYOUT_VERSION, seq + 1, len(entries), capacity,
+                inode, mtime_ns, size, refresh
+            )
+            SEQ.pack_into(buf, SEQ_OFFSET, seq + 2)
+        return True
+
+    def _capacity(self) -> Optional[int]:
+        magic, layout, _, _, capacity, _, _, _, _ = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            return None
+        if len(self._buf) < HEADER_SIZE + capacity * ENTRY.size:
+            return None
+        return capacity
+
+    def snapshot(self, source_version: Optional[tuple] = None
+                 ) -> Optional[RatesSnapshot]:
+        """
+        Снимок таблицы или None, если она не опубликована, собрана
+        не из source_version или писатель не отпустил seqlock.
+        """
+        with self._lock:
+            return self._read(source_version)
+
+    def _read(self, source_version: Optional[tuple]) -> Optional[RatesSnapshot]:
+        for _ in range(2):
+            if not self._attach():
+                return None
+            buf = self._buf
+            for attempt in range(self.READ_RETRIES):
+                (magic, layout, seq, count, _, inode, mtime_ns, size,
+                 refresh) = HEADER.unpack_from(buf, 0)
+                if magic != MAGIC or layout != LAYOUT_VERSION:
+                    break
+                if seq & 1:
+                    time.sleep(0 if attempt < 10 else 0.001)
+                    continue
+                end = HEADER_SIZE + count * ENTRY.size
+                data = bytes(buf[HEADER_SIZE:end]) if end <= len(buf) else None
+                if SEQ.unpack_from(buf, SEQ_OFFSET)[0] != seq:
+                    continue
+                if seq == 0 or data is None:
+                    return None
+                version = (inode, mtime_ns, size)
+                if source_version is not None and version != tuple(source_version):
+                    return None
+                return RatesSnapshot(data, count, seq, _text(refresh), version)
+            else:
+                return None
+            # Сегмент выведен писателем (пересоздан с большей ёмкостью)
+            self.close()
+        return None
+
+
+_tables: Dict[str, SharedRateTable] = {}
+
+
+def shared_rate_table(rates_path: str) -> SharedRateTable:
+    """Таблица для файла курсов; одна на путь в пределах процесса"""
+    key = os.path.abspath(rates_path)
+    if key not in _tables:
+        from .settings import settings
+
+        _tables[key] = SharedRateTable(
+            rates_path, settings.get('rates_shared_capacity', DEFAULT_CAPACITY)
+        )
+    return _tables[key]
@@ -0,0 +1,140 @@
+# valutatrade_hub/infra/tracing.py
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _NullSpan:
+    """Заглушка, которую отдаёт выключенный трассировщик"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str,
+                 args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer._record(self, end)
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Вложенные интервалы времени в рамках одного запуска.
+
+    Пока трассировка не включена (start), span() возвращает общую
+    заглушку и ничего не записывает. Включённый трассировщик копит
+    завершённые интервалы в памяти и выгружает их в формате Chrome
+    trace events (chrome://tracing, Perfetto): вложенность восстанавливается
+    по времени начала и длительности в пределах одного потока.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._origin = 0
+        self._pid = os.getpid()
+
+    def start(self):
+        self._events = []
+        self._threads = {}
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def span(self, name: str, category: str = 'app', **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def _record(self, span: _Span, end: int):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._threads:
+            self._threads[tid] = thread.name
+        event = {
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": (span.start - self._origin) / 1000,
+            "dur": (end - span.start) / 1000,
+            "pid": self._pid,
+            "tid": tid,
+        }
+        if span.args:
+            event["args"] = span.args
+        self._events.append(event)
+
+    def events(self) -> List[Dict[str, Any]]:
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+             "args": {"name": name}}
+            for tid, name in self._threads.items()
+        ]
+        return metadata + sorted(self._events, key=lambda e: (e["ts"], -e["dur"]))
+
+    def dump(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {"traceEvents": self.events(), "displayTimeUnit": "ms"},
+                f, ensure_ascii=False, default=str
+            )
+
+
+tracer = Tracer()
+
+
+def traced(name: Optional[str] = None, category: str = 'app'):
+    """Оборачивает функцию в span (по умолчанию с её квалифицированным именем)"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(tracer, span_name, category, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,122 @@
+# valutatrade_hub/infra/watcher.py
+import os
+import select
+import sys
+import time
+from typing import Dict, Iterable, Optional, Set
+
+# Маски inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+
+
+def _fingerprint(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _open_inotify(directories: Iterable[str]) -> Optional[int]:
+    """Дескриптор inotify, следящий за каталогами, или None, если недоступен"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    for directory in directories:
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+    return fd
+
+
+class FileWatcher:
+    """
+    Ожидание изменений набора файлов без перечитывания по таймеру.
+
+    На Linux используется inotify на каталогах файлов: файлы данных
+    заменяются атомарно через rename, поэтому следить нужно за именем
+    в каталоге, а не за inode. После любого события каталога файлы
+    сверяются по stat-отпечатку (inode, mtime, размер), и изменившимися
+    считаются только те, чей отпечаток поменялся, так что чужие файлы
+    в том же каталоге не будят наблюдателя. Если inotify недоступен
+    (другая ОС, исчерпан лимит наблюдений), отпечатки опрашиваются
+    раз в poll_interval секунд — это несколько вызовов stat без чтения
+    содержимого.
+    """
+
+    def __init__(self, paths: Iterable[str], poll_interval: float = 0.5,
+                 use_inotify: bool = True):
+        self.paths = list(paths)
+        self.poll_interval = poll_interval
+        self._fingerprints: Dict[str, Optional[tuple]] = {
+            path: _fingerprint(path) for path in self.paths
+        }
+        directories = {os.path.dirname(os.path.abspath(path)) for path in self.paths}
+        self._fd = _open_inotify(directories) if use_inotify else None
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._fd is not None else 'polling'
+
+    def _changed(self) -> Set[str]:
+        changed = set()
+        for path in self.paths:
+            fingerprint = _fingerprint(path)
+            if fingerprint != self._fingerprints[path]:
+                self._fingerprints[path] = fingerprint
+                changed.add(path)
+        return changed
+
+    def _drain(self):
+        while True:
+            try:
+                if not os.read(self._fd, 64 * 1024):
+                    return
+            except BlockingIOError:
+                return
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Блокирует до изменения хотя бы одного файла и возвращает
+        изменившиеся пути; по истечении timeout — пустое множество.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._changed()
+            if changed:
+                return changed
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return set()
+
+            if self._fd is not None:
+                ready, _, _ = select.select([self._fd], [], [], remaining)
+                if ready:
+                    self._drain()
+            else:
+                time.sleep(
+                    self.poll_interval if remaining is None
+                    else min(self.poll_interval, remaining)
+                )
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,10 +1,14 @@
+import atexit
 import json
 import logging
 import logging.handlers
 import os
+import queue
 from datetime import datetime
+from typing import List, Optional
 
 from .infra.settings import settings
+from .infra.tracing import tracer
 
 
 class JSONFormatter(logging.Formatter):
@@ -84,7 +88,165 @@ class TextFormatter(logging.Formatter):
         return message
 
 
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler, умеющий записать пачку записей с одним flush"""
+
+    def emit_batch(self, records: List[logging.LogRecord]):
+        self.acquire()
+        try:
+            for record in records:
+                if record.levelno < self.level or not self.filter(record):
+                    continue
+                try:
+                    if self.shouldRollover(record):
+                        self.doRollover()
+                    self.stream.write(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            if self.stream:
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class OverflowQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler с политикой переполнения очереди:
+    block — ждать места, drop_new — отбросить новую запись,
+    drop_oldest — вытеснить самую старую.
+    """
+
+    POLICIES = ('block', 'drop_new', 'drop_oldest')
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = 'block'):
+        if overflow not in self.POLICIES:
+            raise ValueError(
+                f"Неизвестная политика переполнения '{overflow}'. "
+                f"Доступны: {', '.join(self.POLICIES)}"
+            )
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Слушатель живёт в том же процессе, поэтому запись не нужно
+        # форматировать и «обезвоживать» для pickle: всё форматирование
+        # выполняется уже в фоновом потоке.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == 'drop_oldest':
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                except queue.Empty:
+                    pass
+                try:
+                    self.queue.put_nowait(record)
+                except queue.Full:
+                    pass
+            self.dropped += 1
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    Фоновый поток, забирающий из очереди до batch_size записей за раз.
+    Обработчики с emit_batch пишут пачку целиком, остальные — по одной.
+    """
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler,
+                 batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+
+    def enqueue_sentinel(self):
+        # Штатный put_nowait упал бы на полной очереди
+        self.queue.put(self._sentinel)
+
+    def _monitor(self):
+        q = self.queue
+        has_task_done = hasattr(q, 'task_done')
+        stop = False
+        while not stop:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+
+            records = []
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    records.append(record)
+            if records:
+                self.handle_batch(records)
+            if has_task_done:
+                for _ in batch:
+                    q.task_done()
+
+    def handle_batch(self, records: List[logging.LogRecord]):
+        with tracer.span('log.write_batch', 'logging', records=len(records)):
+            self._handle_batch(records)
+
+    def _handle_batch(self, records: List[logging.LogRecord]):
+        for handler in self.handlers:
+            if isinstance(handler, BatchRotatingFileHandler):
+                handler.emit_batch(records)
+                continue
+            for record in records:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
+_queue_handler: Optional[OverflowQueueHandler] = None
+_listener: Optional[BatchingQueueListener] = None
+
+
+def shutdown_logging():
+    """Останавливает фоновый поток, дописывая всё, что осталось в очереди"""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+
+    # Записи, пришедшие после остановки, пишутся уже синхронно
+    logger = logging.getLogger('valutatrade')
+    logger.removeHandler(_queue_handler)
+    _listener.stop()
+    if _queue_handler.dropped:
+        record = logger.makeRecord(
+            'valutatrade', logging.WARNING, __file__, 0,
+            f"Очередь логирования переполнена, отброшено записей: "
+            f"{_queue_handler.dropped}", None, None
+        )
+        _listener.handle_batch([record])
+    for handler in _listener.handlers:
+        handler.flush()
+        logger.addHandler(handler)
+
+    _queue_handler = None
+    _listener = None
+
+
+def flush_logging():
+    """Дожидается, пока фоновый поток запишет всё, что уже в очереди"""
+    if _listener is not None:
+        _listener.queue.join()
+
+
+atexit.register(shutdown_logging)
+
+
 def setup_logging():
+    global _queue_handler, _listener
     log_path = settings.get('log_path', 'logs')
     os.makedirs(log_path, exist_ok=True)
     
@@ -96,10 +258,11 @@ def setup_logging():
     logger = logging.getLogger('valutatrade')
     logger.setLevel(log_level)
 
+    shutdown_logging()
     logger.handlers.clear()
     
     log_file = os.path.join(log_path, 'actions.log')
-    file_handler = logging.handlers.RotatingFileHandler(
+    file_handler = BatchRotatingFileHandler(
         filename=log_file,
         maxBytes=settings.get('log_rotation_bytes', 1024 * 1024), 
         backupCount=settings.get('log_backup_count', 5),
@@ -115,7 +278,7 @@ def setup_logging():
         )
     
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    handlers: List[logging.Handler] = [file_handler]
     
     if log_level <= logging.DEBUG:
         console_handler = logging.StreamHandler()
@@ -125,7 +288,28 @@ def setup_logging():
             datefmt='%H:%M:%S'
         )
         console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+    
+    if settings.get('log_mode', 'sync') == 'queue':
+        # В режиме очереди горячий путь только кладёт запись в очередь,
+        # а форматирование и запись на диск выполняет фоновый поток.
+        # Режим включается явно ("log_mode": "queue" в data/config.json,
+        # параметры — log_queue_size, log_queue_overflow, log_batch_size):
+        # записи, не дошедшие до диска при аварийном завершении процесса,
+        # теряются, а при политиках drop_* — и при переполнении очереди.
+        log_queue = queue.Queue(maxsize=settings.get('log_queue_size', 10000))
+        _queue_handler = OverflowQueueHandler(
+            log_queue, settings.get('log_queue_overflow', 'block')
+        )
+        _listener = BatchingQueueListener(
+            log_queue, *handlers,
+            batch_size=settings.get('log_batch_size', 256)
+        )
+        _listener.start()
+        logger.addHandler(_queue_handler)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     
     logging.getLogger('urllib3').setLevel(logging.WARNING)
     logging.getLogger('requests').setLevel(logging.WARNING)
@@ -133,7 +317,16 @@ def setup_logging():
     return logger
 
 
-logger = setup_logging()
+def ensure_logging() -> logging.Logger:
+    """
+    Настраивает логирование при первом вызове. Импорт модуля ничего
+    не настраивает: обработчики, каталог логов и фоновый поток
+    создаёт точка входа приложения перед выполнением команды.
+    """
+    logger = logging.getLogger('valutatrade')
+    if not logger.handlers:
+        return setup_logging()
+    return logger
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from typing import Dict, Tuple
 
+from ..core.currencies import get_crypto_id_map, get_currency_codes
+
 
 @dataclass
 class ParserConfig:
@@ -12,19 +14,12 @@ class ParserConfig:
     
     BASE_CURRENCY: str = "USD"
     
-    FIAT_CURRENCIES: Tuple[str, ...] = field(default_factory=lambda: ("EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "RUB", "CNY")) # noqa: E501
-    CRYPTO_CURRENCIES: Tuple[str, ...] = field(default_factory=lambda: ("BTC", "ETH", "BNB", "ADA", "SOL", "XRP", "DOT", "DOGE")) # noqa: E501
+    # Пустые значения заполняются из currencies.json (см. __post_init__),
+    # того же файла, из которого строится реестр валют.
+    FIAT_CURRENCIES: Tuple[str, ...] = ()
+    CRYPTO_CURRENCIES: Tuple[str, ...] = ()
     
-    CRYPTO_ID_MAP: Dict[str, str] = field(default_factory=lambda: {
-        "BTC": "bitcoin",
-        "ETH": "ethereum",
-        "BNB": "binancecoin",
-        "ADA": "cardano",
-        "SOL": "solana",
-        "XRP": "ripple",
-        "DOT": "polkadot",
-        "DOGE": "dogecoin",
-    })
+    CRYPTO_ID_MAP: Dict[str, str] = field(default_factory=dict)
     
     RATES_FILE_PATH: str = "data/rates.json"
     HISTORY_FILE_PATH: str = "data/exchange_rates.json"
@@ -34,6 +29,17 @@ class ParserConfig:
     UPDATE_INTERVAL_MINUTES: int = 30 
     CACHE_TTL_MINUTES: int = 5
     
+    def __post_init__(self):
+        if not self.FIAT_CURRENCIES:
+            self.FIAT_CURRENCIES = tuple(
+                code for code in get_currency_codes('fiat')
+                if code != self.BASE_CURRENCY
+            )
+        if not self.CRYPTO_CURRENCIES:
+            self.CRYPTO_CURRENCIES = tuple(get_currency_codes('crypto'))
+        if not self.CRYPTO_ID_MAP:
+            self.CRYPTO_ID_MAP = get_crypto_id_map()
+    
     @property
     def coingecko_full_url(self) -> str:
         return f"{self.COINGECKO_URL}"
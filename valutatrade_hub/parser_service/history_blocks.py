@@ -0,0 +1,444 @@
+# valutatrade_hub/parser_service/history_blocks.py
+import contextlib
+import json
+import lzma
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b'VTRB'
+LAYOUT_VERSION = 1
+CODECS = {'zlib': 1, 'lzma': 2}
+CODEC_NAMES = {value: name for name, value in CODECS.items()}
+
+# Заголовок блока: магия, раскладка, кодек, флаги, длина метаданных,
+# число записей, диапазон времени (мкс), длины несжатых и сжатых данных,
+# CRC32 метаданных и данных
+HEADER = struct.Struct('<4sBBHIIqqIII')
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(timestamp: str) -> int:
+    """ISO-время в микросекунды от эпохи (как np.datetime64[us])"""
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - EPOCH) // MICROSECOND
+
+
+def from_micros(micros: int) -> str:
+    return (EPOCH + timedelta(microseconds=int(micros))).isoformat()
+
+
+def _shuffle(values: np.ndarray) -> bytes:
+    """Байты чисел по разрядам: старшие байты соседних значений совпадают"""
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+
+def _unshuffle(raw: bytes, dtype: str, count: int) -> np.ndarray:
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(raw, dtype=np.uint8, count=count * itemsize)
+    return planes.reshape(itemsize, count).T.copy().view(dtype).ravel()
+
+
+class BlockHeader:
+    __slots__ = ('offset', 'size', 'codec', 'count', 'min_ts', 'max_ts',
+                 'pairs', 'sources', 'base', 'raw_size', 'payload_size', 'crc',
+                 'meta')
+
+    def __init__(self, offset: int, fields: tuple, meta: bytes):
+        (_, _, codec, _, meta_size, self.count, self.min_ts, self.max_ts,
+         self.raw_size, self.payload_size, self.crc) = fields
+        self.offset = offset
+        self.codec = CODEC_NAMES.get(codec)
+        self.size = HEADER.size + meta_size + self.payload_size
+        self.meta = meta
+        decoded = json.loads(meta)
+        self.pairs: List[Tuple[str, int]] = [tuple(item) for item in decoded['pairs']]
+        self.sources: List[str] = decoded['sources']
+        # Только у хвостового блока: длина основного файла, к которой он дописан
+        self.base: Optional[int] = decoded.get('base')
+
+    def overlaps(self, start_us: Optional[int], end_us: Optional[int],
+                 pairs: Optional[set]) -> bool:
+        if start_us is not None and self.max_ts < start_us:
+            return False
+        if end_us is not None and self.min_ts > end_us:
+            return False
+        return pairs is None or any(pair in pairs for pair, _ in self.pairs)
+
+
+class HistoryBlockStore:
+    """
+    История курсов в сжатых блоках (exchange_rates.blocks).
+
+    Блок — несжатый заголовок (диапазон времени, пары с числом записей,
+    источники, CRC) и сжатые zlib или lzma столбцы: времена записей
+    (разности внутри пары) и курсы, побайтно переставленные по разрядам,
+    и номера источников. Внутри блока записи упорядочены по паре
+    и времени, поэтому ряд пары — непрерывный срез столбцов.
+
+    Читатель, которому нужен диапазон времени или часть пар, проходит
+    только заголовки и распаковывает блоки, которые с ними пересекаются.
+
+    Основной файл только дописывается целыми блоками по block_records
+    записей. Неполный хвост лежит отдельно (exchange_rates.blocks.tail)
+    и заменяется целиком через временный файл и os.replace, поэтому
+    прерванная запись оставляет либо старый хвост, либо новый. Когда
+    записей набирается на целый блок, он дописывается в основной файл
+    (с fsync) и только потом хвост заменяется остатком. Хвост помнит
+    длину основного файла, к которой он дописан (base): если файл
+    длиннее, записи хвоста уже в нём, и хвост не читается. Обрывок
+    прерванной дозаписи после последнего целого блока читатель не видит,
+    а следующая дозапись его отрезает.
+    """
+
+    def __init__(self, path: str, codec: str = 'zlib', block_records: int = 16384):
+        if codec not in CODECS:
+            raise ValueError(f"Неизвестный кодек истории: {codec}")
+        self.path = path
+        self.tail_path = path + '.tail'
+        self.codec = codec
+        self.block_records = block_records
+        # Байт прочитано последним read_series (заголовки и распакованные блоки)
+        self.bytes_read = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self.tail_path)
+
+    def file_bytes(self) -> int:
+        """Размер истории на диске: основной файл и хвост"""
+        size = 0
+        for path in (self.path, self.tail_path):
+            with contextlib.suppress(FileNotFoundError):
+                size += os.path.getsize(path)
+        return size
+
+    def headers(self) -> Iterator[BlockHeader]:
+        """Заголовки блоков по порядку (без чтения сжатых данных)"""
+        with self._open() as blocks:
+            for _, header in blocks:
+                yield header
+
+    @contextlib.contextmanager
+    def _open(self) -> Iterator[List[Tuple[object, BlockHeader]]]:
+        """Блоки основного файла и действующий хвост: [(файл, заголовок)]"""
+        with contextlib.ExitStack() as stack:
+            # Хвост открывается раньше основного файла: если между открытиями
+            # его записи дописаны в основной файл, base не совпадёт с концом
+            tail = self._open_existing(stack, self.tail_path)
+            main = self._open_existing(stack, self.path)
+            blocks = []
+            end = 0
+            if main is not None:
+                for header in self._scan(main):
+                    blocks.append((main, header))
+                    end = header.offset + header.size
+            header = self._tail_header(tail, end)
+            if header is not None:
+                blocks.append((tail, header))
+            yield blocks
+
+    @staticmethod
+    def _open_existing(stack: contextlib.ExitStack, path: str):
+        try:
+            return stack.enter_context(open(path, 'rb'))
+        except FileNotFoundError:
+            return None
+
+    def _tail_header(self, f, end: int) -> Optional[BlockHeader]:
+        """Заголовок хвоста, если его записи ещё не в основном файле"""
+        if f is None:
+            return None
+        header = next(self._scan(f), None)
+        if header is None or header.base is None or header.base < end:
+            return None
+        return header
+
+    @staticmethod
+    def _scan(f) -> Iterator[BlockHeader]:
+        end = os.fstat(f.fileno()).st_size
+        offset = 0
+        while offset + HEADER.size <= end:
+            f.seek(offset)
+            fields = HEADER.unpack(f.read(HEADER.size))
+            if fields[0] != MAGIC or fields[1] != LAYOUT_VERSION:
+                return
+            meta = f.read(fields[4])
+            header_end = offset + HEADER.size + fields[4] + fields[9]
+            if len(meta) < fields[4] or header_end > end:
+                return
+            try:
+                header = BlockHeader(offset, fields, meta)
+            except (ValueError, KeyError, TypeError):
+                return
+            yield header
+            offset = header_end
+
+    def _decode(self, f, header: BlockHeader) -> Optional[Dict[str, np.ndarray]]:
+        f.seek(header.offset + HEADER.size + len(header.meta))
+        payload = f.read(header.payload_size)
+        if zlib.crc32(payload, zlib.crc32(header.meta)) != header.crc:
+            return None
+        raw = (
+            zlib.decompress(payload) if header.codec == 'zlib'
+            else lzma.decompress(payload)
+        )
+        count = header.count
+        deltas = _unshuffle(raw, '<i8', count)
+        rates = _unshuffle(raw[count * 8:], '<f8', count)
+        sources = np.frombuffer(raw, dtype='<u2', count=count, offset=count * 16)
+
+        times = np.empty(count, dtype=np.int64)
+        position = 0
+        for _, size in header.pairs:
+            run = slice(position, position + size)
+            np.cumsum(deltas[run], out=times[run])
+            position += size
+        return {'times': times, 'rates': rates, 'sources': sources}
+
+    def _encode(self, times: np.ndarray, rates: np.ndarray, sources: np.ndarray,
+                pairs: List[Tuple[str, int]], source_names: List[str],
+                base: Optional[int] = None) -> bytes:
+        deltas = np.diff(times, prepend=np.int64(0))
+        position = 0
+        for _, size in pairs:
+            deltas[position] = times[position]
+            position += size
+        raw = (
+            _shuffle(deltas.astype('<i8'))
+            + _shuffle(rates.astype('<f8'))
+            + sources.astype('<u2').tobytes()
+        )
+        payload = (
+            zlib.compress(raw, 6) if self.codec == 'zlib'
+            else lzma.compress(raw, preset=6)
+        )
+        meta = {'pairs': pairs, 'sources': source_names}
+        if base is not None:
+            meta['base'] = base
+        meta = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        header = HEADER.pack(
+            MAGIC, LAYOUT_VERSION, CODECS[self.codec], 0, len(meta), len(times),
+            int(times.min()), int(times.max()), len(raw), len(payload),
+            zlib.crc32(payload, zlib.crc32(meta))
+        )
+        return header + meta + payload
+
+    def _blocks(self, columns: 'HistoryColumns',
+                base: Optional[int] = None) -> Iterator[bytes]:
+        """Записи, упорядоченные по (пара, время), блоками по block_records"""
+        # Ранг имени пары: внутри блока пары идут в алфавитном порядке
+        rank = np.empty(len(columns.pair_names), dtype=np.int64)
+        rank[np.argsort(np.array(columns.pair_names, dtype=object))] = np.arange(
+            len(columns.pair_names)
+        )
+        for start in range(0, len(columns.times), self.block_records):
+            chunk = slice(start, start + self.block_records)
+            times = columns.times[chunk]
+            pair_index = columns.pair_index[chunk]
+            order = np.lexsort((times, rank[pair_index]))
+            runs, sizes = np.unique(pair_index[order], return_counts=True)
+            # np.unique сортирует по номеру пары, а блок — по имени
+            by_name = np.argsort(rank[runs])
+            yield self._encode(
+                times[order], columns.rates[chunk][order],
+                columns.source_index[chunk][order],
+                [(columns.pair_names[runs[i]], int(sizes[i])) for i in by_name],
+                columns.source_names, base
+            )
+
+    def append(self, records: Iterable[Dict]) -> int:
+        """Дописывает записи истории; возвращает число записанных байт"""
+        columns = HistoryColumns.from_records(records)
+        if not len(columns.times):
+            return 0
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a+b') as f:
+            end = 0
+            for header in self._scan(f):
+                end = header.offset + header.size
+            tail = self._load_tail(end)
+            if tail is not None:
+                columns = tail.extend(columns)
+
+            written = 0
+            full = len(columns.times) // self.block_records * self.block_records
+            if full:
+                # Отрезается обрывок прерванной дозаписи: его записи в хвосте
+                f.truncate(end)
+                for block in self._blocks(columns.take(slice(0, full))):
+                    f.write(block)
+                    written += len(block)
+                f.flush()
+                os.fsync(f.fileno())
+                end += written
+            written += self._replace_tail(columns.take(slice(full, None)), end)
+        return written
+
+    def _load_tail(self, end: int) -> Optional['HistoryColumns']:
+        try:
+            f = open(self.tail_path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            header = self._tail_header(f, end)
+            decoded = self._decode(f, header) if header is not None else None
+        if decoded is None:
+            return None
+        return HistoryColumns.from_block(header, decoded)
+
+    def _replace_tail(self, columns: 'HistoryColumns', base: int) -> int:
+        if not len(columns.times):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.tail_path)
+            return 0
+        block = next(self._blocks(columns, base))
+        temp_path = self.tail_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.tail_path)
+        return len(block)
+
+    def read_series(
+        self,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        pairs: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Ряды {пара: (времена в мкс, курсы)} за [start_us, end_us]:
+        распаковываются только блоки, пересекающиеся с запросом.
+        """
+        wanted = set(pairs) if pairs is not None else None
+        parts: Dict[str, Tuple[List[np.ndarray], List[np.ndarray]]] = {}
+        self.bytes_read = 0
+        with self._open() as blocks:
+            for f, header in blocks:
+                self.bytes_read += HEADER.size + len(header.meta)
+                if not header.overlaps(start_us, end_us, wanted):
+                    continue
+                columns = self._decode(f, header)
+                if columns is None:
+                    continue
+                self.bytes_read += header.payload_size
+                position = 0
+                for pair, size in header.pairs:
+                    run = slice(position, position + size)
+                    position += size
+                    if wanted is not None and pair not in wanted:
+                        continue
+                    times, rates = columns['times'][run], columns['rates'][run]
+                    if start_us is not None:
+                        low = np.searchsorted(times, start_us)
+                        times, rates = times[low:], rates[low:]
+                    if end_us is not None:
+                        high = np.searchsorted(times, end_us, side='right')
+                        times, rates = times[:high], rates[:high]
+                    if len(times):
+                        pair_times, pair_rates = parts.setdefault(pair, ([], []))
+                        pair_times.append(times)
+                        pair_rates.append(rates)
+
+        return {
+            pair: (np.concatenate(times), np.concatenate(rates))
+            for pair, (times, rates) in parts.items()
+        }
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Записи в формате exchange_rates.json (по блокам, по парам)"""
+        with self._open() as blocks:
+            for f, header in blocks:
+                columns = self._decode(f, header)
+                if columns is None:
+                    continue
+                position = 0
+                for pair, size in header.pairs:
+                    from_currency, to_currency = pair.split('_', 1)
+                    for i in range(position, position + size):
+                        timestamp = from_micros(columns['times'][i])
+                        yield {
+                            'id': f"{pair}_{timestamp}",
+                            'from_currency': from_currency,
+                            'to_currency': to_currency,
+                            'rate': float(columns['rates'][i]),
+                            'timestamp': timestamp,
+                            'source': header.sources[columns['sources'][i]],
+                        }
+                    position += size
+
+
+class HistoryColumns:
+    """Записи истории столбцами: номера пар и источников, времена, курсы"""
+
+    __slots__ = ('pair_names', 'pair_index', 'times', 'rates',
+                 'source_names', 'source_index')
+
+    def __init__(self, pair_names, pair_index, times, rates, source_names,
+                 source_index):
+        self.pair_names: List[str] = pair_names
+        self.pair_index = np.asarray(pair_index, dtype=np.int64)
+        self.times = np.asarray(times, dtype=np.int64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.source_names: List[str] = source_names
+        self.source_index = np.asarray(source_index, dtype=np.uint16)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'HistoryColumns':
+        pairs: Dict[str, int] = {}
+        sources: Dict[str, int] = {}
+        pair_index, times, rates, source_index = [], [], [], []
+        for record in records:
+            pair = f"{record['from_currency']}_{record['to_currency']}"
+            pair_index.append(pairs.setdefault(pair, len(pairs)))
+            times.append(to_micros(record['timestamp']))
+            rates.append(float(record['rate']))
+            source = record.get('source', '')
+            source_index.append(sources.setdefault(source, len(sources)))
+        return cls(list(pairs), pair_index, times, rates, list(sources), source_index)
+
+    @classmethod
+    def from_block(cls, header: BlockHeader,
+                   decoded: Dict[str, np.ndarray]) -> 'HistoryColumns':
+        names = [pair for pair, _ in header.pairs]
+        sizes = [size for _, size in header.pairs]
+        return cls(
+            names, np.repeat(np.arange(len(names)), sizes), decoded['times'],
+            decoded['rates'], list(header.sources), decoded['sources']
+        )
+
+    def take(self, chunk: slice) -> 'HistoryColumns':
+        return HistoryColumns(
+            self.pair_names, self.pair_index[chunk], self.times[chunk],
+            self.rates[chunk], self.source_names, self.source_index[chunk]
+        )
+
+    def extend(self, other: 'HistoryColumns') -> 'HistoryColumns':
+        """Склеивает столбцы, переводя номера пар и источников other в свои"""
+        pairs = {name: i for i, name in enumerate(self.pair_names)}
+        sources = {name: i for i, name in enumerate(self.source_names)}
+        pair_map = np.array(
+            [pairs.setdefault(name, len(pairs)) for name in other.pair_names],
+            dtype=np.int64
+        )
+        source_map = np.array(
+            [sources.setdefault(name, len(sources)) for name in other.source_names],
+            dtype=np.int64
+        )
+        return HistoryColumns(
+            list(pairs),
+            np.concatenate([self.pair_index, pair_map[other.pair_index]]),
+            np.concatenate([self.times, other.times]),
+            np.concatenate([self.rates, other.rates]),
+            list(sources),
+            np.concatenate([self.source_index, source_map[other.source_index]]),
+        )
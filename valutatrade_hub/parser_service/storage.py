@@ -1,9 +1,27 @@
 # valutatrade_hub/parser_service/storage.py
+import contextlib
 import json
 import logging
 import os
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..infra.database import file_version
+from ..infra.metrics import (
+    STORAGE_FILE_BYTES,
+    STORAGE_LATENCY,
+    STORAGE_READ_BYTES,
+    STORAGE_WRITTEN_BYTES,
+)
+from ..infra.rate_events import RateChangeNotifier, changed_pairs
+from ..infra.settings import settings
+from ..infra.tracing import tracer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +29,14 @@ class RatesStorage:
     def __init__(self, rates_file_path: str, history_file_path: str):
         self.rates_file_path = rates_file_path
         self.history_file_path = history_file_path
+        # История в сжатых блоках (history_blocks) рядом с JSON-файлом
+        self.history_blocks_path = os.path.splitext(history_file_path)[0] + '.blocks'
+        self.history_format = settings.get('history_format', 'blocks')
     
     def save_current_rates(self, rates: Dict[str, Dict], source_info: Dict):
         os.makedirs(os.path.dirname(self.rates_file_path), exist_ok=True)
+        notify = settings.get('rates_notifications', True)
+        previous = self._load_current_pairs() if notify else None
         
         data = {
             "pairs": rates,
@@ -22,30 +45,251 @@ class RatesStorage:
         }
         
         temp_file = self.rates_file_path + ".tmp"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        self._dump(temp_file, data, os.path.basename(self.rates_file_path))
+        # rename не меняет inode, mtime и размер: это отпечаток итогового файла
+        stat = os.stat(temp_file)
         
         os.replace(temp_file, self.rates_file_path)
         logger.info(f"Сохранено {len(rates)} курсов в {self.rates_file_path}")
+        self._publish_shared(data, file_version(stat))
+        if notify:
+            self._notify(changed_pairs(previous, rates), data["last_refresh"])
+    
+    def _load_current_pairs(self) -> Dict:
+        """Курсы, которые сейчас в rates.json: с ними сравнивается новая запись"""
+        try:
+            stat = os.stat(self.rates_file_path)
+        except OSError:
+            return {}
+        if settings.get('rates_shared_memory', True):
+            from ..infra.shared_rates import shared_rate_table
+            
+            with contextlib.suppress(OSError):
+                snapshot = shared_rate_table(self.rates_file_path).snapshot(
+                    file_version(stat)
+                )
+                if snapshot is not None:
+                    return snapshot
+        try:
+            with open(self.rates_file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        pairs = data.get('pairs', data) if isinstance(data, dict) else {}
+        return pairs if isinstance(pairs, dict) else {}
+    
+    def _notify(self, changed: List[str], last_refresh: str):
+        """Событие для подписчиков на обновления курсов (rate_events)"""
+        try:
+            event = RateChangeNotifier(self.rates_file_path).publish(
+                changed, last_refresh
+            )
+        except OSError as e:
+            logger.warning(f"Не удалось уведомить подписчиков об обновлении: {e}")
+            return
+        logger.info(
+            f"Версия курсов {event['version']}: изменилось пар — {len(changed)}"
+        )
+    
+    def _publish_shared(self, data: Dict, version: Tuple[int, int]):
+        """Курсы в разделяемую память для остальных процессов (shared_rates)"""
+        if not settings.get('rates_shared_memory', True):
+            return
+        from ..infra.shared_rates import shared_rate_table
+        
+        try:
+            published = shared_rate_table(self.rates_file_path).publish(
+                data["pairs"], data["last_refresh"], version
+            )
+        except OSError as e:
+            logger.warning(f"Не удалось опубликовать курсы в общую память: {e}")
+            return
+        if not published:
+            logger.warning("Курсы не укладываются в таблицу общей памяти")
     
     def save_to_history(self, rates: List[Dict]):
         os.makedirs(os.path.dirname(self.history_file_path), exist_ok=True)
+        if self.history_format == 'blocks':
+            self._append_history_blocks(rates)
+            return
     
-        history = self._load_history()
+        if self._uses_blocks():
+            history = self._export_history_blocks()
+        else:
+            history = self._load_history()
         
         history.extend(rates)
         
-        with open(self.history_file_path, 'w', encoding='utf-8') as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        self._dump(
+            self.history_file_path, history,
+            os.path.basename(self.history_file_path)
+        )
+        
+        logger.info(f"Добавлено {len(rates)} записей в историю")
+    
+    def _history_blocks(self):
+        from .history_blocks import HistoryBlockStore
         
+        return HistoryBlockStore(
+            self.history_blocks_path,
+            codec=settings.get('history_codec', 'zlib'),
+            block_records=settings.get('history_block_records', 16384),
+        )
+    
+    def _uses_blocks(self) -> bool:
+        """
+        История читается из блоков, пока они есть, при любом history_format:
+        с json блоки выгружаются обратно при первой записи в историю.
+        """
+        return (
+            os.path.exists(self.history_blocks_path)
+            or os.path.exists(self.history_blocks_path + '.tail')
+        )
+    
+    @contextlib.contextmanager
+    def _history_blocks_lock(self):
+        with open(self.history_blocks_path + '.lock', 'w') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+    
+    def _append_history_blocks(self, rates: List[Dict]):
+        store = self._history_blocks()
+        filename = os.path.basename(self.history_blocks_path)
+        with self._history_blocks_lock():
+            start = time.perf_counter()
+            with tracer.span('db.write', 'storage', file=filename):
+                written = 0
+                if not store.exists() and os.path.exists(self.history_file_path):
+                    # Первая запись в блоки переносит накопленную JSON-историю;
+                    # сам exchange_rates.json остаётся как есть и больше
+                    # не обновляется (возврат — history_format: json)
+                    written += store.append(self._load_history())
+                    logger.info(
+                        f"История из {self.history_file_path} перенесена "
+                        f"в {self.history_blocks_path}; JSON-файл больше "
+                        f"не обновляется"
+                    )
+                written += store.append(rates)
+        STORAGE_LATENCY.observe(time.perf_counter() - start, file=filename, op='write')
+        STORAGE_WRITTEN_BYTES.inc(written, file=filename)
+        STORAGE_FILE_BYTES.set(store.file_bytes(), file=filename)
         logger.info(f"Добавлено {len(rates)} записей в историю")
     
+    def _export_history_blocks(self) -> List[Dict]:
+        """
+        Возврат к history_format=json: история из блоков выгружается
+        в exchange_rates.json, блоки удаляются. Возвращает выгруженные записи.
+        """
+        store = self._history_blocks()
+        with self._history_blocks_lock():
+            history = list(store.iter_records())
+            temp_file = self.history_file_path + ".tmp"
+            self._dump(temp_file, history, os.path.basename(self.history_file_path))
+            os.replace(temp_file, self.history_file_path)
+            for path in (store.path, store.tail_path):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+        logger.info(
+            f"История из {self.history_blocks_path} выгружена "
+            f"в {self.history_file_path}"
+        )
+        return history
+    
+    def history_version(self) -> Optional[Tuple]:
+        """Версия истории: отпечатки файлов (file_version), без их чтения"""
+        if self._uses_blocks():
+            paths = (self.history_blocks_path, self.history_blocks_path + '.tail')
+        else:
+            paths = (self.history_file_path,)
+        versions = []
+        for path in paths:
+            try:
+                versions.append(file_version(os.stat(path)))
+            except OSError:
+                versions.append(None)
+        if not any(versions):
+            return None
+        return tuple(versions)
+    
+    def load_history_series(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        pairs: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple]:
+        """
+        История курсов по парам: {"BTC_USD": (времена, курсы)}, времена —
+        int64 в микросекундах от эпохи (как np.datetime64[us]). Из блочной
+        истории читаются только блоки, пересекающиеся с [start, end] и pairs.
+        """
+        from .history_blocks import to_micros
+        
+        start_us = to_micros(start.isoformat()) if start else None
+        end_us = to_micros(end.isoformat()) if end else None
+        if self._uses_blocks():
+            return self._load_history_blocks(start_us, end_us, pairs)
+        
+        import numpy as np
+        
+        wanted = set(pairs) if pairs is not None else None
+        grouped: Dict[str, Tuple[List[str], List[float]]] = {}
+        for entry in self._load_history():
+            pair = f"{entry['from_currency']}_{entry['to_currency']}"
+            if wanted is not None and pair not in wanted:
+                continue
+            timestamps, rates = grouped.setdefault(pair, ([], []))
+            timestamps.append(entry['timestamp'])
+            rates.append(entry['rate'])
+        
+        series = {}
+        for pair, (timestamps, rates) in grouped.items():
+            times = np.array(timestamps, dtype='datetime64[us]').astype(np.int64)
+            values = np.array(rates, dtype=float)
+            mask = np.ones(len(times), dtype=bool)
+            if start_us is not None:
+                mask &= times >= start_us
+            if end_us is not None:
+                mask &= times <= end_us
+            if mask.any():
+                series[pair] = (times[mask], values[mask])
+        return series
+    
+    def _load_history_blocks(self, start_us: Optional[int], end_us: Optional[int],
+                             pairs: Optional[Iterable[str]]) -> Dict:
+        store = self._history_blocks()
+        filename = os.path.basename(self.history_blocks_path)
+        start = time.perf_counter()
+        with tracer.span('db.read', 'storage', file=filename):
+            series = store.read_series(start_us, end_us, pairs)
+        STORAGE_LATENCY.observe(time.perf_counter() - start, file=filename, op='read')
+        STORAGE_READ_BYTES.inc(store.bytes_read, file=filename)
+        return series
+    
     def _load_history(self) -> List[Dict]:
         if not os.path.exists(self.history_file_path):
             return []
         
+        filename = os.path.basename(self.history_file_path)
         try:
-            with open(self.history_file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            start = time.perf_counter()
+            with tracer.span('db.read', 'storage', file=filename), \
+                    open(self.history_file_path, 'r', encoding='utf-8') as f:
+                size = os.fstat(f.fileno()).st_size
+                history = json.load(f)
         except json.JSONDecodeError:
-            return []
\ No newline at end of file
+            return []
+        STORAGE_LATENCY.observe(time.perf_counter() - start, file=filename, op='read')
+        STORAGE_READ_BYTES.inc(size, file=filename)
+        return history
+    
+    @staticmethod
+    def _dump(path: str, data, filename: str):
+        start = time.perf_counter()
+        with tracer.span('db.write', 'storage', file=filename), \
+                open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            size = f.tell()
+        STORAGE_LATENCY.observe(time.perf_counter() - start, file=filename, op='write')
+        STORAGE_WRITTEN_BYTES.inc(size, file=filename)
+        STORAGE_FILE_BYTES.set(size, file=filename)
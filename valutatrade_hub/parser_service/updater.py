@@ -3,6 +3,7 @@ import logging
 from datetime import datetime
 from typing import Dict
 
+from ..decorators import timed_action
 from .api_clients import CoinGeckoClient, ExchangeRateApiClient
 from .config import ParserConfig
 from .storage import RatesStorage
@@ -21,6 +22,7 @@ class RatesUpdater:
             'exchangerate': ExchangeRateApiClient(self.config)
         }
     
+    @timed_action('UPDATE_RATES')
     def run_update(self, sources: list = None) -> Dict:
         """Запустить обновление курсов"""
         logger.info("Запуск обновления курсов валют")